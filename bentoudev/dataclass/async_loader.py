@@ -0,0 +1,90 @@
+from typing import List, Optional, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+import asyncio
+import functools
+import threading
+
+from bentoudev.dataclass.base import DataclassLoadError, assign_loaded_from_file
+from bentoudev.dataclass.yaml_loader import load_yaml_dataclass
+
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+def _read_text(path: str, encoding: str):
+    with open(path, 'r', encoding=encoding) as f:
+        return f.read()
+
+
+# Set once the call is cancelled or caller's own event is set, run_conversion only asks is_set
+class _CancelEvent:
+    __slots__ = ('event', 'parent')
+
+    def __init__(self, parent):
+        self.event = threading.Event()
+        self.parent = parent
+
+    def set(self):
+        self.event.set()
+
+    def is_set(self) -> bool:
+        return self.event.is_set() or (self.parent is not None and self.parent.is_set())
+
+
+# File is read in loop's default executor, parsing and conversion run in 'executor' (default one when None).
+# Keyword arguments are passed to load_yaml_dataclass, with process pool executor they must be picklable.
+# Cancelling the call stops conversion running in a thread at its next step, parsing isn't interrupted.
+# Loads already running in a process pool can't be reached and run to the end, 'cancel' is passed there as is.
+async def load_yaml_dataclass_async(clazz:type, path:str, *, label:Optional[str]=None, executor:Optional[Executor]=None,
+        encoding:str='utf-8', cancel=None, **kwargs):
+    loop = asyncio.get_running_loop()
+    yaml_content = await loop.run_in_executor(None, _read_text, path, encoding)
+
+    if not isinstance(executor, ProcessPoolExecutor):
+        cancel = _CancelEvent(cancel)
+    load_fn = functools.partial(load_yaml_dataclass, clazz, label if label is not None else path, yaml_content, cancel=cancel, **kwargs)
+    try:
+        result = await loop.run_in_executor(executor, load_fn)
+    except asyncio.CancelledError:
+        if isinstance(cancel, _CancelEvent):
+            cancel.set()
+        raise
+    return assign_loaded_from_file(result, path)
+
+
+# Results are in order of 'paths', at most 'max_concurrency' files are read or converted at the same time.
+# Validation errors of all files are merged into single DataclassLoadError, any other error (like missing file)
+# cancels outstanding loads and is re-raised. Cancelling the call itself cancels all pending loads as well.
+async def load_yaml_dataclass_batch_async(clazz:type, paths:Sequence[str], *, executor:Optional[Executor]=None,
+        max_concurrency:int=DEFAULT_MAX_CONCURRENCY, encoding:str='utf-8', **kwargs) -> List:
+    if max_concurrency < 1:
+        raise ValueError(f"max_concurrency must be at least 1, got '{max_concurrency}'")
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def load_guarded(path: str):
+        async with semaphore:
+            try:
+                return await load_yaml_dataclass_async(clazz, path, executor=executor, encoding=encoding, **kwargs)
+            except DataclassLoadError as err:
+                return err
+
+    tasks = [ asyncio.ensure_future(load_guarded(p)) for p in paths ]
+
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        raise
+
+    failed = [ r for r in results if isinstance(r, DataclassLoadError) ]
+    if len(failed) > 0:
+        raise DataclassLoadError.from_exception_list(
+            msg=f"Failed to load {len(failed)} of {len(results)} file(s)",
+            src=None,
+            excs=failed,
+            format=failed[0].format
+        )
+
+    return results
@@ -1,22 +1,96 @@
-from typing import Callable, Any, Optional, List, ClassVar, Union
+from __future__ import annotations
 from enum import Enum
-import sys, inspect, dataclasses, typing_inspect
+import sys, bisect, copy, dataclasses, types, typing, _thread
+# Imported by most tools that only need base, so it doesn't import typing_inspect or PyYAML at all.
+# Names used in annotations are imported at runtime, so typing.get_type_hints resolves them.
+from typing import Callable, Any, Optional, List, ClassVar, Tuple, Union
 
 
-def _process_load_as(clazz, source_type: type, field_name: str):
-    def load_as_impl():
+# How value of inline loaded class is loaded, built once by @inline_loader
+@dataclasses.dataclass
+class InlineLoadType:
+    inline_type: type
+    loader: Callable[[Any], Any] = None
+    field_name: str = None
+    # Several source types, dispatched on type of the loaded value
+    source_types: tuple = ()
+    dispatch: Optional[dict] = None
+
+    # Source type to load given raw value as, None when no source type accepts it
+    def select_source_type(self, value):
+        if self.dispatch is None:
+            return self.inline_type
+
+        value_t = type(value)
+        if value_t not in _INLINE_SCALARS:
+            if isinstance(value, dict):
+                value_t = dict
+            elif isinstance(value, list):
+                value_t = list
+
+        source_type = self.dispatch.get(value_t, None)
+        if source_type is None:
+            for fallback_t in _INLINE_FALLBACKS.get(value_t, ()):
+                source_type = self.dispatch.get(fallback_t, None)
+                if source_type is not None:
+                    break
         return source_type
 
+
+_INLINE_SCALARS = (bool, int, float, str)
+
+# Same conversions scalar loaders accept, when value's own type isn't a source type
+_INLINE_FALLBACKS = {
+    int : (float, str),
+    float : (str,),
+    bool : (str,),
+}
+
+
+def _inline_dispatch_key(source_type):
+    if source_type in _INLINE_SCALARS:
+        return source_type
+    if is_enum(source_type):
+        return str
+    if is_clazz_list(source_type):
+        return list
+    if is_clazz_dict(source_type) or dataclasses.is_dataclass(source_type):
+        return dict
+    raise TypeError(f"Inline loader source type '{source_type}' can't be told apart from others by value, use single source type instead")
+
+
+def _process_load_as(clazz, source_type, field_name: str):
+    source_types = tuple(source_type) if isinstance(source_type, (tuple, list)) else (source_type,)
+
+    dispatch = None
+    if len(source_types) > 1:
+        inline_type = typing.Union[source_types]
+        dispatch = {}
+        for t in source_types:
+            key = _inline_dispatch_key(t)
+            if key in dispatch:
+                raise TypeError(f"Inline loader source types '{dispatch[key]}' and '{t}' of '{clazz.__name__}' are loaded from the same kind of value")
+            dispatch[key] = t
+    else:
+        inline_type = source_types[0]
+
+    def load_as_impl():
+        return inline_type
+
     def loader(value):
         s = clazz(**{ field_name : value })
         return s
 
     setattr(clazz, '__load_as__', load_as_impl)
     setattr(clazz, '__load_as_loader__', loader)
+    setattr(clazz, '__load_as_field__', field_name)
+    setattr(clazz, '__inline_load_type__', InlineLoadType(inline_type, loader, field_name, source_types, dispatch))
+    _reset_class_traits(clazz)
     return clazz
 
 
-def inline_loader(_cls: type = None, *, source_type: type, field_name: str):
+# 'source_type' may be a tuple of types, for example (str, int), value is then loaded as the one matching its type
+def inline_loader(_cls: type = None, *, source_type, field_name: str):
 
     def wrap(cls):
         return _process_load_as(cls, source_type, field_name)
@@ -29,21 +103,15 @@ def inline_loader(_cls: type = None, *, source_type: type, field_name: str):
 
 def is_inline_loaded(obj):
     clazz = obj if isinstance(obj, type) else type(obj)
-    return hasattr(clazz, '__load_as__')
-
+    return get_class_traits(clazz).inline_loaded
 
-def get_inline_load_type(obj):
-    @dataclasses.dataclass
-    class _InlineLoadType:
-        inline_type: type
-        loader: Callable[[str], Any] = None
 
-    if not is_inline_loaded(obj):
+def get_inline_load_type(obj) -> InlineLoadType:
+    clazz = obj if isinstance(obj, type) else type(obj)
+    result = getattr(clazz, '__inline_load_type__', None)
+    if result is None:
         raise TypeError(f"Type '{type(obj)}' doesn't have @inline_loader decorator!")
-    return _InlineLoadType(
-        inline_type=obj.__load_as__(),
-        loader=obj.__load_as_loader__
-    )
+    return result
 
 
 ##########################################################################
@@ -52,15 +120,31 @@ def get_inline_load_type(obj):
 class EErrorFormat(Enum):
     Pretty = 1
     MSVC = 2
+    # One JSON object per error, for tools
+    JsonLines = 3
 
 
 @dataclasses.dataclass
 class Source:
     line_number: int
     column_number: int
+    # Code snippet, or function building it on first read. Loaders create far more sources than they format.
     buffer: str
     file_name: str
 
+    # Pickled with built snippet, builders may hold whole document
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_buffer'] = self.buffer
+        return state
+
+    # Copy shares snippet builder only, so snippet isn't built for it
+    def __deepcopy__(self, memo):
+        result = memo[id(self)] = object.__new__(type(self))
+        for name, value in self.__dict__.items():
+            result.__dict__[name] = value if name == '_buffer' else copy.deepcopy(value, memo)
+        return result
+
     def format(self, label:str, message:str, error_format:EErrorFormat):
         src_prefix = '>  '
         src_margin_top = 1
@@ -78,7 +162,9 @@ class Source:
         main_line = ''
         pointer = ''
 
-        if error_format == EErrorFormat.MSVC:
+        if error_format == EErrorFormat.JsonLines:
+            return self.format_line_json(label, message)
+        elif error_format == EErrorFormat.MSVC:
             main_line = self.format_line_msvc(label, message)
             pointer = self._format_ptr_msvc(src_prefix, last_line_len, newline)
         elif error_format == EErrorFormat.Pretty:
@@ -109,7 +195,9 @@ class Source:
         )
 
     def format_line(self, label:str, message:str, error_format:EErrorFormat):
-        if error_format == EErrorFormat.MSVC:
+        if error_format == EErrorFormat.JsonLines:
+            return self.format_line_json(label, message)
+        elif error_format == EErrorFormat.MSVC:
             return self.format_line_msvc(label, message)
         elif error_format == EErrorFormat.Pretty:
             return self.format_line_pretty(label, message)
@@ -125,6 +213,16 @@ class Source:
 
         return (f'{self.file_name}({self.line_number},{self.column_number}) : {first_line}')
 
+    def format_line_json(self, label:str, message:str):
+        import json
+        return json.dumps({
+            'file' : self.file_name,
+            'line' : self.line_number,
+            'column' : self.column_number,
+            'label' : label,
+            'message' : message,
+        }, ensure_ascii=False)
+
     def format_line_pretty(self, label:str, message:str):
         first_line = ''
         if len(label) != 0:
@@ -138,6 +236,21 @@ class Source:
         )
 
 
+def _get_source_buffer(self:Source) -> str:
+    buffer = self._buffer
+    if callable(buffer):
+        buffer = self._buffer = buffer()
+    return buffer
+
+
+def _set_source_buffer(self:Source, buffer):
+    self._buffer = buffer
+
+
+# Set after dataclass decorator, which would take the property for default value of 'buffer'
+Source.buffer = property(_get_source_buffer, _set_source_buffer)
+
+
 @dataclasses.dataclass
 class DataclassErrorMessage:
     source: Source
@@ -238,6 +351,28 @@ class UnhandledType(Exception):
     pass
 
 
+# Raised when conversion notices its cancel flag was set. Not an Exception, so Union attempts don't swallow it.
+class LoadCancelled(BaseException):
+    pass
+
+
+class LineIndex:
+    line_starts: List[int]
+
+    def __init__(self, content:str):
+        self.line_starts = [0]
+        find = content.find
+        idx = find('\n')
+        while idx != -1:
+            self.line_starts.append(idx + 1)
+            idx = find('\n', idx + 1)
+
+    # Returns 1-based (line, column) of character index
+    def location(self, idx:int):
+        line = bisect.bisect_right(self.line_starts, idx)
+        return line, idx - self.line_starts[line - 1] + 1
+
+
 class SourceTracker:
     __source_map__ = dict()
     __root_src__: Source
@@ -278,64 +413,284 @@ _LOADED_FROM_FILE_ATTR = '__loaded_from_file__'
 _SOURCE_TRACKED_ATTR = '__source_tracker__'
 
 
+# What loaders need to know about a class, computed once per class instead of hasattr lookups per loaded object
+@dataclasses.dataclass(frozen=True)
+class ClassTraits:
+    source_tracked: bool
+    inline_loaded: bool
+    loaded_from_file: bool
+    # Field name to FieldIndex tuple, None when no field is indexed
+    field_indexes: Optional[dict] = None
+    # Field name to ColumnarOptions, None when no field is columnar
+    columnar_fields: Optional[dict] = None
+
+
+# WeakKeyDictionary, created on first use so importing base doesn't import weakref
+_CLASS_TRAITS = None
+_TRAITS_LOCK = _thread.allocate_lock()
+
+
+def _compute_class_traits(clazz) -> ClassTraits:
+    field_indexes = _collect_field_metadata(clazz, _FIELD_INDEXES_KEY)
+    if field_indexes is not None:
+        _check_index_keys(clazz, field_indexes)
+    return ClassTraits(
+        source_tracked=hasattr(clazz, _SOURCE_TRACKED_ATTR),
+        inline_loaded=hasattr(clazz, '__load_as__'),
+        loaded_from_file=hasattr(clazz, _LOADED_FROM_FILE_ATTR),
+        field_indexes=field_indexes,
+        columnar_fields=_collect_field_metadata(clazz, _COLUMNAR_KEY)
+    )
+
+
+# Item type of List, Dict or Optional of them, None when it isn't known yet (string annotations, forward references)
+def _get_item_type(clazz):
+    if is_union_type(clazz):
+        args = [ arg for arg in clazz.__args__ if arg is not type(None) ]
+        clazz = args[0] if len(args) == 1 else None
+    if is_clazz_list(clazz) and len(getattr(clazz, '__args__', ())) == 1:
+        return clazz.__args__[0]
+    if is_clazz_dict(clazz) and len(getattr(clazz, '__args__', ())) == 2:
+        return clazz.__args__[1]
+    return None
+
+
+# Index keys must be fields (or other attributes) of item dataclass. Items of unknown types are checked when loaded.
+def _check_index_keys(clazz, field_indexes:dict):
+    for f in dataclasses.fields(clazz):
+        item_type = _get_item_type(f.type) if f.name in field_indexes else None
+        if item_type is None or not dataclasses.is_dataclass(item_type):
+            continue
+        item_fields = { item_field.name for item_field in dataclasses.fields(item_type) }
+        for spec in field_indexes[f.name]:
+            if spec.key not in item_fields and not hasattr(item_type, spec.key):
+                raise TypeError(f"Key '{spec.key}' of index '{spec.get_name()}' of field '{f.name}' of class '{clazz.__name__}' isn't a field of '{item_type.__name__}'")
+
+
+def get_class_traits(clazz) -> ClassTraits:
+    global _CLASS_TRAITS
+    registry = _CLASS_TRAITS
+    if registry is None:
+        import weakref
+        registry = _CLASS_TRAITS = weakref.WeakKeyDictionary()
+
+    try:
+        traits = registry.get(clazz, None)
+    except TypeError:
+        # Not weak referenceable, typing constructs and such
+        return _compute_class_traits(clazz)
+
+    if traits is None:
+        traits = registry[clazz] = _compute_class_traits(clazz)
+    return traits
+
+
+# Decorators change traits of the class and its subclasses, only their entries are dropped. Traits of other
+# classes stay, decorators may run while loading (see ensure_source_tracked).
+def _reset_class_traits(clazz):
+    registry = _CLASS_TRAITS
+    if registry is None:
+        return
+    stack = [ clazz ]
+    while len(stack) > 0:
+        current = stack.pop()
+        registry.pop(current, None)
+        stack.extend(type.__subclasses__(current))
+
+
 def is_loaded_from_file(obj):
     clazz = obj if isinstance(obj, type) else type(obj)
-    return hasattr(clazz, _LOADED_FROM_FILE_ATTR)
+    return get_class_traits(clazz).loaded_from_file
 
 
 def is_source_tracked(obj):
     clazz = obj if isinstance(obj, type) else type(obj)
-    return hasattr(clazz, _SOURCE_TRACKED_ATTR)
+    return get_class_traits(clazz).source_tracked
 
 
-def loaded_from_file(clazz):
-    def set_loaded_from_file(self, path : str):
-        setattr(self, _LOADED_FROM_FILE_ATTR, path)
+def _set_loaded_from_file(self, path : str):
+    setattr(self, _LOADED_FROM_FILE_ATTR, path)
+
+
+def _get_loaded_from_file(self):
+    return getattr(self, _LOADED_FROM_FILE_ATTR)
 
-    def get_loaded_from_file(self):
-        return getattr(self, _LOADED_FROM_FILE_ATTR)
 
+def loaded_from_file(clazz):
     setattr(clazz, _LOADED_FROM_FILE_ATTR, None)
-    setattr(clazz, 'set_loaded_from_file', set_loaded_from_file)
-    setattr(clazz, 'get_loaded_from_file', get_loaded_from_file)
+    setattr(clazz, 'set_loaded_from_file', _set_loaded_from_file)
+    setattr(clazz, 'get_loaded_from_file', _get_loaded_from_file)
+    _reset_class_traits(clazz)
     return clazz
 
 
-def track_source(clazz):
-    def set_source_tracker(self, tracker: SourceTracker):
-        self.__source_tracker__ = tracker
+def assign_loaded_from_file(obj, path:str):
+    if is_loaded_from_file(obj):
+        obj.set_loaded_from_file(path)
+    return obj
 
-    def get_root_source(self):
-        return self.__source_tracker__.__root_src__
 
-    def get_field_source(self, field_name: str) -> Optional[Source]:
-        return self.__source_tracker__.get_field_source(field_name)
+# Methods added by track_source, shared by all tracked classes
+def _set_source_tracker(self, tracker: SourceTracker):
+    self.__source_tracker__ = tracker
 
-    def format_source(src: Source, label:str, msg:str, error_format:EErrorFormat):
-        return src.format(label, msg, error_format)
 
-    def format_message(self, label:str, msg:str, error_format:EErrorFormat):
-        return format_source(self.get_root_source(), label, msg, error_format)
+def _get_root_source(self):
+    return self.__source_tracker__.__root_src__
 
-    def format_field_message(self, field_name: str, label:str, msg:str, error_format:EErrorFormat):
-        src = self.get_field_source(field_name)
-        if src is not None:
-            return format_source(src, label, msg, error_format)
-        return ""
 
+def _get_field_source(self, field_name: str) -> Optional[Source]:
+    return self.__source_tracker__.get_field_source(field_name)
+
+
+def _format_message(self, label:str, msg:str, error_format:EErrorFormat):
+    return self.get_root_source().format(label, msg, error_format)
+
+
+def _format_field_message(self, field_name: str, label:str, msg:str, error_format:EErrorFormat):
+    src = self.get_field_source(field_name)
+    if src is not None:
+        return src.format(label, msg, error_format)
+    return ""
+
+
+# Marker is set last, classes are considered tracked only once all methods are in place. Caller holds _TRAITS_LOCK.
+def _install_source_tracking(clazz):
+    setattr(clazz, "set_source_tracker", _set_source_tracker)
+    setattr(clazz, "get_root_source", _get_root_source)
+    setattr(clazz, "get_field_source", _get_field_source)
+    setattr(clazz, "format_message", _format_message)
+    setattr(clazz, "format_field_message", _format_field_message)
     setattr(clazz, _SOURCE_TRACKED_ATTR, None)
-    setattr(clazz, "set_source_tracker", set_source_tracker)
-    setattr(clazz, "get_root_source", get_root_source)
-    setattr(clazz, "get_field_source", get_field_source)
-    setattr(clazz, "format_message", format_message)
-    setattr(clazz, "format_field_message", format_field_message)
+    _reset_class_traits(clazz)
+
+
+def track_source(clazz):
+    with _TRAITS_LOCK:
+        _install_source_tracking(clazz)
     return clazz
 
 
+# Index of items of a list or dict field, keyed by attribute 'key' of each item.
+# Unique index maps key to item and reports duplicates as load errors, otherwise key maps to list of items.
+@dataclasses.dataclass(frozen=True)
+class FieldIndex:
+    key: str
+    unique: bool = True
+    # Defaults to 'key'
+    name: Optional[str] = None
+
+    def get_name(self) -> str:
+        return self.name if self.name is not None else self.key
+
+
+_FIELD_INDEXES_KEY = 'bentoudev.dataclass.indexes'
+_INDEXES_ATTR = '__indexes__'
+
+
+# Field metadata making loader build indexes while converting the field, each spec is a FieldIndex or
+# attribute name for unique index, e.g. services: List[Service] = field(metadata=indexed('name', FieldIndex('team', unique=False)))
+def indexed(*specs) -> dict:
+    indexes = tuple(spec if isinstance(spec, FieldIndex) else FieldIndex(spec) for spec in specs)
+    names = [ index.get_name() for index in indexes ]
+    if len(indexes) == 0 or len(set(names)) != len(names):
+        raise ValueError(f"Expected at least one index and unique index names, got: {', '.join(names)}")
+    return { _FIELD_INDEXES_KEY : indexes }
+
+
+def _collect_field_metadata(clazz, key:str) -> Optional[dict]:
+    if not dataclasses.is_dataclass(clazz):
+        return None
+    result = { f.name : f.metadata[key] for f in dataclasses.fields(clazz) if key in f.metadata }
+    return result if len(result) > 0 else None
+
+
+def set_indexes(obj, indexes:dict):
+    # Set past __setattr__, so frozen dataclasses get indexes as well
+    object.__setattr__(obj, _INDEXES_ATTR, indexes)
+
+
+@dataclasses.dataclass(frozen=True)
+class ColumnarOptions:
+    # None uses NumPy for typed columns when it's installed
+    use_numpy: Optional[bool] = None
+
+
+_COLUMNAR_KEY = 'bentoudev.dataclass.columnar'
+
+
+# Field metadata loading List[dataclass] field as columnar.ColumnarTable, one array per field of the row class
+# instead of an instance per row, e.g. samples: List[Sample] = field(metadata=columnar())
+def columnar(*, use_numpy:Optional[bool]=None) -> dict:
+    return { _COLUMNAR_KEY : ColumnarOptions(use_numpy) }
+
+
+# How layered loading merges list from later layer into list of earlier one
+class EListMerge(Enum):
+    Replace = 1
+    Append = 2
+    # Items are mappings matched by value of 'key', matching ones are merged, others appended
+    MergeByKey = 3
+
+
+@dataclasses.dataclass(frozen=True)
+class ListMergeOptions:
+    strategy: EListMerge
+    key: Optional[str] = None
+
+    def __post_init__(self):
+        if (self.strategy == EListMerge.MergeByKey) != (self.key is not None):
+            raise ValueError(f"Key must be given for MergeByKey list merge and only for it, got '{self.strategy}' with key '{self.key}'")
+
+
+_LIST_MERGE_KEY = 'bentoudev.dataclass.list_merge'
+
+
+# Field metadata overriding list merge strategy of layered loading for the field, e.g. field(metadata=list_merge(EListMerge.MergeByKey, 'name'))
+def list_merge(strategy:EListMerge, key:Optional[str]=None) -> dict:
+    return { _LIST_MERGE_KEY : ListMergeOptions(strategy, key) }
+
+
+def get_list_merge(f:dataclasses.Field) -> Optional[ListMergeOptions]:
+    return f.metadata.get(_LIST_MERGE_KEY, None)
+
+
+_LOADER_METADATA_KEYS = (_FIELD_INDEXES_KEY, _COLUMNAR_KEY, _LIST_MERGE_KEY)
+
+
+# (key, options) of field metadata changing how the field is loaded, in fixed order
+def get_loader_metadata(f:dataclasses.Field) -> List[Tuple[str, Any]]:
+    return [ (key, f.metadata[key]) for key in _LOADER_METADATA_KEYS if key in f.metadata ]
+
+
+# Index built by loader for 'field_name' of loaded object, 'index_name' may be omitted when field has single index
+def get_index(obj, field_name:str, index_name:Optional[str]=None) -> dict:
+    field_indexes = getattr(obj, _INDEXES_ATTR, {}).get(field_name, None)
+    if field_indexes is None:
+        raise KeyError(f"Field '{field_name}' of '{type(obj).__name__}' isn't indexed or object wasn't loaded")
+    if index_name is None:
+        if len(field_indexes) != 1:
+            raise KeyError(f"Field '{field_name}' of '{type(obj).__name__}' has several indexes, pick one of: {', '.join(field_indexes.keys())}")
+        return next(iter(field_indexes.values()))
+    return field_indexes[index_name]
+
+
+# Used by always_track_source, instruments class once and afterwards is only a registry lookup.
+# Lock keeps concurrent loads from patching the same class at once.
+def ensure_source_tracked(clazz) -> ClassTraits:
+    traits = get_class_traits(clazz)
+    if not traits.source_tracked:
+        with _TRAITS_LOCK:
+            if not hasattr(clazz, _SOURCE_TRACKED_ATTR):
+                _install_source_tracking(clazz)
+        traits = get_class_traits(clazz)
+    return traits
+
+
 ##########################################################################
 
 def is_enum(clazz:type):
-    if inspect.isclass(clazz) and issubclass(clazz, Enum):
+    if isinstance(clazz, type) and issubclass(clazz, Enum):
         return True
     return False
 
@@ -344,14 +699,54 @@ def is_clazz_list(clazz):
     if clazz is list:
         return True
 
-    return typing_inspect.get_origin(clazz) == list
+    return getattr(clazz, '__origin__', None) is list
 
 
 def is_clazz_dict(clazz):
     if clazz is dict:
         return True
 
-    return typing_inspect.get_origin(clazz) == dict
+    return getattr(clazz, '__origin__', None) is dict
+
+
+# 'X | Y' unions, Python 3.10+
+_UnionType = getattr(types, 'UnionType', None)
+
+
+# Same answers as typing_inspect gives for field annotations
+def is_forward_ref(clazz):
+    return isinstance(clazz, typing.ForwardRef)
+
+
+def is_union_type(clazz):
+    if _UnionType is not None and isinstance(clazz, _UnionType):
+        return True
+    return clazz is typing.Union or getattr(clazz, '__origin__', None) is typing.Union
+
+
+def is_optional_type(clazz):
+    if clazz is type(None):
+        return True
+    if is_union_type(clazz):
+        return any(is_optional_type(arg) for arg in getattr(clazz, '__args__', ()))
+    return False
+
+
+def coerce_string_key(key):
+    # Keys written as strings by formats without non-string keys, like "1" or "true"
+    if type(key) is str:
+        lowercase_key = key.lower()
+        if lowercase_key in ('true', 'false'):
+            return lowercase_key == 'true'
+        try:
+            return int(key)
+        except ValueError:
+            pass
+        try:
+            return float(key)
+        except ValueError:
+            pass
+    return key
 
 
 def get_type_name(clazz):
@@ -370,8 +765,8 @@ def get_types_from_modules(modules: List[str]):
 
 def get_types_from_module(modulename : str):
     result = []
-    for _, obj in inspect.getmembers(sys.modules[modulename]):
-        if inspect.isclass(obj):
+    for _, obj in sorted(vars(sys.modules[modulename]).items()):
+        if isinstance(obj, type):
             result.append(obj)
     return result
 
@@ -387,8 +782,9 @@ def print_dataclass(clazz, indent=0):
             print(f'{prefix}name: {field.name}, type: {field.type}')
             print_dataclass(field.type, indent + 4)
     else:
+        import typing_inspect
         if typing_inspect.is_generic_type(clazz):
-            if typing_inspect.get_origin(clazz) == list:
+            if is_clazz_list(clazz):
                 subtype = clazz.__args__[0]
                 print(f'{prefix}subtype: {subtype}')
                 print_dataclass(subtype, indent + 4)
@@ -0,0 +1,149 @@
+from typing import Any, Dict, Iterator, Optional, Union
+from array import array
+
+
+# Struct-of-arrays storage for List[dataclass] fields declared with base.columnar.
+# Each field of the row class is one column: int, float and bool fields are typed arrays (8, 8 and 1 byte per row),
+# any other field is a list of converted values. Rows are read through RowView, which looks like the dataclass
+# for attribute access and equality, without creating an instance per row.
+# With NumPy installed, 'column' returns typed columns as ndarrays sharing memory with the arrays.
+
+
+_TYPECODES = {
+    int : 'q',
+    float : 'd',
+    bool : 'b',
+}
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class RowView:
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table:'ColumnarTable', index:int):
+        self._table = table
+        self._index = index
+
+    def __getattr__(self, name:str):
+        return self._table.get_value(name, self._index)
+
+    def __setattr__(self, name:str, value):
+        if name in RowView.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            self._table.set_value(name, self._index, value)
+
+    def __eq__(self, other):
+        if isinstance(other, RowView):
+            return other._table.row_type is self._table.row_type and self.as_tuple() == other.as_tuple()
+        if type(other) is self._table.row_type:
+            return self.as_tuple() == tuple(getattr(other, name) for name in self._table.field_names)
+        return NotImplemented
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self._table.field_names)
+        return f'{self._table.row_type.__name__}Row({values})'
+
+    def as_tuple(self) -> tuple:
+        return tuple(self._table.get_value(name, self._index) for name in self._table.field_names)
+
+    # Instance of row class, __post_init__ included
+    def to_dataclass(self):
+        return self._table.row_type(**{ name : self._table.get_value(name, self._index) for name in self._table.field_names })
+
+
+class ColumnarTable:
+    def __init__(self, row_type:type, columns:Dict[str, Union[array, list]], length:int, use_numpy:Optional[bool]=None):
+        self.row_type = row_type
+        self.columns = columns
+        self.field_names = tuple(columns.keys())
+        self.length = length
+        self.use_numpy = use_numpy
+        self._bool_columns = frozenset(name for name, column in columns.items() if isinstance(column, array) and column.typecode == 'b')
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ RowView(self, idx) for idx in range(*index.indices(self.length)) ]
+        if index < 0:
+            index += self.length
+        if index < 0 or index >= self.length:
+            raise IndexError(f"Row index '{index}' out of range for table of {self.length} row(s)")
+        return RowView(self, index)
+
+    def __iter__(self) -> Iterator[RowView]:
+        for idx in range(self.length):
+            yield RowView(self, idx)
+
+    # Compares rows, with another table or with list of row class instances
+    def __eq__(self, other):
+        if isinstance(other, (ColumnarTable, list)):
+            return len(self) == len(other) and all(row == other_row for row, other_row in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ColumnarTable({self.row_type.__name__}, {self.length} row(s))"
+
+    def get_value(self, name:str, index:int):
+        column = self.columns.get(name, None)
+        if column is None:
+            raise AttributeError(f"'{self.row_type.__name__}' row has no field '{name}'")
+        value = column[index]
+        return bool(value) if name in self._bool_columns else value
+
+    def set_value(self, name:str, index:int, value):
+        if name not in self.columns:
+            raise AttributeError(f"'{self.row_type.__name__}' row has no field '{name}'")
+        self.columns[name][index] = value
+
+    # Typed columns are ndarrays when NumPy is used, 'use_numpy' None uses it when installed
+    def column(self, name:str):
+        column = self.columns[name]
+        if isinstance(column, array) and self.use_numpy is not False:
+            numpy = _numpy()
+            if numpy is None:
+                if self.use_numpy:
+                    raise ImportError("NumPy columns were requested, but numpy isn't installed")
+            else:
+                dtype = numpy.bool_ if column.typecode == 'b' else column.typecode
+                return numpy.frombuffer(column, dtype=dtype)
+        return column
+
+    def to_dataclasses(self) -> list:
+        return [ row.to_dataclass() for row in self ]
+
+
+class ColumnarBuilder:
+    def __init__(self, row_type:type, field_types:Dict[str, Any], use_numpy:Optional[bool]=None):
+        self.row_type = row_type
+        self.use_numpy = use_numpy
+        self.length = 0
+        self.columns : Dict[str, Union[array, list]] = {}
+        for name, field_type in field_types.items():
+            typecode = _TYPECODES.get(field_type, None)
+            self.columns[name] = array(typecode) if typecode is not None else []
+
+    def append(self, name:str, value):
+        column = self.columns[name]
+        try:
+            column.append(value)
+        except (TypeError, OverflowError):
+            # Value doesn't fit typed column (big int, None default), whole column falls back to list
+            values = [ bool(v) for v in column ] if column.typecode == 'b' else column.tolist()
+            values.append(value)
+            self.columns[name] = values
+
+    def end_row(self):
+        self.length += 1
+
+    def build(self) -> ColumnarTable:
+        return ColumnarTable(self.row_type, self.columns, self.length, self.use_numpy)
@@ -0,0 +1,547 @@
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
+from abc import ABC, abstractmethod
+from enum import Enum
+import dataclasses
+import io
+import json
+import math
+import threading
+
+import yaml
+from yaml.events import (
+    StreamStartEvent, StreamEndEvent, DocumentStartEvent, DocumentEndEvent,
+    MappingStartEvent, MappingEndEvent, SequenceStartEvent, SequenceEndEvent, ScalarEvent
+)
+from yaml.nodes import ScalarNode
+from yaml.resolver import Resolver
+
+from bentoudev.dataclass.base import UnhandledType
+from bentoudev.dataclass.type_plan import ETypeKind, FieldPlan, TypePlan, get_type_plan, select_union_member
+
+
+# Values are written through plans compiled once per type, mirroring what load_yaml_dataclass accepts:
+# enums by member name, optional fields equal to their default omitted and @inline_loader classes collapsed back to their scalar.
+
+
+_STR_TAG = 'tag:yaml.org,2002:str'
+_HIDDEN_KEYS = ('__yaml_location__', '__yaml_field_location__')
+# Characters buffered before they're written to stream
+_JSON_FLUSH_SIZE = 8192
+
+_YamlDumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+_resolver = Resolver()
+
+
+def _get_init_fields(plan:TypePlan):
+    return [ f for f in plan.fields if f.field.init ]
+
+
+def _get_inline_value(plan:TypePlan, value):
+    inline = plan.inline
+    inline_value = getattr(value, inline.field_name)
+    if plan.clazz(**{ inline.field_name : inline_value }) != value:
+        raise ValueError(f"Unable to collapse '{plan.clazz.__name__}' to its inline field '{inline.field_name}', other fields are not default")
+    return inline_value
+
+
+def _format_float(value:float):
+    if math.isnan(value):
+        return '.nan'
+    if math.isinf(value):
+        return '.inf' if value > 0 else '-.inf'
+    result = repr(value).lower()
+    # YAML 1.1 floats require a dot
+    if '.' not in result and 'e' in result:
+        result = result.replace('e', '.0e', 1)
+    return result
+
+
+def _yaml_scalar(tag:str, text:str):
+    resolved = _resolver.resolve(ScalarNode, text, (True, False))
+    return ScalarEvent(None, tag, (resolved == tag, tag == _STR_TAG), text)
+
+
+def _yaml_str(value:str):
+    return _yaml_scalar(_STR_TAG, value)
+
+
+def _yaml_bool(value:bool):
+    return _yaml_scalar('tag:yaml.org,2002:bool', 'true' if value else 'false')
+
+
+def _yaml_int(value:int):
+    return _yaml_scalar('tag:yaml.org,2002:int', str(value))
+
+
+def _yaml_float(value:float):
+    return _yaml_scalar('tag:yaml.org,2002:float', _format_float(float(value)))
+
+
+_YAML_NULL = ScalarEvent(None, 'tag:yaml.org,2002:null', (True, False), 'null')
+
+# Default of fields which are always written
+_NO_DEFAULT = object()
+
+
+# Only optional fields may be missing from document, they're omitted when loader would use the same value anyway
+def _get_omitted_default(f:FieldPlan):
+    if not f.is_optional:
+        return _NO_DEFAULT
+    if f.field.default is not dataclasses.MISSING:
+        return f.field.default
+    if f.field.default_factory is not dataclasses.MISSING:
+        return f.field.default_factory()
+    return _NO_DEFAULT
+
+
+def _is_omitted(value, default) -> bool:
+    return default is not _NO_DEFAULT and (value is default or value == default)
+
+
+Writer = Callable[[Callable[[Any], None], Any], None]
+
+
+# Loader tries union members in declaration order, scalar members take some values of these later members as well
+# (see yaml_loader.default_type_loaders), such values wouldn't load back as written
+_UNION_CAPTURES = {
+    str : (bool, int, float, Enum),
+    float : (int,),
+    bool : (int, str),
+    Enum : (str,),
+}
+
+
+def _union_scalar_type(plan:TypePlan) -> Optional[type]:
+    if plan.kind == ETypeKind.Enum:
+        return Enum
+    if plan.kind == ETypeKind.Scalar:
+        return plan.clazz
+    return None
+
+
+def _check_union_members(plan:TypePlan):
+    earlier = []
+    for arg in plan.args:
+        member_t = _union_scalar_type(arg)
+        if member_t is None:
+            continue
+        for earlier_t, earlier_arg in earlier:
+            if member_t in _UNION_CAPTURES.get(earlier_t, ()):
+                raise UnhandledType(f"Unable to write '{plan.clazz}', values of '{arg.clazz}' may load back as '{earlier_arg.clazz}'")
+        earlier.append((member_t, arg))
+
+
+class _PlanCompiler(ABC):
+    def __init__(self):
+        self._writers : Dict[int, Writer] = {}
+        # Writers being compiled, published once complete so lock-free lookups never see half-built ones
+        self._building : Dict[int, Writer] = {}
+        self._lock = threading.Lock()
+
+    def writer(self, plan:TypePlan) -> Writer:
+        result = self._writers.get(id(plan), None)
+        if result is None:
+            with self._lock:
+                result = self._writers.get(id(plan), None)
+                if result is None:
+                    try:
+                        result = self._compile_or_get(plan)
+                        self._writers.update(self._building)
+                    finally:
+                        self._building.clear()
+        return result
+
+    @abstractmethod
+    def _compile(self, plan:TypePlan) -> Writer:
+        pass
+
+    # Field writers are (name, omitted default, writer)
+    def _compile_dataclass(self, plan:TypePlan, write_dataclass:Callable[[List[Tuple[str, Any, Writer]]], Writer]):
+        field_writers : List[Tuple[str, Any, Writer]] = []
+        result = write_dataclass(field_writers)
+        # Registered before compiling fields, to support self referencing types
+        self._building[id(plan)] = result
+        field_writers.extend((f.name, _get_omitted_default(f), self._compile_or_get(f.plan)) for f in _get_init_fields(plan))
+        return result
+
+    def _compile_or_get(self, plan:TypePlan) -> Writer:
+        result = self._writers.get(id(plan), None) or self._building.get(id(plan), None)
+        if result is None:
+            result = self._compile(plan)
+        return result
+
+    def _compile_inline(self, plan:TypePlan) -> Writer:
+        write_inline = self._compile_or_get(plan.inline.plan)
+
+        def writer(emit, value):
+            write_inline(emit, _get_inline_value(plan, value))
+        self._building[id(plan)] = writer
+        return writer
+
+    def _compile_optional(self, plan:TypePlan, write_none:Writer) -> Writer:
+        write_value = self._compile_or_get(plan.args[0])
+
+        def writer(emit, value):
+            if value is None:
+                write_none(emit, value)
+            else:
+                write_value(emit, value)
+        return writer
+
+    def _compile_union(self, plan:TypePlan) -> Writer:
+        _check_union_members(plan)
+        member_writers = [ self._compile_or_get(arg) for arg in plan.args ]
+
+        def writer(emit, value):
+            member = select_union_member(plan, value)
+            if member is None:
+                raise ValueError(f"Value of type '{type(value)}' doesn't match any of '{plan.clazz}'")
+            member_writers[member[0]](emit, value)
+        return writer
+
+    def _compile_unresolved(self, plan:TypePlan) -> Writer:
+        def writer(emit, value):
+            raise UnhandledType(f"Unable to write value of unresolved type '{plan.clazz}'")
+        return writer
+
+
+class _YamlPlanCompiler(_PlanCompiler):
+    _SCALARS = {
+        bool : _yaml_bool,
+        int : _yaml_int,
+        float : _yaml_float,
+        str : _yaml_str,
+    }
+
+    def _compile(self, plan:TypePlan) -> Writer:
+        kind = plan.kind
+
+        if kind == ETypeKind.Dataclass:
+            if plan.inline is not None:
+                return self._compile_inline(plan)
+
+            def write_dataclass(field_writers):
+                def writer(emit, value):
+                    emit(MappingStartEvent(None, None, True, False))
+                    for name, default, write_field in field_writers:
+                        field_value = getattr(value, name)
+                        if _is_omitted(field_value, default):
+                            continue
+                        emit(_yaml_str(name))
+                        write_field(emit, field_value)
+                    emit(MappingEndEvent())
+                return writer
+            return self._compile_dataclass(plan, write_dataclass)
+
+        if kind == ETypeKind.Scalar:
+            to_event = self._SCALARS.get(plan.clazz, None)
+            if to_event is None:
+                raise UnhandledType(f"Unable to write type '{plan.clazz}'")
+
+            def writer(emit, value):
+                emit(to_event(value))
+
+        elif kind == ETypeKind.Enum:
+            def writer(emit, value):
+                emit(_yaml_str(value.name))
+
+        elif kind == ETypeKind.Any:
+            writer = _write_yaml_any
+
+        elif kind == ETypeKind.NoneType:
+            def writer(emit, value):
+                emit(_YAML_NULL)
+
+        elif kind == ETypeKind.List:
+            write_item = self._compile_or_get(plan.args[0])
+
+            def writer(emit, value):
+                emit(SequenceStartEvent(None, None, True, False))
+                for v in value:
+                    write_item(emit, v)
+                emit(SequenceEndEvent())
+
+        elif kind == ETypeKind.Dict:
+            write_key = self._compile_or_get(plan.args[0])
+            write_value = self._compile_or_get(plan.args[1])
+
+            def writer(emit, value):
+                emit(MappingStartEvent(None, None, True, False))
+                for k, v in value.items():
+                    write_key(emit, k)
+                    write_value(emit, v)
+                emit(MappingEndEvent())
+
+        elif kind == ETypeKind.Optional:
+            writer = self._compile_optional(plan, lambda emit, value: emit(_YAML_NULL))
+
+        elif kind == ETypeKind.Union:
+            writer = self._compile_union(plan)
+
+        else:
+            writer = self._compile_unresolved(plan)
+
+        self._building[id(plan)] = writer
+        return writer
+
+
+def _write_yaml_any(emit, value):
+    value_t = type(value)
+    if value is None:
+        emit(_YAML_NULL)
+    elif value_t is bool:
+        emit(_yaml_bool(value))
+    elif value_t is int:
+        emit(_yaml_int(value))
+    elif value_t is float:
+        emit(_yaml_float(value))
+    elif value_t is str:
+        emit(_yaml_str(value))
+    elif value_t is list:
+        emit(SequenceStartEvent(None, None, True, False))
+        for v in value:
+            _write_yaml_any(emit, v)
+        emit(SequenceEndEvent())
+    elif value_t is dict:
+        emit(MappingStartEvent(None, None, True, False))
+        for k, v in value.items():
+            if k in _HIDDEN_KEYS:
+                continue
+            _write_yaml_any(emit, k)
+            _write_yaml_any(emit, v)
+        emit(MappingEndEvent())
+    else:
+        raise UnhandledType(f"Unable to write value of type '{value_t}' in 'Any' field")
+
+
+def _json_str(value:str):
+    return json.encoder.encode_basestring(value)
+
+
+def _json_float(value:float):
+    return float.__repr__(float(value)) if math.isfinite(value) else json.dumps(value)
+
+
+def _json_key(value):
+    # JSON keys are always strings
+    value_t = type(value)
+    if value_t is str:
+        return _json_str(value)
+    if value_t is bool:
+        return '"true"' if value else '"false"'
+    if value_t in (int, float):
+        return _json_str(repr(value))
+    if isinstance(value, Enum):
+        return _json_str(value.name)
+    raise UnhandledType(f"Unable to use value of type '{value_t}' as JSON key")
+
+
+class _JsonPlanCompiler(_PlanCompiler):
+    _SCALARS = {
+        bool : lambda value: 'true' if value else 'false',
+        int : lambda value: int.__repr__(value),
+        float : _json_float,
+        str : _json_str,
+    }
+
+    def _compile(self, plan:TypePlan) -> Writer:
+        kind = plan.kind
+
+        if kind == ETypeKind.Dataclass:
+            if plan.inline is not None:
+                return self._compile_inline(plan)
+
+            def write_dataclass(field_writers):
+                def writer(out, value):
+                    out.begin('{')
+                    for name, default, write_field in field_writers:
+                        field_value = getattr(value, name)
+                        if _is_omitted(field_value, default):
+                            continue
+                        out.key(_json_str(name))
+                        write_field(out, field_value)
+                    out.end('}')
+                return writer
+            return self._compile_dataclass(plan, write_dataclass)
+
+        if kind == ETypeKind.Scalar:
+            to_text = self._SCALARS.get(plan.clazz, None)
+            if to_text is None:
+                raise UnhandledType(f"Unable to write type '{plan.clazz}'")
+
+            def writer(out, value):
+                out.value(to_text(value))
+
+        elif kind == ETypeKind.Enum:
+            def writer(out, value):
+                out.value(_json_str(value.name))
+
+        elif kind == ETypeKind.Any:
+            writer = _write_json_any
+
+        elif kind == ETypeKind.NoneType:
+            def writer(out, value):
+                out.value('null')
+
+        elif kind == ETypeKind.List:
+            write_item = self._compile_or_get(plan.args[0])
+
+            def writer(out, value):
+                out.begin('[')
+                for v in value:
+                    out.item()
+                    write_item(out, v)
+                out.end(']')
+
+        elif kind == ETypeKind.Dict:
+            write_value = self._compile_or_get(plan.args[1])
+
+            def writer(out, value):
+                out.begin('{')
+                for k, v in value.items():
+                    out.key(_json_key(k))
+                    write_value(out, v)
+                out.end('}')
+
+        elif kind == ETypeKind.Optional:
+            writer = self._compile_optional(plan, lambda out, value: out.value('null'))
+
+        elif kind == ETypeKind.Union:
+            writer = self._compile_union(plan)
+
+        else:
+            writer = self._compile_unresolved(plan)
+
+        self._building[id(plan)] = writer
+        return writer
+
+
+def _write_json_any(out, value):
+    value_t = type(value)
+    if value is None:
+        out.value('null')
+    elif value_t is bool:
+        out.value('true' if value else 'false')
+    elif value_t is int:
+        out.value(int.__repr__(value))
+    elif value_t is float:
+        out.value(_json_float(value))
+    elif value_t is str:
+        out.value(_json_str(value))
+    elif value_t is list:
+        out.begin('[')
+        for v in value:
+            out.item()
+            _write_json_any(out, v)
+        out.end(']')
+    elif value_t is dict:
+        out.begin('{')
+        for k, v in value.items():
+            if k in _HIDDEN_KEYS:
+                continue
+            out.key(_json_key(k))
+            _write_json_any(out, v)
+        out.end('}')
+    else:
+        raise UnhandledType(f"Unable to write value of type '{value_t}' in 'Any' field")
+
+
+# Tracks separators and indentation, buffers small writes and flushes them to stream in chunks
+class _JsonStreamWriter:
+    def __init__(self, stream:TextIO, indent:Optional[int]):
+        self.stream = stream
+        self.indent = indent
+        self.parts : List[str] = []
+        self.size = 0
+        self.depth = 0
+        self.first = True
+
+    def _write(self, text:str):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= _JSON_FLUSH_SIZE:
+            self.flush()
+
+    def _newline(self):
+        if self.indent is not None:
+            self._write('\n' + ' ' * (self.indent * self.depth))
+
+    def _separator(self):
+        if not self.first:
+            self._write(',')
+        self.first = False
+        self._newline()
+
+    def begin(self, bracket:str):
+        self._write(bracket)
+        self.depth += 1
+        self.first = True
+
+    def end(self, bracket:str):
+        self.depth -= 1
+        if not self.first:
+            self._newline()
+        self._write(bracket)
+        self.first = False
+
+    def item(self):
+        self._separator()
+
+    def key(self, text:str):
+        self._separator()
+        self._write(text)
+        self._write(': ' if self.indent is not None else ':')
+
+    def value(self, text:str):
+        self._write(text)
+        self.first = False
+
+    def flush(self):
+        if len(self.parts) > 0:
+            self.stream.write(''.join(self.parts))
+            self.parts.clear()
+            self.size = 0
+
+
+_YAML_COMPILER = _YamlPlanCompiler()
+_JSON_COMPILER = _JsonPlanCompiler()
+
+
+def _get_plan(obj, clazz:Optional[type], ext_types:list) -> TypePlan:
+    clazz = clazz if clazz is not None else type(obj)
+    if not dataclasses.is_dataclass(clazz):
+        raise ValueError(f'Class \'{clazz}\' passed to dump must be a dataclass!')
+    return get_type_plan(clazz, ext_types)
+
+
+# Writes events straight to the emitter, so output is produced incrementally. Returns string when stream is None.
+def dump_yaml_dataclass(obj, stream:Optional[TextIO]=None, *, clazz:type=None, ext_types:list=[]) -> Optional[str]:
+    writer = _YAML_COMPILER.writer(_get_plan(obj, clazz, ext_types))
+
+    output = stream if stream is not None else io.StringIO()
+    dumper = _YamlDumper(output, default_flow_style=False, allow_unicode=True, sort_keys=False)
+    try:
+        dumper.emit(StreamStartEvent(encoding=None))
+        dumper.emit(DocumentStartEvent(explicit=False))
+        writer(dumper.emit, obj)
+        dumper.emit(DocumentEndEvent(explicit=False))
+        dumper.emit(StreamEndEvent())
+    finally:
+        dumper.dispose()
+
+    if stream is None:
+        return output.getvalue()
+    return None
+
+
+def dump_json_dataclass(obj, stream:Optional[TextIO]=None, *, clazz:type=None, ext_types:list=[], indent:Optional[int]=None) -> Optional[str]:
+    writer = _JSON_COMPILER.writer(_get_plan(obj, clazz, ext_types))
+
+    output = stream if stream is not None else io.StringIO()
+    out = _JsonStreamWriter(output, indent)
+    writer(out, obj)
+    out.flush()
+
+    if stream is None:
+        return output.getvalue()
+    return None
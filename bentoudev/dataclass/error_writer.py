@@ -0,0 +1,157 @@
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+import dataclasses
+import json
+
+from bentoudev.dataclass.base import DataclassErrorMessage, DataclassLoadError, EErrorFormat, LineIndex, Source
+
+
+# Writes load errors to a stream one group at a time, instead of building one big string like str(DataclassLoadError).
+# Errors are grouped by file and line, so snippet of a line with many errors is rendered once.
+# When document contents are given, snippets are sliced from them with one shared LineIndex per file,
+# otherwise buffers stored in each Source are used.
+
+
+@dataclasses.dataclass
+class ErrorEntry:
+    source: Optional[Source]
+    label: str
+    message: str
+
+
+# Flattens nested errors without recursion, in the same order str(DataclassLoadError) prints them
+def iter_error_entries(error:Union[DataclassLoadError, DataclassErrorMessage, Exception]) -> Iterator[ErrorEntry]:
+    stack = [error]
+    while len(stack) > 0:
+        err = stack.pop()
+
+        if isinstance(err, DataclassLoadError):
+            if err.msg:
+                yield ErrorEntry(err.source, err.LABEL, err.msg)
+            stack.extend(reversed(err.errors))
+
+        elif isinstance(err, DataclassErrorMessage):
+            yield ErrorEntry(err.source, err.label, err.message)
+
+        else:
+            yield ErrorEntry(None, DataclassLoadError.LABEL, str(err))
+
+
+class _DocumentLines:
+    __slots__ = ('content', 'index')
+
+    def __init__(self, content:str):
+        self.content = content
+        self.index = LineIndex(content)
+
+    # 1-based line, without line break, empty past the end
+    def line(self, line:int) -> str:
+        starts = self.index.line_starts
+        if line < 1 or line > len(starts):
+            return ''
+        start = starts[line - 1]
+        end = starts[line] - 1 if line < len(starts) else len(self.content)
+        return self.content[start:end].rstrip('\r')
+
+
+def _group_key(entry:ErrorEntry):
+    src = entry.source
+    if src is None:
+        return (1, '', 0)
+    return (0, src.file_name or '', src.line_number)
+
+
+class ErrorStreamWriter:
+    _SRC_PREFIX = '>  '
+
+    def __init__(self, stream:TextIO, *, error_format:EErrorFormat=EErrorFormat.Pretty, sources:Optional[Dict[str, str]]=None,
+            snippet_lines:int=4):
+        self.stream = stream
+        self.error_format = error_format
+        self.snippet_lines = snippet_lines
+        self.count = 0
+        self._contents = dict(sources) if sources is not None else {}
+        self._documents : Dict[str, _DocumentLines] = {}
+
+    def add_source(self, file_name:str, content:str):
+        self._contents[file_name] = content
+        self._documents.pop(file_name, None)
+
+    def write(self, error:Union[DataclassLoadError, DataclassErrorMessage, Exception]):
+        self.write_entries(iter_error_entries(error))
+
+    def write_all(self, errors:Iterable[Union[DataclassLoadError, DataclassErrorMessage, Exception]]):
+        for error in errors:
+            self.write(error)
+
+    def write_entries(self, entries:Iterable[ErrorEntry]):
+        if self.error_format == EErrorFormat.JsonLines:
+            for entry in entries:
+                self._write_json_line(entry)
+            return
+
+        groups : Dict[Tuple, List[ErrorEntry]] = {}
+        for entry in entries:
+            groups.setdefault(_group_key(entry), []).append(entry)
+
+        for key in sorted(groups.keys()):
+            self._write_group(groups[key])
+
+    def _get_document(self, file_name:str) -> Optional[_DocumentLines]:
+        document = self._documents.get(file_name, None)
+        if document is None:
+            content = self._contents.get(file_name, None)
+            if content is None:
+                return None
+            document = self._documents[file_name] = _DocumentLines(content)
+        return document
+
+    def _snippet(self, src:Source) -> List[str]:
+        document = self._get_document(src.file_name)
+        if document is None:
+            return src.buffer.split('\n') if src.buffer else []
+        first_line = max(1, src.line_number - self.snippet_lines + 1)
+        return [ document.line(line) for line in range(first_line, src.line_number + 1) ]
+
+    def _write_json_line(self, entry:ErrorEntry):
+        src = entry.source
+        if src is not None:
+            self.stream.write(src.format_line_json(entry.label, entry.message))
+        else:
+            self.stream.write(json.dumps({ 'file' : None, 'line' : None, 'column' : None, 'label' : entry.label, 'message' : entry.message }, ensure_ascii=False))
+        self.stream.write('\n')
+        self.count += 1
+
+    def _write_group(self, group:List[ErrorEntry]):
+        write = self.stream.write
+        src = group[0].source
+        self.count += len(group)
+
+        if src is None:
+            for entry in group:
+                write(f'{entry.label}: {entry.message}\n')
+            return
+
+        for entry in group:
+            write(entry.source.format_line(entry.label, entry.message, self.error_format))
+            write('\n')
+
+        prefix = self._SRC_PREFIX
+        snippet = self._snippet(src)
+        write(f'{prefix}\n')
+        for line in snippet:
+            write(f'{prefix}{line}\n')
+
+        # Same pointer as Source.format draws under the last snippet line
+        last_line_len = (len(snippet[-1]) + (1 if len(snippet) > 1 else 0) if len(snippet) > 0 else 0) - src.column_number - 2
+        if self.error_format == EErrorFormat.MSVC:
+            write(src._format_ptr_msvc(prefix, last_line_len, '\n'))
+        else:
+            write(src._format_ptr_pretty(prefix, last_line_len, '\n'))
+        write(f'\n{prefix}\n')
+
+
+def write_load_errors(errors:Iterable[Union[DataclassLoadError, DataclassErrorMessage, Exception]], stream:TextIO, *,
+        error_format:EErrorFormat=EErrorFormat.Pretty, sources:Optional[Dict[str, str]]=None, snippet_lines:int=4) -> int:
+    writer = ErrorStreamWriter(stream, error_format=error_format, sources=sources, snippet_lines=snippet_lines)
+    writer.write_all(errors)
+    return writer.count
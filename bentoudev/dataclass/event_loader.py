@@ -0,0 +1,373 @@
+from typing import Any, Dict, Optional
+
+from yaml.composer import ComposerError
+from yaml.constructor import ConstructorError
+from yaml.events import AliasEvent, MappingStartEvent, MappingEndEvent, ScalarEvent, SequenceEndEvent, StreamEndEvent
+from yaml.nodes import ScalarNode
+from yaml.resolver import BaseResolver
+
+from bentoudev.dataclass.base import ensure_source_tracked, get_class_traits
+from bentoudev.dataclass.type_plan import ETypeKind, TypePlan, get_type_plan
+from bentoudev.dataclass.line_loader import RAW_SCALAR_TAG, LineLoader
+from bentoudev.dataclass.yaml_loader import (ConvertedValue, DataclassVisitorContext, DictToDataclass, YamlLocationFrame,
+    YamlSourceLocation, YamlSourceTracker, YamlToObject, is_field_hidden)
+
+
+# Builds dataclasses straight from the parser's event stream, without composing YAML node graph and
+# constructing plain dicts and lists of the whole document first.
+#
+# Collections are built bottom-up. Once a mapping or sequence ends and its target type (from field
+# annotations) is a dataclass, list or dict, it's converted right away and its raw container is dropped,
+# so only the output graph and the currently open collections are alive. The result is stored in the
+# parent as ConvertedValue, parent conversion takes it as is. Errors are stored as well, and surface only
+# when conversion of parent reaches them, so which error is reported and where is the same as without
+# streaming. Collections under Union, Any, unknown fields and anchors stay raw and are converted by parent.
+#
+# Locations are taken at the same points of the event stream LineLoader takes them.
+
+
+_MERGE_TAG = 'tag:yaml.org,2002:merge'
+_VALUE_TAG = 'tag:yaml.org,2002:value'
+
+_FAST_SCALAR_TAGS = (
+    'tag:yaml.org,2002:str', 'tag:yaml.org,2002:int', 'tag:yaml.org,2002:float', 'tag:yaml.org,2002:bool',
+    'tag:yaml.org,2002:null', 'tag:yaml.org,2002:timestamp', RAW_SCALAR_TAG
+)
+
+_CONVERTED_KINDS = (ETypeKind.Dataclass, ETypeKind.List, ETypeKind.Dict)
+
+_PENDING = object()
+
+
+def _unwrap_optional(plan:TypePlan) -> TypePlan:
+    while plan.kind == ETypeKind.Optional:
+        plan = plan.args[0]
+    return plan
+
+
+class _Frame:
+    __slots__ = ('is_mapping', 'value', 'location', 'field_locations', 'start_mark', 'merges', 'anchor',
+        'key', 'key_text', 'key_mark', 'key_is_merge', 'key_location',
+        'annotation', 'plan', 'entry_top', 'inner_top', 'field_name', 'field_loc', 'tracked')
+
+    def __init__(self, is_mapping:bool, location:YamlSourceLocation, start_mark):
+        self.is_mapping = is_mapping
+        self.value = {} if is_mapping else []
+        self.location = location
+        self.field_locations = {} if is_mapping else None
+        self.start_mark = start_mark
+        self.merges = None
+        # Anchor of the collection, registered again once it ends, merge keys replace its value
+        self.anchor = None
+        self.key = _PENDING
+        self.key_text = ''
+        self.key_mark = None
+        self.key_is_merge = False
+        self.key_location = None
+        # Set when the collection is converted once it ends, 'plan' is also used to find types of items
+        self.annotation = None
+        self.plan = None
+        self.entry_top = None
+        self.inner_top = None
+        self.field_name = ''
+        self.field_loc = None
+        self.tracked = False
+
+
+class EventStreamBuilder:
+    def __init__(self, loader:LineLoader, context:DataclassVisitorContext):
+        self.loader = loader
+        self.context = context
+        self.anchors : Dict[str, Any] = {}
+        self.anchor_marks : Dict[str, Any] = {}
+        self._convert_seconds = 0.0
+        self._field_maps : Dict[int, dict] = {}
+        self._scalar_constructors = { tag : loader.yaml_constructors[tag] for tag in _FAST_SCALAR_TAGS if tag in loader.yaml_constructors }
+
+    def load(self, clazz:type):
+        profiler = self.context.profiler
+        parse_start = profiler.clock() if profiler is not None else 0.0
+        self._convert_seconds = 0.0
+
+        loader = self.loader
+        loader.get_event()
+
+        root = None
+        if not loader.check_event(StreamEndEvent):
+            loader.get_event()
+            root_mark = loader.peek_event().start_mark
+            root = self._build(get_type_plan(clazz, self.context.ext_types))
+            loader.get_event()
+            self.anchors = {}
+            self.anchor_marks = {}
+
+            if not loader.check_event(StreamEndEvent):
+                event = loader.get_event()
+                raise ComposerError("expected a single document in the stream", root_mark, "but found another document", event.start_mark)
+        loader.get_event()
+
+        # Parse time is what's left after collections converted on the way
+        if profiler is not None:
+            profiler.record_parse(profiler.clock() - parse_start - self._convert_seconds)
+
+        self.context.location_stack = []
+        return DictToDataclass(clazz, root, self.context)
+
+    def _field_map(self, plan:TypePlan) -> dict:
+        result = self._field_maps.get(id(plan), None)
+        if result is None:
+            result = self._field_maps[id(plan)] = { f.name : f for f in plan.fields }
+        return result
+
+    # Same loop as LineLoader.compose_node, so reader position is sampled at the same points
+    def _build(self, root_plan:TypePlan):
+        loader = self.loader
+        stack = []
+        value = self._begin_node(None, stack, root_plan)
+
+        while len(stack) > 0:
+            frame = stack[-1]
+
+            if value is not _PENDING:
+                self._add(frame, value)
+                value = _PENDING
+
+            if frame.is_mapping and frame.key is not _PENDING:
+                value = self._begin_node(frame, stack)
+
+            elif loader.check_event(MappingEndEvent if frame.is_mapping else SequenceEndEvent):
+                loader.get_event()
+                stack.pop()
+                value = self._finish(frame)
+
+            else:
+                value = self._begin_node(frame, stack)
+
+        return value
+
+    def _begin_node(self, parent:Optional[_Frame], stack:list, root_plan:Optional[TypePlan]=None):
+        loader = self.loader
+        line = loader.line
+        column = loader.column
+        is_key = parent is not None and parent.is_mapping and parent.key is _PENDING
+
+        if loader.check_event(AliasEvent):
+            event = loader.get_event()
+            anchor = event.anchor
+            if anchor not in self.anchors:
+                if anchor not in loader.anchors:
+                    raise ComposerError(None, None, "found undefined alias %r" % anchor, event.start_mark)
+                self.anchors[anchor] = loader.construct_document(loader.anchors[anchor])
+            value = self.anchors[anchor]
+            if is_key:
+                self._begin_key(parent, str(value), event.start_mark, line, column)
+            return value
+
+        event = loader.peek_event()
+        anchor = event.anchor
+        if anchor is not None and anchor in self.anchors:
+            raise ComposerError("found duplicate anchor %r; first occurrence" % anchor,
+                self.anchor_marks[anchor], "second occurrence", event.start_mark)
+        if anchor is not None:
+            self.anchor_marks[anchor] = event.start_mark
+
+        if isinstance(event, ScalarEvent):
+            loader.get_event()
+            tag = event.tag
+            if tag is None or tag == '!':
+                tag = loader.resolve(ScalarNode, event.value, event.implicit)
+
+            if is_key:
+                self._begin_key(parent, event.value, event.start_mark, line, column)
+                if tag == _MERGE_TAG:
+                    parent.key_is_merge = True
+                    return None
+                if tag == _VALUE_TAG or tag == RAW_SCALAR_TAG:
+                    tag = BaseResolver.DEFAULT_SCALAR_TAG
+
+            value = self._construct_scalar(tag, event)
+            if anchor is not None:
+                self.anchors[anchor] = value
+            return value
+
+        if is_key:
+            self._begin_key(parent, '', event.start_mark, line, column)
+
+        tag = event.tag
+        if tag is not None and tag != '!' and tag not in (BaseResolver.DEFAULT_MAPPING_TAG, BaseResolver.DEFAULT_SEQUENCE_TAG):
+            # Explicitly tagged collections, like !!set, are left to PyYAML
+            value = loader.construct_document(loader.compose_node(None, None))
+            if anchor is not None:
+                self.anchors[anchor] = value
+            return value
+
+        loader.get_event()
+        frame = _Frame(isinstance(event, MappingStartEvent), YamlSourceLocation(line + 1, column + 1), event.start_mark)
+        if anchor is not None:
+            # Aliased collections may be loaded as different types, they're always converted by parent
+            self.anchors[anchor] = frame.value
+            frame.anchor = anchor
+        elif root_plan is not None:
+            self._setup_root(frame, root_plan)
+        elif parent is not None and not is_key:
+            self._setup_child(parent, frame)
+
+        stack.append(frame)
+        return _PENDING
+
+    def _construct_scalar(self, tag:str, event):
+        node = ScalarNode(tag, event.value, event.start_mark, event.end_mark, style=event.style)
+        constructor = self._scalar_constructors.get(tag, None)
+        if constructor is not None:
+            return constructor(self.loader, node)
+        value = self.loader.construct_object(node, deep=True)
+        self.loader.constructed_objects.pop(node, None)
+        return value
+
+    # Location of key is stored under its text, as LineLoader does
+    def _begin_key(self, frame:_Frame, key_text:str, mark, line:int, column:int):
+        frame.key_text = key_text
+        frame.key_is_merge = False
+        frame.key_mark = mark
+        frame.key_location = YamlSourceLocation(line + 1, column + 1)
+
+    def _add(self, frame:_Frame, value):
+        if not frame.is_mapping:
+            frame.value.append(value)
+            return
+
+        if frame.key is _PENDING:
+            frame.key = value
+            return
+
+        key = frame.key
+        frame.key = _PENDING
+        frame.field_locations[frame.key_text] = frame.key_location
+
+        if frame.key_is_merge:
+            if frame.merges is None:
+                frame.merges = []
+            if isinstance(value, dict):
+                frame.merges.append(value)
+            elif isinstance(value, list) and all(isinstance(item, dict) for item in value):
+                frame.merges.extend(reversed(value))
+            else:
+                raise ConstructorError("while constructing a mapping", frame.start_mark,
+                    "expected a mapping or list of mappings for merging, but found %s" % type(value).__name__, frame.key_mark)
+            return
+
+        try:
+            frame.value[key] = value
+        except TypeError as err:
+            raise ConstructorError("while constructing a mapping", frame.start_mark, "found unhashable key (%s)" % err, frame.key_mark)
+
+    def _finish(self, frame:_Frame):
+        value = frame.value
+        if not frame.is_mapping:
+            return self._convert(frame, value)
+
+        if frame.merges is not None:
+            # Same precedence as SafeConstructor.flatten_mapping, own keys first, then earlier merged mappings
+            merged = {}
+            for source in frame.merges:
+                source_locations = source.get('__yaml_field_location__', None)
+                for key, item in source.items():
+                    if type(key) is str and is_field_hidden(key):
+                        continue
+                    merged[key] = item
+                    if source_locations is not None and key in source_locations:
+                        frame.field_locations.setdefault(key, source_locations[key])
+            merged.update(value)
+            value = merged
+
+        value['__yaml_field_location__'] = frame.field_locations
+        value['__yaml_location__'] = frame.location
+        if frame.anchor is not None:
+            self.anchors[frame.anchor] = value
+        return self._convert(frame, value)
+
+    def _convert(self, frame:_Frame, value):
+        if frame.annotation is None:
+            return value
+
+        context = self.context
+        profiler = context.profiler
+        convert_start = profiler.clock() if profiler is not None else 0.0
+        context.location_stack = [ frame.entry_top ] if frame.entry_top is not None else []
+        try:
+            return ConvertedValue(YamlToObject(frame.annotation, value, context, frame.field_name, frame.field_loc))
+        except Exception as err:
+            return ConvertedValue(None, err)
+        finally:
+            if profiler is not None:
+                self._convert_seconds += profiler.clock() - convert_start
+
+    def _setup_root(self, frame:_Frame, plan:TypePlan):
+        # Root is converted by DictToDataclass without location frame of its own
+        plan = _unwrap_optional(plan)
+        if frame.is_mapping and plan.kind == ETypeKind.Dataclass and plan.inline is None:
+            frame.plan = plan
+            frame.inner_top = self._dataclass_top(frame) if self._is_tracked(frame, plan) else None
+
+    def _setup_child(self, parent:_Frame, frame:_Frame):
+        parent_plan = parent.plan
+        if parent_plan is None:
+            return
+
+        field_name = ''
+        field_loc = None
+        if parent.is_mapping:
+            if parent.key_is_merge:
+                return
+            if parent_plan.kind == ETypeKind.Dict:
+                child_plan = parent_plan.args[1]
+            else:
+                field = self._field_map(parent_plan).get(parent.key, None)
+                if field is None:
+                    return
+                # Columnar fields are built from parsed rows by the parent, without instance per row
+                columnar_fields = get_class_traits(parent_plan.clazz).columnar_fields
+                if columnar_fields is not None and field.name in columnar_fields:
+                    return
+                child_plan = field.plan
+                field_name = field.name
+                if parent.tracked:
+                    field_loc = YamlSourceTracker.yaml_to_src(parent.key_location, self.context)
+            annotation = child_plan.clazz if parent_plan.kind == ETypeKind.Dict else field.field.type
+        else:
+            child_plan = parent_plan.args[0]
+            annotation = child_plan.clazz
+
+        plan = _unwrap_optional(child_plan)
+        if plan.kind not in _CONVERTED_KINDS:
+            return
+
+        frame.annotation = annotation
+        frame.entry_top = parent.inner_top
+        frame.field_name = field_name
+        frame.field_loc = field_loc
+
+        # Location frames YamlToObject would have on top while converting items of this collection
+        if frame.is_mapping and plan.kind == ETypeKind.Dataclass and plan.inline is None:
+            frame.plan = plan
+            frame.tracked = self._is_tracked(frame, plan)
+            frame.inner_top = self._dataclass_top(frame) if frame.tracked else YamlLocationFrame(frame.location)
+        elif frame.is_mapping and plan.kind == ETypeKind.Dict:
+            frame.plan = plan
+            frame.inner_top = YamlLocationFrame(frame.location)
+        elif not frame.is_mapping and plan.kind == ETypeKind.List:
+            frame.plan = plan
+            frame.inner_top = field_loc if field_loc is not None else frame.entry_top
+
+    def _is_tracked(self, frame:_Frame, plan:TypePlan) -> bool:
+        if self.context.always_track_source:
+            ensure_source_tracked(plan.clazz)
+        frame.tracked = get_class_traits(plan.clazz).source_tracked
+        return frame.tracked
+
+    def _dataclass_top(self, frame:_Frame):
+        return YamlSourceTracker.from_inline(YamlSourceTracker.yaml_to_src(frame.location, self.context), self.context)
+
+
+def load_from_events(loader:LineLoader, clazz:type, context:DataclassVisitorContext):
+    return EventStreamBuilder(loader, context).load(clazz)
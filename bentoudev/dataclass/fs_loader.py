@@ -0,0 +1,153 @@
+from typing import Dict, Iterator, Optional, Tuple, Any, Union
+import hashlib
+from yaml import MarkedYAMLError
+
+from bentoudev.dataclass.base import DataclassLoadError, EErrorFormat, Source, SourceTracker, assign_loaded_from_file
+from bentoudev.dataclass.line_loader import LineLoader
+from bentoudev.dataclass.yaml_loader import YamlDocument, is_obj_dict, load_yaml_dataclass
+
+
+def _open_filesystem(fs):
+    if isinstance(fs, str):
+        import fs as pyfs
+        return pyfs.open_fs(fs)
+    return fs
+
+
+def read_fs_text(fs, path:str, encoding:str='utf-8') -> str:
+    # Single bulk read, archives (ZipFS, TarFS) decompress entry in one go instead of line by line
+    return fs.readbytes(path).decode(encoding)
+
+
+# Copy of parsed tree, for each include site. Locations and scalars are shared, they aren't changed by loaders.
+def _copy_tree(tree):
+    if not isinstance(tree, (dict, list)):
+        return tree
+    root = [ tree ]
+    stack = [ (root, 0) ]
+    while len(stack) > 0:
+        container, slot = stack.pop()
+        value = container[slot]
+        if isinstance(value, dict):
+            value = container[slot] = dict(value)
+            stack.extend((value, key) for key, item in value.items() if isinstance(item, (dict, list)))
+        elif isinstance(value, list):
+            value = container[slot] = list(value)
+            stack.extend((value, idx) for idx, item in enumerate(value) if isinstance(item, (dict, list)))
+    return root[0]
+
+
+# Resolves !include tags of documents loaded from one filesystem.
+# Included file is parsed once per session, cached by its path and content hash, so fragments shared
+# by many documents (or included several times by one) aren't parsed again. Included mappings are
+# also converted once per target type (except lazy loads). Every include site gets its own copy
+# of parsed tree and of converted value, so they can be changed independently.
+# Paths are relative to including file, locations in included files point at them in errors.
+# Sessions aren't thread safe, use one per thread.
+class IncludeSession:
+    def __init__(self, fs:Union[str, Any], *, encoding:str='utf-8', error_format:EErrorFormat=EErrorFormat.Pretty, error_code_snippet_lines:int=4):
+        self.fs = _open_filesystem(fs)
+        self.encoding = encoding
+        self.error_format = error_format
+        self.error_code_snippet_lines = error_code_snippet_lines
+        self.parse_count = 0
+        # (path, content hash, loader type) -> parsed tree
+        self._trees : Dict[tuple, Any] = {}
+        # (load options, id of custom type loaders) -> (type loaders, converted fragments by (fragment, type)).
+        # Type loaders are kept alive with their fragments, so their id can't be reused by another dict.
+        self._conversions : Dict[tuple, Tuple[Optional[dict], dict]] = {}
+
+    def close(self):
+        self.fs.close()
+
+    def setup_loader(self, loader:LineLoader, path:str, content:str, chain:tuple=()):
+        loader.document = YamlDocument(path, content)
+        loader.includes = self
+        loader.include_chain = chain + (self.resolve_path('/', path),)
+
+    def get_conversion_cache(self, options:tuple, type_cache:Optional[dict]=None) -> dict:
+        key = options + (id(type_cache),)
+        entry = self._conversions.get(key, None)
+        if entry is None:
+            entry = self._conversions[key] = (type_cache, {})
+        return entry[1]
+
+    def resolve_path(self, including:str, path:str) -> str:
+        import fs.path as fspath
+        if not fspath.isabs(path):
+            path = fspath.join(fspath.dirname(including), path)
+        return fspath.normpath(fspath.abspath(path))
+
+    def include(self, loader:LineLoader, path:str, node) -> Any:
+        resolved = self.resolve_path(loader.document.filename, path)
+        if resolved in loader.include_chain:
+            cycle = ' -> '.join(loader.include_chain + (resolved,))
+            raise DataclassLoadError.from_source(f"Include cycle: {cycle}", self._node_source(loader, node), self.error_format)
+
+        import fs.errors
+        try:
+            data = self.fs.readbytes(resolved)
+        except fs.errors.FSError as err:
+            raise DataclassLoadError.from_source(f"Unable to include '{resolved}': {err}", self._node_source(loader, node), self.error_format)
+
+        key = (resolved, hashlib.sha1(data).hexdigest(), type(loader))
+        tree = self._trees.get(key, None)
+        if tree is None:
+            tree = self._parse(type(loader), resolved, data.decode(self.encoding), loader.include_chain)
+            if is_obj_dict(type(tree)):
+                # Identifies fragment in conversion caches
+                tree['__yaml_include__'] = key
+            self._trees[key] = tree
+        return _copy_tree(tree)
+
+    def _parse(self, loader_type:type, path:str, content:str, chain:tuple) -> Any:
+        self.parse_count += 1
+        loader = loader_type(content)
+        self.setup_loader(loader, path, content, chain)
+        try:
+            return loader.get_single_data()
+        except MarkedYAMLError as err:
+            raise DataclassLoadError.from_source(err.problem, Source(
+                err.problem_mark.line, err.problem_mark.column, err.problem_mark.get_snippet(), path
+            ), self.error_format)
+        finally:
+            loader.dispose()
+
+    def _node_source(self, loader:LineLoader, node) -> Source:
+        document = loader.document
+        line = node.start_mark.line + 1
+        snippet = SourceTracker.build_code_snippet(document.get_yaml_line, line, self.error_code_snippet_lines)
+        return Source(line, node.start_mark.column, '\n'.join(snippet), document.filename)
+
+    # Loads file at 'path' of session's filesystem, keyword arguments are passed to load_yaml_dataclass
+    def load(self, clazz:type, path:str, **kwargs) -> Any:
+        path = self.resolve_path('/', path)
+        yaml_content = read_fs_text(self.fs, path, self.encoding)
+        return load_yaml_dataclass(clazz, path, yaml_content, includes=self, **kwargs)
+
+
+# Walks PyFilesystem2 filesystem (or FS url) and lazily yields (path, object) for each file matching 'glob'.
+# Files are read in place, so archives don't have to be extracted. Objects of classes decorated with
+# @loaded_from_file get their path assigned. Keyword arguments are passed to load_yaml_dataclass.
+# !include tags are resolved by 'session' (one for the whole walk when not given), except for streaming loads.
+def load_yaml_dataclass_from_fs(fs:Union[str, Any], glob:str, clazz:type, *, encoding:str='utf-8', session:Optional[IncludeSession]=None,
+        **kwargs) -> Iterator[Tuple[str, Any]]:
+    filesystem = _open_filesystem(fs)
+    if session is None and not kwargs.get('streaming', False):
+        session = IncludeSession(filesystem, encoding=encoding,
+            error_format=kwargs.get('error_format', EErrorFormat.Pretty), error_code_snippet_lines=kwargs.get('error_code_snippet_lines', 4))
+
+    try:
+        for match in filesystem.glob(glob):
+            if match.info.is_dir:
+                continue
+
+            path = match.path
+            yaml_content = read_fs_text(filesystem, path, encoding)
+
+            result = load_yaml_dataclass(clazz, path, yaml_content, includes=session, **kwargs)
+            yield path, assign_loaded_from_file(result, path)
+    finally:
+        # Only close filesystems we have opened ourselves
+        if filesystem is not fs:
+            filesystem.close()
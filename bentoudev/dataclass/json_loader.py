@@ -0,0 +1,69 @@
+from typing import Optional
+import json
+import json.decoder
+import json.scanner
+
+from bentoudev.dataclass.profiling import LoadProfiler
+from bentoudev.dataclass.base import DataclassLoadError, EErrorFormat, LineIndex, Source, SourceTracker
+from bentoudev.dataclass.yaml_loader import DictToDataclass, YamlSourceLocation, create_visitor_context
+
+
+# Decoder producing the same location entries as LineLoader, so results go through the yaml validation path.
+# Uses pure python scanner, as C one doesn't allow hooking into objects.
+class LocatingJSONDecoder(json.JSONDecoder):
+    def __init__(self, line_index:LineIndex):
+        super().__init__()
+        self.line_index = line_index
+        self.parse_object = self._parse_object
+        self.scan_once = json.scanner.py_make_scanner(self)
+
+    def _parse_object(self, s_and_end, strict, scan_once, object_hook, object_pairs_hook, memo=None):
+        s, start = s_and_end
+        value_starts = []
+
+        def scan_value(string, idx):
+            value_starts.append(idx)
+            return scan_once(string, idx)
+
+        pairs, end = json.decoder.JSONObject(s_and_end, strict, scan_value, None, list, memo)
+
+        location = self.line_index.location
+        field_locations = {}
+        result = {}
+        for (key, value), value_start in zip(pairs, value_starts):
+            # Key ends at the last ':' before its value
+            key_line, key_column = location(s.rfind(':', start, value_start))
+            field_locations[key] = YamlSourceLocation(key_line, key_column)
+            result[key] = value
+
+        result['__yaml_field_location__'] = field_locations
+        result['__yaml_location__'] = YamlSourceLocation(*location(start - 1))
+        return result, end
+
+
+def load_json_dataclass(clazz:type, label:str, json_content:str, *, type_cache:Optional[dict]=None, ext_types:list=[],
+        error_format:EErrorFormat=EErrorFormat.Pretty, always_track_source:bool=False, error_code_snippet_lines:int=4,
+        track_locations:bool=True, profiler:Optional[LoadProfiler]=None, lazy:bool=False, parallel=None):
+    context = create_visitor_context(label, json_content, type_cache=type_cache, ext_types=ext_types, error_format=error_format,
+        always_track_source=always_track_source, error_code_snippet_lines=error_code_snippet_lines, profiler=profiler, lazy=lazy,
+        parallel=parallel)
+    context.string_keys = True
+
+    parse_start = profiler.clock() if profiler is not None else 0.0
+    try:
+        if track_locations:
+            loaded_json = LocatingJSONDecoder(LineIndex(json_content)).decode(json_content)
+        else:
+            # Fastest path, C parser without locations, errors point at the closest tracked location
+            loaded_json = json.loads(json_content)
+
+    except json.JSONDecodeError as err:
+        snippet = SourceTracker.build_code_snippet(context.get_yaml_line, err.lineno, error_code_snippet_lines)
+        raise DataclassLoadError.from_source(err.msg, Source(
+            err.lineno, err.colno, '\n'.join(snippet), label
+        ), error_format)
+
+    if profiler is not None:
+        profiler.record_parse(profiler.clock() - parse_start)
+
+    return DictToDataclass(clazz, loaded_json, context)
@@ -1,10 +1,14 @@
 import dataclasses
-from bentoudev.dataclass.base import get_type_name, is_clazz_list, is_enum
-import typing_inspect
-from typing import List, Dict, Tuple, TypeVar, Union, Any
+import json
+import os
+from bentoudev.dataclass.base import get_type_name, is_clazz_list, is_enum, is_forward_ref, is_optional_type, is_union_type
+from typing import Iterator, List, Dict, Tuple, TypeVar, Union, Any, get_args
 from abc import ABC, abstractmethod
 
 
+JSON_SCHEMA_DIALECT = "https://json-schema.org/draft/2020-12/schema"
+
+
 class DataclassJsonSchema(dict):
     pass
 
@@ -77,6 +81,10 @@ class BuilderContext:
     handlers: List[Handler]
     ext_types: List[TypeVar]
 
+    # Where references to dataclass definitions point to, and whether definitions are keyed by module qualified name
+    ref_prefix: str
+    qualified_names: bool
+
     _handler_stack: List[Handler]
 
     def __init__(self) -> None:
@@ -84,6 +92,15 @@ class BuilderContext:
         self.handlers = []
         self._handler_stack = []
         self.ext_types = []
+        self.ref_prefix = '#/$defs/'
+        self.qualified_names = False
+
+    def def_name(self, clazz:type) -> str:
+        return get_type_name(clazz) if self.qualified_names else clazz.__name__
+
+    def def_ref(self, clazz:type) -> str:
+        # Escaped as JSON pointer token
+        return self.ref_prefix + self.def_name(clazz).replace('~', '~0').replace('/', '~1')
 
     def _ensure_no_recurse(self, handler:Handler):
         if not handler.can_recurse() and handler in self._handler_stack:
@@ -106,7 +123,7 @@ class BuilderContext:
     def handle_dataclass(self, clazz:type):
         # Prevent recursion, allow class to reference itself
         schema = self.find_dataclass_schema(clazz)
-        ref = { '$ref' : f'#/$defs/{clazz.__name__}' }
+        ref = { '$ref' : self.def_ref(clazz) }
         if schema is not None:
             return ref
 
@@ -119,7 +136,7 @@ class BuilderContext:
 
         clazz_fields = list(dataclasses.fields(clazz))
         for field in clazz_fields:
-            if not typing_inspect.is_optional_type(field.type):
+            if not is_optional_type(field.type):
                 required.append(field.name)
 
             field_schema = self.handle_type(field.type)
@@ -142,7 +159,7 @@ class BuilderContext:
                 self._handler_stack.pop()
                 return result
 
-        if typing_inspect.is_forward_ref(clazz):
+        if is_forward_ref(clazz):
             for t in self.ext_types:
                 if get_type_name(t) == clazz.__forward_arg__:
                     return self.handle_type(t)
@@ -189,10 +206,10 @@ class AnyHandler(Handler):
 
 class UnionHandler(Handler):
     def condition(self, clazz: type) -> bool:
-        return typing_inspect.is_union_type(clazz)
+        return is_union_type(clazz)
 
     def handle(self, ctx: BuilderContext, clazz: type) -> Dict:
-        return ctx.anyOf(typing_inspect.get_args(clazz, evaluate=True))
+        return ctx.anyOf(get_args(clazz))
 
 
 # Allows enums to be set by their values names.
@@ -209,13 +226,13 @@ class EnumHandler(Handler):
 # Ommits nulls from schema, so that optional fields are either not present at all or have value.
 class NoNullHandler(Handler):
     def condition(self, clazz: type) -> bool:
-        return typing_inspect.is_optional_type(clazz)
+        return is_optional_type(clazz)
 
     def _build_union(self, *args):
         return Union[ args ]
 
     def handle(self, ctx: BuilderContext, clazz: type) -> Dict:
-        subtypes: List[type] = [ i for i in typing_inspect.get_args(clazz, evaluate=True) ]
+        subtypes: List[type] = [ i for i in get_args(clazz) ]
         for idx, t in enumerate(subtypes):
             if t is type(None):
                 del subtypes[idx]
@@ -244,8 +261,8 @@ class InlineListHandler(Handler):
         return self._deconstruct_two(cop)
 
     def condition(self, clazz: type) -> bool:
-        if typing_inspect.is_union_type(clazz):
-            subtypes = typing_inspect.get_args(clazz, evaluate=True)
+        if is_union_type(clazz):
+            subtypes = get_args(clazz)
             # Union[T, List[T]]
             if len(subtypes) == 2:
                 typ, typ_lst = self._deconstruct_two(subtypes)
@@ -273,8 +290,8 @@ class InlineListHandler(Handler):
         }
 
     def handle(self, ctx: BuilderContext, clazz: type) -> Dict:
-        if typing_inspect.is_union_type(clazz):
-            subtypes = typing_inspect.get_args(clazz, evaluate=True)
+        if is_union_type(clazz):
+            subtypes = get_args(clazz)
             if len(subtypes) == 2:
                 typ, _ = self._deconstruct_two(subtypes)
                 return self._any_of_inline(ctx, typ)
@@ -290,8 +307,8 @@ class InlineListHandler(Handler):
 
 
 # Order of handlers matters! Handlers are evaluated in order, first satisfied condition wins
-def build_json_schema(clazz:type, *, ext_types:list=[], ext_handlers:List[Handler]=[]):
-    handler_registry = [
+def default_handlers() -> List[Handler]:
+    return [
         NoNullHandler(),
         InlineListHandler(),
         UnionHandler(),
@@ -300,19 +317,88 @@ def build_json_schema(clazz:type, *, ext_types:list=[], ext_handlers:List[Handle
         AnyHandler(),
     ]
 
+
+def build_json_schema(clazz:type, *, ext_types:list=[], ext_handlers:List[Handler]=[]):
     ctx = BuilderContext()
-    ctx.handlers = ext_handlers + handler_registry
+    ctx.handlers = ext_handlers + default_handlers()
     ctx.ext_types = ext_types
     main_schema = ctx.handle_type(clazz)
 
     # Fill references
     defs = {}
     for c, schema in ctx.dataclazzes.items():
-        defs[c.__name__] = schema
+        defs[ctx.def_name(c)] = schema
     main_schema['$defs'] = defs
 
     # Default schema fields
-    main_schema["$schema"] = "https://json-schema.org/draft/2020-12/schema"
+    main_schema["$schema"] = JSON_SCHEMA_DIALECT
     main_schema["title"] = clazz.__name__
 
     return main_schema
+
+
+@dataclasses.dataclass
+class JsonSchemaBundle:
+    # Shared document with all dataclass definitions, keyed by module qualified name
+    definitions: dict
+    # Thin schema per root class, referencing definitions
+    roots: Dict[type, dict]
+    defs_file: str
+
+    @staticmethod
+    def root_file(clazz:type) -> str:
+        return f'{get_type_name(clazz)}.schema.json'
+
+    # (file name, schema) pairs, definitions first
+    def files(self) -> Iterator[Tuple[str, dict]]:
+        yield self.defs_file, self.definitions
+        for clazz, schema in self.roots.items():
+            yield self.root_file(clazz), schema
+
+
+def _rebase_refs(schema, prefix:str):
+    if isinstance(schema, dict):
+        for key, value in schema.items():
+            if key == '$ref' and isinstance(value, str) and value.startswith('#'):
+                schema[key] = prefix + value
+            else:
+                _rebase_refs(value, prefix)
+    elif isinstance(schema, list):
+        for value in schema:
+            _rebase_refs(value, prefix)
+    return schema
+
+
+# Walks all roots in one context, so shared classes are visited once and end up in single definitions document.
+# Root schemas only reference definitions in 'defs_file', which is expected next to them.
+def build_json_schema_bundle(roots:List[type], *, ext_types:list=[], ext_handlers:List[Handler]=[],
+        defs_file:str='defs.schema.json') -> JsonSchemaBundle:
+    ctx = BuilderContext()
+    ctx.handlers = ext_handlers + default_handlers()
+    ctx.ext_types = ext_types
+    ctx.qualified_names = True
+
+    root_schemas = {}
+    for clazz in roots:
+        root_schema = _rebase_refs(ctx.handle_type(clazz), defs_file)
+        root_schema["$schema"] = JSON_SCHEMA_DIALECT
+        root_schema["title"] = clazz.__name__
+        root_schemas[clazz] = root_schema
+
+    definitions = {
+        "$schema" : JSON_SCHEMA_DIALECT,
+        "$defs" : { ctx.def_name(c) : schema for c, schema in ctx.dataclazzes.items() },
+    }
+    return JsonSchemaBundle(definitions, root_schemas, defs_file)
+
+
+# Writes schemas one file at a time, returns written paths
+def write_json_schema_bundle(bundle:JsonSchemaBundle, directory:str, *, indent:int=None) -> List[str]:
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for name, schema in bundle.files():
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(schema, f, indent=indent)
+        written.append(path)
+    return written
@@ -0,0 +1,182 @@
+from typing import List, Optional, Sequence, Tuple, Union
+from yaml import MarkedYAMLError
+
+from bentoudev.dataclass.base import DataclassLoadError, EErrorFormat, EListMerge, ListMergeOptions, Source, SourceTracker, get_list_merge
+from bentoudev.dataclass.line_loader import LineLoader, RawLineLoader
+from bentoudev.dataclass.profiling import LoadProfiler
+from bentoudev.dataclass.type_plan import ETypeKind, TypePlan, get_type_plan
+from bentoudev.dataclass.yaml_loader import DictToDataclass, YamlDocument, create_visitor_context, is_field_hidden, is_obj_dict, is_obj_list
+
+
+# Loads several layers of the same document (base, environment, region...) into one dataclass.
+# Parsed trees are deep merged first, later layers override earlier ones, and merged tree is validated and converted once.
+# Mappings are merged key by key, lists by strategy (field's list_merge metadata or 'list_merge'), anything else is replaced.
+# Every location remembers the layer it was parsed from, so errors and source trackers point at the layer a value came from.
+
+
+def _unwrap_optional(plan:Optional[TypePlan]) -> Optional[TypePlan]:
+    while plan is not None and plan.kind == ETypeKind.Optional:
+        plan = plan.args[0]
+    return plan
+
+
+# Plan of value under 'key' of mapping with 'plan', and list merge options declared on the field
+def _mapping_child(plan:Optional[TypePlan], key) -> Tuple[Optional[TypePlan], Optional[ListMergeOptions]]:
+    if plan is None:
+        return None, None
+    if plan.kind == ETypeKind.Dataclass and plan.inline is None:
+        field = plan.field_plan(key) if type(key) is str else None
+        if field is None:
+            return None, None
+        return _unwrap_optional(field.plan), get_list_merge(field.field)
+    if plan.kind == ETypeKind.Dict:
+        return _unwrap_optional(plan.args[1]), None
+    return None, None
+
+
+def _list_item_plan(plan:Optional[TypePlan]) -> Optional[TypePlan]:
+    if plan is not None and plan.kind == ETypeKind.List:
+        return _unwrap_optional(plan.args[0])
+    return None
+
+
+class LayerMerger:
+    def __init__(self, list_merge:ListMergeOptions, *, error_format:EErrorFormat=EErrorFormat.Pretty, error_code_snippet_lines:int=4):
+        self.list_merge = list_merge
+        self.error_format = error_format
+        self.error_code_snippet_lines = error_code_snippet_lines
+
+    # Merged value, parts of 'base' which are changed are copied, so anchored values shared in base stay intact
+    def merge(self, base, overlay, plan:Optional[TypePlan]):
+        root = [ base ]
+        # (container, key or index, base value, overlay value, plan of value, list merge options)
+        tasks = [ (root, 0, base, overlay, plan, None) ]
+        while len(tasks) > 0:
+            container, slot, base_value, overlay_value, value_plan, options = tasks.pop()
+
+            if is_obj_dict(type(base_value)) and is_obj_dict(type(overlay_value)):
+                container[slot] = self._merge_mapping(base_value, overlay_value, value_plan, tasks)
+            elif is_obj_list(type(base_value)) and is_obj_list(type(overlay_value)):
+                # Location of the field holding the list, for items without their own
+                list_loc = container.get('__yaml_field_location__', {}).get(slot, None) if is_obj_dict(type(container)) else None
+                container[slot] = self._merge_list(base_value, overlay_value, value_plan, options or self.list_merge, list_loc, tasks)
+            else:
+                container[slot] = overlay_value
+        return root[0]
+
+    def _merge_mapping(self, base:dict, overlay:dict, plan:Optional[TypePlan], tasks:list) -> dict:
+        result = dict(base)
+        base_locations = base.get('__yaml_field_location__', None)
+        overlay_locations = overlay.get('__yaml_field_location__', None)
+        if base_locations is not None and overlay_locations is not None:
+            # Overridden keys point at the layer their value comes from
+            result['__yaml_field_location__'] = { **base_locations, **overlay_locations }
+
+        for key, value in overlay.items():
+            # Locations are merged above, other hidden keys are ignored by loaders anyway
+            if type(key) is str and is_field_hidden(key):
+                continue
+
+            if key in result:
+                child_plan, options = _mapping_child(plan, key)
+                tasks.append((result, key, result[key], value, child_plan, options))
+            else:
+                result[key] = value
+        return result
+
+    def _merge_list(self, base:list, overlay:list, plan:Optional[TypePlan], options:ListMergeOptions, list_loc, tasks:list) -> list:
+        strategy = options.strategy
+        if strategy == EListMerge.Replace:
+            return overlay
+        if strategy == EListMerge.Append:
+            return base + overlay
+
+        key = options.key
+        item_plan = _list_item_plan(plan)
+        result = list(base)
+        positions = {}
+        for idx, item in enumerate(result):
+            positions.setdefault(self._merge_key(item, key, list_loc), idx)
+
+        for item in overlay:
+            idx = positions.get(self._merge_key(item, key, list_loc), None)
+            if idx is None:
+                result.append(item)
+            else:
+                tasks.append((result, idx, result[idx], item, item_plan, None))
+        return result
+
+    # Items of lists merged by key must be mappings with hashable value under the key
+    def _merge_key(self, item, key:str, list_loc):
+        if not is_obj_dict(type(item)) or key not in item:
+            raise DataclassLoadError.from_source(f"List item merged by key has no key '{key}'", self._item_source(item, None, list_loc), self.error_format)
+
+        value = item[key]
+        try:
+            hash(value)
+        except TypeError:
+            raise DataclassLoadError.from_source(f"Got unhashable '{type(value).__name__}' as merge key '{key}' of list item", self._item_source(item, key, list_loc), self.error_format)
+        return value
+
+    # Location of item's key, item itself or field holding its list, which remembers the layer it was parsed from
+    def _item_source(self, item, key:Optional[str], list_loc) -> Source:
+        loc = None
+        if is_obj_dict(type(item)):
+            loc = item.get('__yaml_field_location__', {}).get(key, None) if key is not None else None
+            loc = loc or item.get('__yaml_location__', None)
+        loc = loc or list_loc
+        if loc is None or loc.document is None:
+            return Source(0, 0, '', '')
+
+        document = loc.document
+        snippet = SourceTracker.build_code_snippet(document.get_yaml_line, loc.line, self.error_code_snippet_lines)
+        return Source(loc.line, loc.column, '\n'.join(snippet), document.filename)
+
+
+def _as_layer(layer:Union[str, Tuple[str, str]], idx:int) -> Tuple[str, str]:
+    if isinstance(layer, str):
+        return f'<layer {idx}>', layer
+    return layer
+
+
+# 'layers' are YAML contents, or (label, content) pairs, from the base one to the most specific one.
+# 'list_merge' is used for lists without list_merge metadata on their field.
+def load_layered_yaml_dataclass(clazz:type, layers:Sequence[Union[str, Tuple[str, str]]], *, list_merge:Union[EListMerge, ListMergeOptions]=EListMerge.Replace,
+        type_cache:Optional[dict]=None, ext_types:list=[], error_format:EErrorFormat=EErrorFormat.Pretty, always_track_source:bool=False,
+        error_code_snippet_lines:int=4, profiler:Optional[LoadProfiler]=None, raw_scalars:bool=False):
+    labeled : List[Tuple[str, str]] = [ _as_layer(layer, idx) for idx, layer in enumerate(layers) ]
+    if len(labeled) == 0:
+        raise ValueError("At least one layer is required")
+
+    options = list_merge if isinstance(list_merge, ListMergeOptions) else ListMergeOptions(list_merge)
+    merger = LayerMerger(options, error_format=error_format, error_code_snippet_lines=error_code_snippet_lines)
+    plan = _unwrap_optional(get_type_plan(clazz, ext_types))
+
+    parse_start = profiler.clock() if profiler is not None else 0.0
+    merged = None
+    for label, content in labeled:
+        loader_type = RawLineLoader if raw_scalars else LineLoader
+        loader = loader_type(content, YamlDocument(label, content))
+        try:
+            loaded_yaml = loader.get_single_data()
+        except MarkedYAMLError as err:
+            raise DataclassLoadError.from_source(err.problem, Source(
+                err.problem_mark.line, err.problem_mark.column, err.problem_mark.get_snippet(), label
+            ), error_format)
+        finally:
+            loader.dispose()
+
+        # Empty layers don't change anything
+        if loaded_yaml is None:
+            continue
+        merged = loaded_yaml if merged is None else merger.merge(merged, loaded_yaml, plan)
+
+    if profiler is not None:
+        profiler.record_parse(profiler.clock() - parse_start)
+
+    # Locations without layer (none from parsed layers) point at the last one
+    label, content = labeled[-1]
+    context = create_visitor_context(label, content, type_cache=type_cache, ext_types=ext_types, error_format=error_format,
+        always_track_source=always_track_source, error_code_snippet_lines=error_code_snippet_lines, profiler=profiler,
+        raw_scalars=raw_scalars)
+    return DictToDataclass(clazz, merged, context)
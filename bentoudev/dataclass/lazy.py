@@ -0,0 +1,136 @@
+from typing import Any, Callable, Dict
+import dataclasses
+import threading
+
+
+_LAZY_BASE_ATTR = '__lazy_base__'
+_LAZY_PENDING_ATTR = '__lazy_pending__'
+
+
+# Non-data descriptor, once the value is converted it's stored in instance __dict__ and shadows the descriptor
+class _LazyField:
+    __slots__ = ('name',)
+
+    def __init__(self, name:str):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        pending : Dict[str, Callable[[], Any]] = obj.__dict__[_LAZY_PENDING_ATTR]
+        # Concurrent first access may convert twice, both results are equal and only one is kept
+        convert = pending.get(self.name, None)
+        if convert is None:
+            return obj.__dict__[self.name]
+        value = convert()
+        obj.__dict__[self.name] = value
+        pending.pop(self.name, None)
+        return value
+
+
+_LAZY_TYPES : Dict[type, type] = {}
+_LAZY_TYPES_LOCK = threading.Lock()
+
+
+def is_lazy(obj):
+    clazz = obj if isinstance(obj, type) else type(obj)
+    return _LAZY_BASE_ATTR in clazz.__dict__
+
+
+def get_lazy_base(obj):
+    clazz = obj if isinstance(obj, type) else type(obj)
+    return clazz.__dict__.get(_LAZY_BASE_ATTR, clazz)
+
+
+# Classes which can't be constructed field by field are loaded eagerly
+def supports_lazy(clazz:type):
+    if '__slots__' in clazz.__dict__ or hasattr(clazz, '__post_init__'):
+        return False
+    return dataclasses.is_dataclass(clazz)
+
+
+def _make_lazy_type(clazz:type) -> type:
+    clazz_fields = dataclasses.fields(clazz)
+    compared = [ f.name for f in clazz_fields if f.compare ]
+
+    def __eq__(self, other):
+        if get_lazy_base(other) is not clazz:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in compared)
+
+    members = { f.name : _LazyField(f.name) for f in clazz_fields }
+    members[_LAZY_BASE_ATTR] = clazz
+    # Generated __eq__ requires exactly the same class, lazy and eager instances should still compare equal
+    if clazz.__dataclass_params__.eq:
+        members['__eq__'] = __eq__
+        members['__hash__'] = clazz.__hash__
+    members['__module__'] = clazz.__module__
+    members['__qualname__'] = clazz.__qualname__
+    return type(clazz.__name__, (clazz,), members)
+
+
+# Subclass of dataclass, with every field replaced by descriptor converting it on first access
+def get_lazy_type(clazz:type) -> type:
+    lazy_type = _LAZY_TYPES.get(clazz, None)
+    if lazy_type is None:
+        with _LAZY_TYPES_LOCK:
+            lazy_type = _LAZY_TYPES.get(clazz, None)
+            if lazy_type is None:
+                lazy_type = _LAZY_TYPES[clazz] = _make_lazy_type(clazz)
+    return lazy_type
+
+
+# Creates instance without calling __init__, 'values' are already converted, 'deferred' are converted when accessed.
+# Returns None if some field has neither value nor default, so caller can report it the same way as eager load.
+def create_lazy_instance(clazz:type, values:Dict[str, Any], deferred:Dict[str, Callable[[], Any]]):
+    lazy_type = get_lazy_type(clazz)
+    obj = lazy_type.__new__(lazy_type)
+    state = obj.__dict__
+
+    for field in dataclasses.fields(clazz):
+        name = field.name
+        if name in values:
+            state[name] = values[name]
+        elif name in deferred:
+            continue
+        elif field.default is not dataclasses.MISSING:
+            state[name] = field.default
+        elif field.default_factory is not dataclasses.MISSING:
+            state[name] = field.default_factory()
+        elif field.init:
+            return None
+
+    state[_LAZY_PENDING_ATTR] = dict(deferred)
+    return obj
+
+
+def is_pending(obj, field_name:str):
+    if not is_lazy(obj):
+        return False
+    return field_name in obj.__dict__[_LAZY_PENDING_ATTR]
+
+
+# Converts and validates every pending field of the graph, raising first load error. Returns the same object.
+def force(obj):
+    stack = [obj]
+    visited = set()
+
+    while len(stack) > 0:
+        value = stack.pop()
+
+        if isinstance(value, (list, tuple)):
+            stack.extend(value)
+
+        elif isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+
+        elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+            if id(value) in visited:
+                continue
+            visited.add(id(value))
+            for field in dataclasses.fields(value):
+                if hasattr(value, field.name):
+                    stack.append(getattr(value, field.name))
+
+    return obj
@@ -0,0 +1,164 @@
+from typing import Optional
+from yaml.composer import Composer, ComposerError
+from yaml.constructor import Constructor, ConstructorError, SafeConstructor
+from yaml.events import AliasEvent, ScalarEvent, MappingStartEvent, MappingEndEvent, SequenceEndEvent
+from yaml.nodes import ScalarNode, MappingNode, SequenceNode
+from yaml.resolver import BaseResolver, Resolver
+from yaml.loader import SafeLoader
+
+from bentoudev.dataclass.yaml_loader import RawScalar, YamlDocument, YamlSourceLocation
+
+
+_PENDING_KEY = object()
+
+
+class LineLoader(SafeLoader):
+    def __init__(self, stream, document:Optional[YamlDocument]=None):
+        super(LineLoader, self).__init__(stream)
+        # Stored in every location, when document isn't the one conversion context has
+        self.document = document
+        # Resolves !include tags, set by include session (see fs_loader.IncludeSession), along with paths of files including this one
+        self.includes = None
+        self.include_chain = ()
+
+    # Same as Composer.compose_node, but collections are composed with explicit stack instead of recursion,
+    # so deeply nested documents don't hit recursion limit. Frames are [node, is_mapping, index or pending key].
+    def compose_node(self, parent, index):
+        stack = []
+        node = self._begin_node(parent, index, stack)
+
+        while len(stack) > 0:
+            frame = stack[-1]
+            collection, is_mapping = frame[0], frame[1]
+
+            if node is not None:
+                if not is_mapping:
+                    collection.value.append(node)
+                    frame[2] += 1
+                elif frame[2] is _PENDING_KEY:
+                    frame[2] = node
+                else:
+                    collection.value.append((frame[2], node))
+                    frame[2] = _PENDING_KEY
+                node = None
+
+            if is_mapping and frame[2] is not _PENDING_KEY:
+                node = self._begin_node(collection, frame[2], stack)
+
+            elif self.check_event(MappingEndEvent if is_mapping else SequenceEndEvent):
+                end_event = self.get_event()
+                collection.end_mark = end_event.end_mark
+                self.ascend_resolver()
+                stack.pop()
+                node = collection
+
+            else:
+                node = self._begin_node(collection, None if is_mapping else frame[2], stack)
+
+        return node
+
+    # Returns finished node, or pushes frame of collection that still needs its items
+    def _begin_node(self, parent, index, stack: list):
+        line = self.line
+        column = self.column
+
+        if self.check_event(AliasEvent):
+            node = Composer.compose_node(self, parent, index)
+
+        else:
+            event = self.peek_event()
+            anchor = event.anchor
+            if anchor is not None and anchor in self.anchors:
+                raise ComposerError("found duplicate anchor %r; first occurrence" % anchor,
+                        self.anchors[anchor].start_mark, "second occurrence", event.start_mark)
+
+            self.descend_resolver(parent, index)
+
+            if self.check_event(ScalarEvent):
+                node = self.compose_scalar_node(anchor)
+                self.ascend_resolver()
+
+            else:
+                start_event = self.get_event()
+                is_mapping = isinstance(start_event, MappingStartEvent)
+                node_type = MappingNode if is_mapping else SequenceNode
+
+                tag = start_event.tag
+                if tag is None or tag == '!':
+                    tag = self.resolve(node_type, None, start_event.implicit)
+
+                node = node_type(tag, [], start_event.start_mark, None, flow_style=start_event.flow_style)
+                if anchor is not None:
+                    self.anchors[anchor] = node
+
+                stack.append([node, is_mapping, _PENDING_KEY if is_mapping else 0])
+
+        node.__line__ = line + 1
+        node.__column__ = column + 1
+
+        if len(stack) > 0 and stack[-1][0] is node:
+            return None
+        return node
+
+    def construct_mapping(self, node, deep=False):
+        # Merge keys are resolved first, so merged keys are located where they are defined
+        self.flatten_mapping(node)
+        node_pair_lst = node.value
+        locations = {}
+
+        for key_node, _ in node_pair_lst:
+            if hasattr(key_node, '__line__'):
+                locations[key_node.value] = YamlSourceLocation(key_node.__line__, key_node.__column__, self.document)
+
+        location_node_name = ScalarNode(tag=BaseResolver.DEFAULT_SCALAR_TAG, value='__yaml_field_location__')
+        location_node_value = ScalarNode(tag=BaseResolver.DEFAULT_SCALAR_TAG, value=locations)
+
+        node_pair_lst.append((location_node_name, location_node_value))
+        node.value = node_pair_lst
+
+        mapping = Constructor.construct_mapping(self, node, deep=deep)
+        mapping['__yaml_location__'] = YamlSourceLocation(node.__line__, node.__column__, self.document)
+
+        return mapping
+
+    def construct_include(self, node):
+        if self.includes is None:
+            raise ConstructorError(None, None, "!include is supported only when loading with include session, see fs_loader.IncludeSession", node.start_mark)
+        return self.includes.include(self, str(self.construct_scalar(node)), node)
+
+
+LineLoader.add_constructor('!include', LineLoader.construct_include)
+
+
+RAW_SCALAR_TAG = 'tag:bentoudev.dataclass:raw'
+
+_PLAIN_RESOLVER = Resolver()
+_PLAIN_CONSTRUCTOR = SafeConstructor()
+
+
+# Tag and value SafeLoader would give to plain scalar. Constructors are called directly, construct_object would keep every node.
+def resolve_plain_scalar(value:str):
+    value = str(value)
+    tag = _PLAIN_RESOLVER.resolve(ScalarNode, value, (True, False))
+    return SafeConstructor.yaml_constructors[tag](_PLAIN_CONSTRUCTOR, ScalarNode(tag, value))
+
+
+# Plain scalars skip implicit resolvers (bool, int, float, null, timestamp regexes), they're loaded as RawScalar
+# and parsed by field type they are loaded into. Merge keys are still resolved, and mapping keys are plain strings.
+class RawLineLoader(LineLoader):
+    def resolve(self, kind, value, implicit):
+        if kind is ScalarNode and implicit[0] and value != '<<':
+            return RAW_SCALAR_TAG
+        return super().resolve(kind, value, implicit)
+
+    def construct_raw_scalar(self, node):
+        return RawScalar(node.value)
+
+    def construct_mapping(self, node, deep=False):
+        for key_node, _ in node.value:
+            if key_node.tag == RAW_SCALAR_TAG:
+                key_node.tag = BaseResolver.DEFAULT_SCALAR_TAG
+        return super().construct_mapping(node, deep=deep)
+
+
+RawLineLoader.add_constructor(RAW_SCALAR_TAG, RawLineLoader.construct_raw_scalar)
@@ -0,0 +1,273 @@
+from typing import Any, List, Optional, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import os
+
+from bentoudev.dataclass.base import DataclassLoadError, ensure_source_tracked
+from bentoudev.dataclass.type_plan import ETypeKind, get_type_plan
+from bentoudev.dataclass.yaml_loader import (DataclassVisitorContext, YamlDocument, YamlLocationFrame, YamlSourceLocation, YamlToObject,
+    YamlToScalar, is_obj_dict, is_obj_list)
+
+
+# Converts large lists and dicts of an already parsed document in chunks on an executor.
+# With thread pool chunks share parsed data and run with forked context, which pays off on free-threaded builds.
+# With process pool each chunk is sent with settings and only the document lines its errors can point at,
+# converted values are sent back. Results are put back in document order. Each chunk stops at its first error,
+# same as sequential conversion does, errors of all failed chunks are merged into single DataclassLoadError in chunk order.
+# Collections nested inside a chunk are converted sequentially, so workers never wait for each other.
+# Load waiting for its chunks converts the ones no worker has started itself, so it may run on the same thread pool.
+
+
+# Collections shorter than this are converted sequentially
+DEFAULT_MIN_ITEMS = 2048
+# Smallest chunk worth scheduling, when size isn't given
+MIN_CHUNK_SIZE = 256
+# Chunks per worker, more chunks even out uneven items at the cost of scheduling
+CHUNKS_PER_WORKER = 4
+
+
+class _LineRange:
+    __slots__ = ('first', 'lines', 'total')
+
+    # Lines 'first'..'first + len(lines)' of document with 'total' lines, others read as empty
+    def __init__(self, first:int, lines:List[str], total:int):
+        self.first = first
+        self.lines = lines
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, line:int) -> str:
+        idx = line - self.first
+        if 0 <= idx < len(self.lines):
+            return self.lines[idx]
+        return ''
+
+
+class _ChunkTask:
+    __slots__ = ('key_type', 'value_type', 'items', 'context')
+
+    # 'key_type' is None for list items, otherwise items are (key, value) pairs
+    def __init__(self, key_type:Optional[type], value_type:type, items:list, context:DataclassVisitorContext):
+        self.key_type = key_type
+        self.value_type = value_type
+        self.items = items
+        self.context = context
+
+
+def _convert_chunk(task:_ChunkTask) -> Tuple[Optional[list], Optional[DataclassLoadError]]:
+    context = task.context
+    value_type = task.value_type
+    result = []
+    try:
+        if task.key_type is None:
+            for item in task.items:
+                result.append(YamlToObject(value_type, item, context))
+        else:
+            for key, value in task.items:
+                result.append((YamlToScalar(task.key_type, key, context), YamlToObject(value_type, value, context)))
+    except DataclassLoadError as err:
+        return None, err
+    return result, None
+
+
+def _trim_lines(yaml_lines, first:int, last:int, snippet_lines:int) -> _LineRange:
+    if first < 0:
+        return _LineRange(0, [], len(yaml_lines))
+    start = max(0, first - 1 - snippet_lines)
+    return _LineRange(start, list(yaml_lines[start:last]), len(yaml_lines))
+
+
+class _ChunkLocations:
+    # Copies locations of items sent to another process. Documents they point at (included or layered files)
+    # are replaced by ones holding only lines these locations can point at, so chunks don't carry whole files.
+    def __init__(self):
+        self.copies = {}
+        # Document (None for the loaded one) -> [ first line, last line ]
+        self.ranges = {}
+
+    def copy(self, location:YamlSourceLocation) -> YamlSourceLocation:
+        copied = self.copies.get(id(location), None)
+        if copied is None:
+            copied = self.copies[id(location)] = YamlSourceLocation(location.line, location.column, location.document)
+            lines = self.ranges.get(location.document, None)
+            if lines is None:
+                self.ranges[location.document] = [ location.line, location.line ]
+            else:
+                lines[0] = min(lines[0], location.line)
+                lines[1] = max(lines[1], location.line)
+        return copied
+
+    def copy_fields(self, field_locations:Optional[dict]) -> Optional[dict]:
+        if field_locations is None:
+            return None
+        return { name : self.copy(loc) for name, loc in field_locations.items() }
+
+    # Copy of parsed value with its locations replaced, scalars are shared
+    def copy_tree(self, tree:Any) -> Any:
+        root = [ tree ]
+        stack = [ (root, 0) ]
+        while len(stack) > 0:
+            container, slot = stack.pop()
+            value = container[slot]
+            if is_obj_dict(type(value)):
+                value = container[slot] = dict(value)
+                location = value.get('__yaml_location__', None)
+                if location is not None:
+                    value['__yaml_location__'] = self.copy(location)
+                    if '__yaml_field_location__' in value:
+                        value['__yaml_field_location__'] = self.copy_fields(value['__yaml_field_location__'])
+                stack.extend((value, key) for key, item in value.items() if isinstance(item, (dict, list)))
+            elif is_obj_list(type(value)):
+                value = container[slot] = list(value)
+                stack.extend((value, idx) for idx, item in enumerate(value) if isinstance(item, (dict, list)))
+        return root[0]
+
+    # Lines of loaded document locations can point at, other documents are replaced by trimmed copies
+    def trim_documents(self, yaml_lines, snippet_lines:int) -> _LineRange:
+        first, last = self.ranges.get(None, (-1, -1))
+        documents = {}
+        for document, (doc_first, doc_last) in self.ranges.items():
+            if document is not None:
+                trimmed = documents[document] = YamlDocument(document.filename, '')
+                trimmed.yaml_lines = _trim_lines(document.yaml_lines, doc_first, doc_last, snippet_lines)
+        for copied in self.copies.values():
+            if copied.document is not None:
+                copied.document = documents[copied.document]
+        return _trim_lines(yaml_lines, first, last, snippet_lines)
+
+
+def _instrument_tracked_classes(clazz:type, ext_types:list):
+    # Instances come back from other processes, their classes must be instrumented here as well
+    visited = set()
+    plans = [ get_type_plan(clazz, ext_types) ]
+    while len(plans) > 0:
+        plan = plans.pop()
+        if id(plan) in visited:
+            continue
+        visited.add(id(plan))
+        if plan.kind == ETypeKind.Dataclass:
+            if plan.inline is None:
+                ensure_source_tracked(plan.clazz)
+            else:
+                plans.append(plan.inline.plan)
+            plans.extend(f.plan for f in plan.fields)
+        plans.extend(plan.args)
+
+
+class ParallelConversion:
+    def __init__(self, executor:Executor, *, min_items:int=DEFAULT_MIN_ITEMS, chunk_size:Optional[int]=None,
+            max_workers:Optional[int]=None, processes:Optional[bool]=None):
+        if min_items < 1:
+            raise ValueError(f"min_items must be at least 1, got '{min_items}'")
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError(f"chunk_size must be at least 1, got '{chunk_size}'")
+
+        self.executor = executor
+        self.min_items = min_items
+        self.chunk_size = chunk_size
+        # Only stdlib pools are known to keep their size there, other executors must be told
+        if max_workers is None and isinstance(executor, (ThreadPoolExecutor, ProcessPoolExecutor)):
+            max_workers = executor._max_workers
+        if max_workers is None and chunk_size is None:
+            raise ValueError(f"Number of workers of '{type(executor).__name__}' is unknown, pass max_workers or chunk_size")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.processes = processes if processes is not None else isinstance(executor, ProcessPoolExecutor)
+
+    def get_chunk_size(self, count:int) -> int:
+        if self.chunk_size is not None:
+            return self.chunk_size
+        chunks = self.max_workers * CHUNKS_PER_WORKER
+        return max(MIN_CHUNK_SIZE, -(-count // chunks))
+
+    def convert_list(self, item_type:type, items:list, context:DataclassVisitorContext) -> list:
+        result = []
+        for chunk in self._run(None, item_type, items, context):
+            result.extend(chunk)
+        return result
+
+    # 'entries' are (key, value) pairs, with keys already coerced when format has string keys
+    def convert_dict(self, key_type:type, value_type:type, entries:list, context:DataclassVisitorContext) -> dict:
+        result = {}
+        for chunk in self._run(key_type, value_type, entries, context):
+            result.update(chunk)
+        return result
+
+    # Context and items chunk is converted with
+    def _chunk_task(self, key_type:Optional[type], value_type:type, items:list, context:DataclassVisitorContext) -> _ChunkTask:
+        chunk_context = context.fork()
+        # Nested collections are converted sequentially within the chunk
+        chunk_context.parallel = None
+        if not self.processes:
+            return _ChunkTask(key_type, value_type, items, chunk_context)
+
+        # Sent to another process, so only what conversion of the chunk can reach is kept
+        locations = _ChunkLocations()
+        if key_type is None:
+            items = [ locations.copy_tree(item) for item in items ]
+        else:
+            items = [ (key, locations.copy_tree(value)) for key, value in items ]
+        if len(chunk_context.location_stack) > 0 and isinstance(chunk_context.location_stack[-1], YamlLocationFrame):
+            frame = chunk_context.location_stack[-1]
+            chunk_context.location_stack = [ YamlLocationFrame(locations.copy(frame.location), locations.copy_fields(frame.field_locations)) ]
+
+        chunk_context.yaml_lines = locations.trim_documents(context.yaml_lines, context.code_snippet_lines)
+        chunk_context.yaml_content = ''
+        chunk_context.profiler = None
+        # Events can't be sent to other processes, chunks already submitted run to the end
+        chunk_context.cancel = None
+        chunk_context.lazy = False
+        # Included fragments are converted again by the chunk, caches of the session stay in this process
+        chunk_context.conversion_cache = None
+        chunk_context.converting_includes = None
+        return _ChunkTask(key_type, value_type, items, chunk_context)
+
+    def _run(self, key_type:Optional[type], value_type:type, items:list, context:DataclassVisitorContext) -> List[list]:
+        if self.processes and context.always_track_source:
+            _instrument_tracked_classes(value_type, context.ext_types)
+
+        size = self.get_chunk_size(len(items))
+        futures = []
+        tasks = []
+        try:
+            for start in range(0, len(items), size):
+                task = self._chunk_task(key_type, value_type, items[start:start + size], context)
+                tasks.append(task)
+                futures.append(self.executor.submit(_convert_chunk, task))
+
+            results = []
+            errors = []
+            for future, task in zip(futures, tasks):
+                # Chunk no worker has started yet is converted here. Load may run on the same thread pool,
+                # waiting for chunks queued behind it would never end when all workers wait the same way.
+                if not self.processes and future.cancel():
+                    chunk_result, err = _convert_chunk(task)
+                else:
+                    chunk_result, err = future.result()
+                if err is not None:
+                    errors.append(err)
+                else:
+                    results.append(chunk_result)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        if len(errors) == 1:
+            raise errors[0]
+        if len(errors) > 1:
+            raise DataclassLoadError.from_exception_list(
+                msg=f"Failed to convert {len(errors)} of {len(futures)} chunk(s) of {len(items)} item(s)",
+                src=context.get_location_source(),
+                excs=errors,
+                format=context.error_format
+            )
+        return results
+
+
+def as_parallel_conversion(parallel) -> Optional[ParallelConversion]:
+    if parallel is None or isinstance(parallel, ParallelConversion):
+        return parallel
+    if isinstance(parallel, Executor):
+        return ParallelConversion(parallel)
+    raise TypeError(f"Expected Executor or ParallelConversion, got '{type(parallel)}'")
@@ -0,0 +1,452 @@
+from typing import IO, Callable, Iterator, List, Optional, Sequence, Tuple, Union
+import codecs
+import io
+import re
+
+from yaml import MarkedYAMLError
+from yaml.events import AliasEvent, CollectionStartEvent, CollectionEndEvent, MappingStartEvent, MappingEndEvent, ScalarEvent, SequenceStartEvent, SequenceEndEvent, StreamEndEvent
+from yaml.nodes import MappingNode, ScalarNode, SequenceNode
+from yaml.resolver import BaseResolver
+
+from bentoudev.dataclass.profiling import LoadProfiler
+from bentoudev.dataclass.base import DataclassLoadError, EErrorFormat, Source
+from bentoudev.dataclass.type_plan import ETypeKind, TypePlan, get_type_plan
+from bentoudev.dataclass.line_loader import RAW_SCALAR_TAG, LineLoader, RawLineLoader
+from bentoudev.dataclass.yaml_loader import (DataclassVisitorContext, YamlLocationFrame, YamlSourceLocation, YamlToObject, YamlToScalar,
+    coerce_string_key, create_visitor_context, is_field_hidden)
+
+
+_MERGE_TAG = 'tag:yaml.org,2002:merge'
+
+
+PathStep = Union[str, int]
+
+_PATH_STEP = re.compile(r'''(?:^|\.)([^.\[\]'"]+)|\[(\d+)\]|\[(['"])(.*?)\3\]''')
+
+
+# Parses 'services[3].endpoints' or 'limits["key.with.dots"]' into ['services', 3, 'endpoints']
+def parse_path(path:str) -> List[PathStep]:
+    steps = []
+    pos = 0
+    while pos < len(path):
+        match = _PATH_STEP.match(path, pos)
+        if match is None or match.end() == pos:
+            raise ValueError(f"Invalid path '{path}' at position {pos}")
+        if match.group(1) is not None:
+            steps.append(match.group(1))
+        elif match.group(2) is not None:
+            steps.append(int(match.group(2)))
+        else:
+            steps.append(match.group(4))
+        pos = match.end()
+    return steps
+
+
+def _format_path(steps:Sequence[PathStep]):
+    result = ''
+    for step in steps:
+        if type(step) is int:
+            result += f'[{step}]'
+        else:
+            result += f'.{step}' if len(result) > 0 else step
+    return result
+
+
+def _type_label(clazz):
+    return getattr(clazz, '__name__', str(clazz))
+
+
+def _unwrap_optional(plan:TypePlan) -> TypePlan:
+    while plan.kind == ETypeKind.Optional:
+        plan = plan.args[0]
+    return plan
+
+
+# Resolves type at path from field annotations, before anything is parsed.
+# Returns plan of every step's container and the target plan.
+def resolve_path_plan(clazz:type, steps:Sequence[PathStep], ext_types:list=[]) -> Tuple[List[TypePlan], TypePlan]:
+    plan = get_type_plan(clazz, ext_types)
+    containers = []
+
+    for idx, step in enumerate(steps):
+        container = _unwrap_optional(plan)
+        where = _format_path(steps[:idx]) or _type_label(clazz)
+
+        if container.kind == ETypeKind.Dataclass and container.inline is None:
+            if type(step) is not str:
+                raise ValueError(f"Can't index '{where}' with [{step}], it's dataclass '{container.clazz.__name__}'")
+            field_plan = container.field_plan(step)
+            if field_plan is None:
+                raise ValueError(f"Class '{container.clazz.__name__}' at '{where}' has no field '{step}'")
+            plan = field_plan.plan
+
+        elif container.kind == ETypeKind.List:
+            if type(step) is not int:
+                raise ValueError(f"Can't select '{step}' from list at '{where}', expected an index")
+            plan = container.args[0]
+
+        elif container.kind == ETypeKind.Dict:
+            plan = container.args[1]
+
+        elif container.kind == ETypeKind.Unresolved:
+            raise ValueError(f"Unable to resolve type '{container.clazz}' at '{where}', missing ext_types?")
+
+        else:
+            raise ValueError(f"Can't select '{step}' from '{where}' of type '{container.clazz}'")
+
+        containers.append(container)
+
+    return containers, plan
+
+
+def _event_location(event) -> YamlSourceLocation:
+    return YamlSourceLocation(event.start_mark.line + 1, event.start_mark.column + 1)
+
+
+# Skips node without composing it. Nodes with anchors are composed, so aliases in selected subtree still resolve.
+def _skip_node(loader:LineLoader):
+    depth = 0
+    while True:
+        event = loader.peek_event()
+        if not isinstance(event, (AliasEvent, CollectionEndEvent)) and event.anchor is not None:
+            loader.compose_node(None, None)
+        else:
+            loader.get_event()
+            if isinstance(event, CollectionStartEvent):
+                depth += 1
+            elif isinstance(event, CollectionEndEvent):
+                depth -= 1
+        if depth == 0:
+            return
+
+
+def _step_matches(key:str, step:PathStep):
+    return key == (step if type(step) is str else str(step))
+
+
+def _merged_sources(merges:list) -> list:
+    # Values of << keys, from the one with highest precedence. Later keys override earlier ones, first mapping of a list wins.
+    sources = []
+    for merge in reversed(merges):
+        sources.extend(merge.value if isinstance(merge, SequenceNode) else [ merge ])
+    return sources
+
+
+# Value node and key location of 'step' in composed mappings, searched in order of precedence.
+# Keys merged with << are found the same way SafeConstructor.flatten_mapping merges them, own keys first.
+def _find_in_mappings(nodes:list, step:PathStep):
+    pending = list(reversed(nodes))
+    while len(pending) > 0:
+        node = pending.pop()
+        if not isinstance(node, MappingNode):
+            continue
+        merges = []
+        # Duplicate keys are overridden by the last one
+        for key_node, value_node in reversed(node.value):
+            if key_node.tag == _MERGE_TAG:
+                merges.insert(0, value_node)
+            elif isinstance(key_node, ScalarNode) and hasattr(key_node, '__line__') and _step_matches(key_node.value, step):
+                return value_node, YamlSourceLocation(key_node.__line__, key_node.__column__)
+        pending.extend(reversed(_merged_sources(merges)))
+    return None, None
+
+
+# Moves parser to value at step. Returns (None, location of key or item) when parser is at the value,
+# (node, location) when value comes from merged mapping and is already composed, and (None, None) when there is no such value.
+def _enter_step(loader:LineLoader, container:TypePlan, step:PathStep):
+    event = loader.peek_event()
+
+    if isinstance(event, MappingStartEvent) and container.kind != ETypeKind.List:
+        loader.get_event()
+        merges = []
+        while not loader.check_event(MappingEndEvent):
+            key_event = loader.peek_event()
+            if isinstance(key_event, ScalarEvent):
+                if loader.resolve(ScalarNode, key_event.value, key_event.implicit) == _MERGE_TAG and key_event.tag in (None, '!'):
+                    _skip_node(loader)
+                    merges.append(loader.compose_node(None, None))
+                    continue
+                if _step_matches(key_event.value, step):
+                    location = _event_location(key_event)
+                    _skip_node(loader)
+                    return None, location
+            _skip_node(loader)
+            _skip_node(loader)
+        # Own keys override merged ones, so merged mappings are searched only once whole mapping is read
+        return _find_in_mappings(_merged_sources(merges), step)
+
+    if isinstance(event, SequenceStartEvent) and container.kind == ETypeKind.List:
+        loader.get_event()
+        idx = 0
+        while not loader.check_event(SequenceEndEvent):
+            if idx == step:
+                return None, _event_location(loader.peek_event())
+            _skip_node(loader)
+            idx += 1
+        return None, None
+
+    # Single value loaded as list of one element, same as YamlToObject does
+    if container.kind == ETypeKind.List and step == 0 and not isinstance(event, SequenceStartEvent):
+        return None, _event_location(event)
+
+    return None, None
+
+
+# Fallback for aliases on the path, their nodes are already composed
+def _enter_node_step(node, container:TypePlan, step:PathStep):
+    if isinstance(node, MappingNode) and container.kind != ETypeKind.List:
+        return _find_in_mappings([ node ], step)
+
+    if isinstance(node, SequenceNode) and container.kind == ETypeKind.List:
+        if step < len(node.value):
+            item = node.value[step]
+            return item, YamlSourceLocation(item.__line__, item.__column__)
+        return None, None
+
+    if container.kind == ETypeKind.List and step == 0 and not isinstance(node, SequenceNode):
+        return node, YamlSourceLocation(node.__line__, node.__column__)
+
+    return None, None
+
+
+# Moves parser to value at 'steps'. Returns its node when an alias was on the path, and location of the last key or item.
+def _navigate(loader:LineLoader, steps:Sequence[PathStep], containers:List[TypePlan], raise_not_found:Callable):
+    loader.get_event()
+    if loader.check_event(StreamEndEvent):
+        raise_not_found(0, None)
+    loader.get_event()
+
+    node = None
+    location = None
+    for idx, step in enumerate(steps):
+        if node is None and loader.check_event(AliasEvent):
+            node = loader.compose_node(None, None)
+
+        if node is None:
+            container_location = _event_location(loader.peek_event())
+            node, location = _enter_step(loader, containers[idx], step)
+        else:
+            container_location = YamlSourceLocation(node.__line__, node.__column__)
+            node, location = _enter_node_step(node, containers[idx], step)
+
+        if location is None:
+            raise_not_found(idx, container_location)
+
+    return node, location
+
+
+def _not_found_raiser(steps:Sequence[PathStep], context:DataclassVisitorContext):
+    def raise_not_found(step_idx:int, location:Optional[YamlSourceLocation]):
+        loc_src = context.get_location_source()
+        if location is not None:
+            loc_src = YamlLocationFrame(location).get_source(context)
+        raise DataclassLoadError.from_source(f"No value at path '{_format_path(steps[:step_idx + 1])}'", loc_src, context.error_format)
+    return raise_not_found
+
+
+def _raise_yaml_error(err:MarkedYAMLError, label:str, error_format:EErrorFormat):
+    raise DataclassLoadError.from_source(err.problem, Source(
+        err.problem_mark.line, err.problem_mark.column, err.problem_mark.get_snippet(), label
+    ), error_format)
+
+
+# Loads and validates only the subtree at 'path', with type resolved from annotations of 'clazz'.
+# Unrelated parts of the document are skipped on the event level, and nothing after the subtree is parsed.
+def load_yaml_dataclass_at(clazz:type, label:str, yaml_content:str, path:Union[str, Sequence[PathStep]], *,
+        type_cache:Optional[dict]=None, ext_types:list=[], error_format:EErrorFormat=EErrorFormat.Pretty,
+        always_track_source:bool=False, error_code_snippet_lines:int=4, profiler:Optional[LoadProfiler]=None, lazy:bool=False,
+        raw_scalars:bool=False):
+    steps = parse_path(path) if isinstance(path, str) else list(path)
+    containers, target = resolve_path_plan(clazz, steps, ext_types)
+
+    context = create_visitor_context(label, yaml_content, type_cache=type_cache, ext_types=ext_types, error_format=error_format,
+        always_track_source=always_track_source, error_code_snippet_lines=error_code_snippet_lines, profiler=profiler, lazy=lazy,
+        raw_scalars=raw_scalars)
+
+    try:
+        parse_start = profiler.clock() if profiler is not None else 0.0
+        loader = RawLineLoader(yaml_content) if raw_scalars else LineLoader(yaml_content)
+        try:
+            node, location = _navigate(loader, steps, containers, _not_found_raiser(steps, context))
+            if node is None:
+                node = loader.compose_node(None, None)
+            loaded_yaml = loader.construct_document(node)
+        finally:
+            loader.dispose()
+
+        if profiler is not None:
+            profiler.record_parse(profiler.clock() - parse_start)
+
+        # Errors of scalar targets point at their key
+        if location is not None:
+            context.push_location(YamlLocationFrame(location))
+        return YamlToObject(target.clazz, loaded_yaml, context)
+
+    except MarkedYAMLError as err:
+        _raise_yaml_error(err, label, error_format)
+
+
+# Lines of streamed document for error snippets. Only lines from the current item on are kept.
+class _LineWindow:
+    def __init__(self):
+        self.first = 0
+        self.lines : List[str] = []
+        self.partial = ''
+        self._decoder = None
+
+    def feed(self, data):
+        if isinstance(data, bytes):
+            if self._decoder is None:
+                self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            data = self._decoder.decode(data, final=len(data) == 0)
+        if len(data) == 0:
+            return
+        parts = (self.partial + data).split('\n')
+        self.partial = parts.pop()
+        self.lines.extend(part[:-1] if part.endswith('\r') else part for part in parts)
+
+    def drop_before(self, line:int):
+        count = min(line - self.first, len(self.lines))
+        if count > 0:
+            del self.lines[:count]
+            self.first += count
+
+    def __len__(self):
+        return self.first + len(self.lines) + (1 if len(self.partial) > 0 else 0)
+
+    def __getitem__(self, line:int) -> str:
+        idx = line - self.first
+        if idx < 0:
+            return ''
+        if idx < len(self.lines):
+            return self.lines[idx]
+        return self.partial
+
+
+# Feeds parser in chunks, recording lines read so far
+class _RecordingStream:
+    def __init__(self, source, window:_LineWindow):
+        self.source = source
+        self.window = window
+        self.pos = 0
+        self.name = getattr(source, 'name', '<unicode string>')
+
+    def read(self, size:int=-1):
+        if isinstance(self.source, str):
+            end = len(self.source) if size < 0 else self.pos + size
+            data = self.source[self.pos:end]
+            self.pos += len(data)
+        else:
+            data = self.source.read(size)
+        self.window.feed(data)
+        return data
+
+
+def _item_location(loader:LineLoader) -> YamlSourceLocation:
+    return _event_location(loader.peek_event())
+
+
+def _construct_key(loader:LineLoader, key_node):
+    if key_node.tag == RAW_SCALAR_TAG:
+        key_node.tag = BaseResolver.DEFAULT_SCALAR_TAG
+    return loader.construct_document(key_node)
+
+
+def _iter_items(loader:LineLoader, window:_LineWindow, context:DataclassVisitorContext, steps:List[PathStep],
+        containers:List[TypePlan], collection:TypePlan, label:str):
+    is_list = collection.kind == ETypeKind.List
+    item_type = collection.args[0].clazz if is_list else collection.args[1].clazz
+    key_type = None if is_list else collection.args[0].clazz
+
+    def convert(value_type, raw, location:YamlSourceLocation):
+        context.location_stack = [ YamlLocationFrame(location) ]
+        return YamlToObject(value_type, raw, context)
+
+    def convert_key(key, location:YamlSourceLocation):
+        if context.string_keys and key_type is not str:
+            key = coerce_string_key(key)
+        context.location_stack = [ YamlLocationFrame(location) ]
+        return YamlToScalar(key_type, key, context)
+
+    try:
+        try:
+            node, location = _navigate(loader, steps, containers, _not_found_raiser(steps, context))
+            if node is None and loader.check_event(AliasEvent):
+                node = loader.compose_node(None, None)
+
+            # Collection is already composed when it's aliased
+            if node is not None:
+                if is_list and isinstance(node, SequenceNode):
+                    for item in node.value:
+                        yield convert(item_type, loader.construct_document(item), YamlSourceLocation(item.__line__, item.__column__))
+                elif not is_list and isinstance(node, MappingNode):
+                    for key_node, value_node in node.value:
+                        key_location = YamlSourceLocation(key_node.__line__, key_node.__column__)
+                        key = _construct_key(loader, key_node)
+                        if type(key) is str and is_field_hidden(key):
+                            continue
+                        yield convert_key(key, key_location), convert(item_type, loader.construct_document(value_node), key_location)
+                else:
+                    yield convert(collection.clazz if not is_list else item_type, loader.construct_document(node), YamlSourceLocation(node.__line__, node.__column__))
+                return
+
+            event = loader.peek_event()
+            if is_list and isinstance(event, SequenceStartEvent):
+                loader.get_event()
+                while not loader.check_event(SequenceEndEvent):
+                    item_location = _item_location(loader)
+                    window.drop_before(item_location.line - 1 - context.code_snippet_lines)
+                    raw = loader.construct_document(loader.compose_node(None, None))
+                    yield convert(item_type, raw, item_location)
+
+            elif not is_list and isinstance(event, MappingStartEvent):
+                loader.get_event()
+                while not loader.check_event(MappingEndEvent):
+                    key_location = _item_location(loader)
+                    window.drop_before(key_location.line - 1 - context.code_snippet_lines)
+                    key_node = loader.compose_node(None, None)
+                    if key_node.tag == _MERGE_TAG:
+                        context.location_stack = [ YamlLocationFrame(key_location) ]
+                        raise DataclassLoadError.from_source("Merge keys aren't supported when iterating items", context.get_location_source(), context.error_format)
+                    key = _construct_key(loader, key_node)
+                    raw = loader.construct_document(loader.compose_node(None, None))
+                    if type(key) is str and is_field_hidden(key):
+                        continue
+                    yield convert_key(key, key_location), convert(item_type, raw, key_location)
+
+            else:
+                # Single value is a list of one element, anything else fails the same way it does when loading whole document
+                item_location = _item_location(loader)
+                raw = loader.construct_document(loader.compose_node(None, None))
+                yield convert(item_type if is_list else collection.clazz, raw, item_location)
+        finally:
+            loader.dispose()
+
+    except MarkedYAMLError as err:
+        _raise_yaml_error(err, label, context.error_format)
+
+
+# Yields items of list at 'path' (or (key, value) pairs of dict) one at a time, while the parser advances.
+# Document is read from 'stream' (string or file object) in chunks, and only the current item is kept in memory,
+# so huge collections are processed in constant memory. Nothing after the collection is parsed.
+def iter_yaml_dataclass_items(clazz:type, label:str, stream:Union[str, IO], path:Union[str, Sequence[PathStep]], *,
+        type_cache:Optional[dict]=None, ext_types:list=[], error_format:EErrorFormat=EErrorFormat.Pretty,
+        always_track_source:bool=False, error_code_snippet_lines:int=4, raw_scalars:bool=False) -> Iterator:
+    steps = parse_path(path) if isinstance(path, str) else list(path)
+    containers, target = resolve_path_plan(clazz, steps, ext_types)
+
+    collection = _unwrap_optional(target)
+    if collection.kind not in (ETypeKind.List, ETypeKind.Dict):
+        raise ValueError(f"Value at '{_format_path(steps) or _type_label(clazz)}' of type '{target.clazz}' is neither a list nor a dict")
+
+    window = _LineWindow()
+    context = create_visitor_context(label, '', type_cache=type_cache, ext_types=ext_types, error_format=error_format,
+        always_track_source=always_track_source, error_code_snippet_lines=error_code_snippet_lines, raw_scalars=raw_scalars)
+    context.yaml_lines = window
+    context.stable_lines = False
+
+    if isinstance(stream, bytes):
+        stream = io.BytesIO(stream)
+    recording = _RecordingStream(stream, window)
+    loader = RawLineLoader(recording) if raw_scalars else LineLoader(recording)
+    return _iter_items(loader, window, context, steps, containers, collection, label)
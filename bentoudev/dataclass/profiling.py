@@ -0,0 +1,184 @@
+from typing import Any, Dict, List, Optional, Tuple
+import dataclasses
+import json
+import marshal
+import threading
+import time
+
+from bentoudev.dataclass.base import get_type_name
+
+
+@dataclasses.dataclass
+class ClassLoadStats:
+    count: int = 0
+    # Calls that weren't nested in load of the same class
+    primitive_count: int = 0
+    own_seconds: float = 0.0
+    total_seconds: float = 0.0
+    callers: Dict[Any, List[float]] = dataclasses.field(default_factory=dict)
+
+
+@dataclasses.dataclass
+class UnionLoadStats:
+    attempts: int = 0
+    failures: int = 0
+
+
+class _ClassFrame:
+    __slots__ = ('clazz', 'start', 'child_seconds', 'is_primitive')
+
+    def __init__(self, clazz:type, start:float, is_primitive:bool):
+        self.clazz = clazz
+        self.start = start
+        self.child_seconds = 0.0
+        self.is_primitive = is_primitive
+
+
+_PARSE_KEY = ('<parser>', 0, 'parse')
+
+
+# Opt-in instrumentation, pass as 'profiler' to load_yaml_dataclass (or other loaders).
+# Loaders only check for None when it's not set. Results accumulate over loads, so one profiler can cover a batch.
+# Report is available as JSON, or as stats accepted by pstats.Stats(profiler) and dump_stats compatible with cProfile.
+class LoadProfiler:
+    parse_seconds: float
+    parse_count: int
+    convert_seconds: float
+    source_tracking_seconds: float
+    classes: Dict[type, ClassLoadStats]
+    unions: Dict[Any, UnionLoadStats]
+
+    def __init__(self):
+        self.parse_seconds = 0.0
+        self.parse_count = 0
+        self.convert_seconds = 0.0
+        self.source_tracking_seconds = 0.0
+        self.classes = {}
+        self.unions = {}
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @staticmethod
+    def clock() -> float:
+        return time.perf_counter()
+
+    def _get_stack(self) -> List[_ClassFrame]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def record_parse(self, seconds:float):
+        with self._lock:
+            self.parse_seconds += seconds
+            self.parse_count += 1
+
+    def record_source_tracking(self, seconds:float):
+        with self._lock:
+            self.source_tracking_seconds += seconds
+
+    def measure_source_tracking(self, fn, *args):
+        start = self.clock()
+        try:
+            return fn(*args)
+        finally:
+            self.record_source_tracking(self.clock() - start)
+
+    def record_union_attempt(self, union_clazz, succeeded:bool):
+        with self._lock:
+            stats = self.unions.get(union_clazz, None)
+            if stats is None:
+                stats = self.unions[union_clazz] = UnionLoadStats()
+            stats.attempts += 1
+            if not succeeded:
+                stats.failures += 1
+
+    def begin_class(self, clazz:type):
+        stack = self._get_stack()
+        is_primitive = all(frame.clazz is not clazz for frame in stack)
+        stack.append(_ClassFrame(clazz, self.clock(), is_primitive))
+
+    def end_class(self):
+        end = self.clock()
+        stack = self._get_stack()
+        frame = stack.pop()
+        total = end - frame.start
+        parent = stack[-1] if len(stack) > 0 else None
+        if parent is not None:
+            parent.child_seconds += total
+
+        with self._lock:
+            stats = self.classes.get(frame.clazz, None)
+            if stats is None:
+                stats = self.classes[frame.clazz] = ClassLoadStats()
+            stats.count += 1
+            stats.own_seconds += total - frame.child_seconds
+            if frame.is_primitive:
+                stats.primitive_count += 1
+                stats.total_seconds += total
+
+            caller = parent.clazz if parent is not None else None
+            caller_stats = stats.callers.get(caller, None)
+            if caller_stats is None:
+                caller_stats = stats.callers[caller] = [0, 0, 0.0, 0.0]
+            caller_stats[0] += 1 if frame.is_primitive else 0
+            caller_stats[1] += 1
+            caller_stats[2] += total - frame.child_seconds
+            caller_stats[3] += total if frame.is_primitive else 0.0
+
+            if parent is None:
+                self.convert_seconds += total
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                'parse_seconds' : self.parse_seconds,
+                'parse_count' : self.parse_count,
+                'convert_seconds' : self.convert_seconds,
+                'source_tracking_seconds' : self.source_tracking_seconds,
+                'classes' : {
+                    get_type_name(clazz) : {
+                        'count' : stats.count,
+                        'own_seconds' : stats.own_seconds,
+                        'total_seconds' : stats.total_seconds,
+                    } for clazz, stats in self.classes.items()
+                },
+                'unions' : {
+                    str(clazz) : {
+                        'attempts' : stats.attempts,
+                        'failures' : stats.failures,
+                    } for clazz, stats in self.unions.items()
+                },
+            }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    @staticmethod
+    def _stats_key(clazz:Optional[type]) -> Tuple[str, int, str]:
+        if clazz is None:
+            return _PARSE_KEY
+        return (clazz.__module__, 0, f'load {clazz.__qualname__}')
+
+    # Same layout as cProfile.Profile.create_stats, so pstats.Stats(profiler) works
+    def create_stats(self):
+        stats = {}
+        with self._lock:
+            if self.parse_count > 0:
+                stats[_PARSE_KEY] = (self.parse_count, self.parse_count, self.parse_seconds, self.parse_seconds, {})
+
+            for clazz, class_stats in self.classes.items():
+                callers = {}
+                for caller, (cc, nc, tt, ct) in class_stats.callers.items():
+                    if caller is not None:
+                        callers[self._stats_key(caller)] = (cc, nc, tt, ct)
+                stats[self._stats_key(clazz)] = (
+                    class_stats.primitive_count, class_stats.count, class_stats.own_seconds, class_stats.total_seconds, callers
+                )
+        self.stats = stats
+
+    def dump_stats(self, path:str):
+        self.create_stats()
+        with open(path, 'wb') as f:
+            marshal.dump(self.stats, f)
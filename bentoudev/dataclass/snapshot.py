@@ -0,0 +1,514 @@
+from typing import Any, BinaryIO, Callable, Dict, List, Tuple, Union
+import dataclasses
+import struct
+import threading
+
+from bentoudev.dataclass.base import Source, SourceTracker, UnhandledType, ensure_source_tracked, get_class_traits, get_type_name, is_source_tracked
+from bentoudev.dataclass.type_plan import ETypeKind, TypePlan, get_type_plan, plan_fingerprint, select_union_member
+
+
+SNAPSHOT_MAGIC = b'BDSNAP'
+SNAPSHOT_VERSION = 1
+
+_FLAG_SOURCES = 0x01
+_FINGERPRINT_SIZE = 32
+_HEADER = struct.Struct(f'<{len(SNAPSHOT_MAGIC)}sBB{_FINGERPRINT_SIZE}s')
+_DOUBLE = struct.Struct('<d')
+
+# Tags of values stored in fields typed as 'Any'
+_ANY_NONE, _ANY_FALSE, _ANY_TRUE, _ANY_INT, _ANY_FLOAT, _ANY_STR, _ANY_LIST, _ANY_DICT = range(8)
+_HIDDEN_KEYS = ('__yaml_location__', '__yaml_field_location__')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class SnapshotWriter:
+    def __init__(self):
+        self.buffer = bytearray()
+        self._strings : Dict[str, int] = {}
+
+    def write_varint(self, value:int):
+        buffer = self.buffer
+        while value > 0x7F:
+            buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        buffer.append(value)
+
+    def write_int(self, value:int):
+        # Zig-zag, so small negative numbers stay small
+        self.write_varint(value << 1 if value >= 0 else ((-value) << 1) - 1)
+
+    def write_str(self, value:str):
+        data = value.encode('utf-8')
+        self.write_varint(len(data))
+        self.buffer += data
+
+    def write_interned_str(self, value:str):
+        idx = self._strings.get(value, None)
+        if idx is not None:
+            self.write_varint(idx)
+        else:
+            idx = len(self._strings)
+            self._strings[value] = idx
+            self.write_varint(idx)
+            self.write_str(value)
+
+
+class SnapshotReader:
+    def __init__(self, data:bytes, pos:int=0):
+        self.data = data
+        self.pos = pos
+        self._strings : List[str] = []
+
+    def read_byte(self) -> int:
+        try:
+            value = self.data[self.pos]
+        except IndexError:
+            raise SnapshotError('Unexpected end of snapshot data') from None
+        self.pos += 1
+        return value
+
+    def read_varint(self) -> int:
+        result = 0
+        shift = 0
+        while True:
+            byte = self.read_byte()
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def read_int(self) -> int:
+        value = self.read_varint()
+        return (value >> 1) if not value & 1 else -((value + 1) >> 1)
+
+    def read_bytes(self, size:int) -> bytes:
+        end = self.pos + size
+        if end > len(self.data):
+            raise SnapshotError('Unexpected end of snapshot data')
+        result = self.data[self.pos:end]
+        self.pos = end
+        return result
+
+    def read_str(self) -> str:
+        return bytes(self.read_bytes(self.read_varint())).decode('utf-8')
+
+    def read_interned_str(self) -> str:
+        idx = self.read_varint()
+        if idx == len(self._strings):
+            self._strings.append(self.read_str())
+        elif idx > len(self._strings):
+            raise SnapshotError(f'Invalid string table index {idx}')
+        return self._strings[idx]
+
+
+Encoder = Callable[[SnapshotWriter, Any], None]
+Decoder = Callable[[SnapshotReader], Any]
+
+
+# Union member is picked by type of the value, members holding the same type of values (two lists, two dicts,
+# dataclass and its subclass) can't be told apart, while loader may have converted the value with either of them
+def _check_union_members(plan:TypePlan):
+    for idx, arg in enumerate(plan.args):
+        for earlier in plan.args[:idx]:
+            if earlier.kind != arg.kind:
+                continue
+            if arg.kind in (ETypeKind.List, ETypeKind.Dict) or (arg.kind == ETypeKind.Dataclass and issubclass(arg.clazz, earlier.clazz)):
+                raise SnapshotError(f"Unable to store '{plan.clazz}' in snapshot, members '{earlier.clazz}' and '{arg.clazz}' can't be told apart")
+
+
+def _write_source(w:SnapshotWriter, src:Source):
+    w.write_int(src.line_number)
+    w.write_int(src.column_number)
+    w.write_interned_str(src.buffer if src.buffer is not None else '')
+    w.write_interned_str(src.file_name if src.file_name is not None else '')
+
+
+def _read_source(r:SnapshotReader) -> Source:
+    line = r.read_int()
+    column = r.read_int()
+    buffer = r.read_interned_str()
+    file_name = r.read_interned_str()
+    return Source(line, column, buffer, file_name)
+
+
+def _read_tracker(r:SnapshotReader) -> SourceTracker:
+    tracker = SourceTracker(_read_source(r))
+    for _ in range(r.read_varint()):
+        field_name = r.read_interned_str()
+        tracker.track_field(field_name, _read_source(r))
+    return tracker
+
+
+def _encode_any(w:SnapshotWriter, value):
+    value_t = type(value)
+    if value is None:
+        w.buffer.append(_ANY_NONE)
+    elif value_t is bool:
+        w.buffer.append(_ANY_TRUE if value else _ANY_FALSE)
+    elif value_t is int:
+        w.buffer.append(_ANY_INT)
+        w.write_int(value)
+    elif value_t is float:
+        w.buffer.append(_ANY_FLOAT)
+        w.buffer += _DOUBLE.pack(value)
+    elif value_t is str:
+        w.buffer.append(_ANY_STR)
+        w.write_str(value)
+    elif value_t is list:
+        w.buffer.append(_ANY_LIST)
+        w.write_varint(len(value))
+        for v in value:
+            _encode_any(w, v)
+    elif value_t is dict:
+        items = [ (k, v) for k, v in value.items() if k not in _HIDDEN_KEYS ]
+        w.buffer.append(_ANY_DICT)
+        w.write_varint(len(items))
+        for k, v in items:
+            _encode_any(w, k)
+            _encode_any(w, v)
+    else:
+        raise SnapshotError(f"Unable to store value of type '{value_t}' in 'Any' field")
+
+
+def _decode_any(r:SnapshotReader):
+    tag = r.read_byte()
+    if tag == _ANY_NONE:
+        return None
+    elif tag == _ANY_FALSE:
+        return False
+    elif tag == _ANY_TRUE:
+        return True
+    elif tag == _ANY_INT:
+        return r.read_int()
+    elif tag == _ANY_FLOAT:
+        return _DOUBLE.unpack(r.read_bytes(_DOUBLE.size))[0]
+    elif tag == _ANY_STR:
+        return r.read_str()
+    elif tag == _ANY_LIST:
+        return [ _decode_any(r) for _ in range(r.read_varint()) ]
+    elif tag == _ANY_DICT:
+        result = {}
+        for _ in range(r.read_varint()):
+            key = _decode_any(r)
+            result[key] = _decode_any(r)
+        return result
+    raise SnapshotError(f"Invalid 'Any' value tag {tag}")
+
+
+def _encode_bool(w:SnapshotWriter, value):
+    w.buffer.append(1 if value else 0)
+
+
+def _decode_bool(r:SnapshotReader):
+    return r.read_byte() != 0
+
+
+def _encode_float(w:SnapshotWriter, value):
+    w.buffer += _DOUBLE.pack(value)
+
+
+def _decode_float(r:SnapshotReader):
+    return _DOUBLE.unpack(r.read_bytes(_DOUBLE.size))[0]
+
+
+_SCALAR_CODECS : Dict[type, Tuple[Encoder, Decoder]] = {
+    bool : (_encode_bool, _decode_bool),
+    int : (SnapshotWriter.write_int, SnapshotReader.read_int),
+    float : (_encode_float, _decode_float),
+    str : (SnapshotWriter.write_str, SnapshotReader.read_str),
+}
+
+
+# Encoders and decoders compiled once per type plan, recursive types reuse already created closures
+class SnapshotCodec:
+    def __init__(self, root:TypePlan, with_sources:bool):
+        self.root = root
+        self.with_sources = with_sources
+        self.fingerprint = bytes.fromhex(plan_fingerprint(root))
+        self._encoders : Dict[int, Encoder] = {}
+        self._decoders : Dict[int, Decoder] = {}
+        self.encode = self.encoder(root)
+        self.decode = self.decoder(root)
+
+    def encoder(self, plan:TypePlan) -> Encoder:
+        result = self._encoders.get(id(plan), None)
+        if result is None:
+            result = self._compile_encoder(plan)
+        return result
+
+    def decoder(self, plan:TypePlan) -> Decoder:
+        result = self._decoders.get(id(plan), None)
+        if result is None:
+            result = self._compile_decoder(plan)
+        return result
+
+    def _compile_encoder(self, plan:TypePlan) -> Encoder:
+        kind = plan.kind
+
+        if kind == ETypeKind.Dataclass:
+            field_encoders : List[Tuple[str, Encoder]] = []
+            with_sources = self.with_sources
+
+            def encode_dataclass(w:SnapshotWriter, value):
+                for name, encode in field_encoders:
+                    encode(w, getattr(value, name))
+                if with_sources:
+                    tracker = getattr(value, '__source_tracker__', None) if is_source_tracked(value) else None
+                    if isinstance(tracker, SourceTracker):
+                        w.buffer.append(1)
+                        _write_source(w, tracker.get_source())
+                        field_sources = [ (k, v) for k, v in tracker.__source_map__.items() if v is not None ]
+                        w.write_varint(len(field_sources))
+                        for field_name, src in field_sources:
+                            w.write_interned_str(field_name)
+                            _write_source(w, src)
+                    else:
+                        w.buffer.append(0)
+
+            # Registered before compiling fields, to support self referencing types
+            self._encoders[id(plan)] = encode_dataclass
+            field_encoders.extend((f.name, self.encoder(f.plan)) for f in plan.fields if f.field.init)
+            return encode_dataclass
+
+        if kind == ETypeKind.Scalar:
+            codec = _SCALAR_CODECS.get(plan.clazz, None)
+            if codec is None:
+                raise UnhandledType(f"Unable to store type '{plan.clazz}' in snapshot")
+            encoder = codec[0]
+
+        elif kind == ETypeKind.Enum:
+            def encoder(w:SnapshotWriter, value):
+                w.write_interned_str(value.name)
+
+        elif kind == ETypeKind.Any:
+            encoder = _encode_any
+
+        elif kind == ETypeKind.NoneType:
+            def encoder(w:SnapshotWriter, value):
+                pass
+
+        elif kind == ETypeKind.List:
+            encode_item = self.encoder(plan.args[0])
+
+            def encoder(w:SnapshotWriter, value):
+                w.write_varint(len(value))
+                for v in value:
+                    encode_item(w, v)
+
+        elif kind == ETypeKind.Dict:
+            encode_key = self.encoder(plan.args[0])
+            encode_value = self.encoder(plan.args[1])
+
+            def encoder(w:SnapshotWriter, value):
+                w.write_varint(len(value))
+                for k, v in value.items():
+                    encode_key(w, k)
+                    encode_value(w, v)
+
+        elif kind == ETypeKind.Optional:
+            encode_value = self.encoder(plan.args[0])
+
+            def encoder(w:SnapshotWriter, value):
+                if value is None:
+                    w.buffer.append(0)
+                else:
+                    w.buffer.append(1)
+                    encode_value(w, value)
+
+        elif kind == ETypeKind.Union:
+            _check_union_members(plan)
+            member_encoders = [ self.encoder(arg) for arg in plan.args ]
+
+            def encoder(w:SnapshotWriter, value):
+                member = select_union_member(plan, value)
+                if member is None:
+                    raise SnapshotError(f"Value of type '{type(value)}' doesn't match any of '{plan.clazz}'")
+                w.write_varint(member[0])
+                member_encoders[member[0]](w, value)
+
+        else:
+            def encoder(w:SnapshotWriter, value):
+                raise UnhandledType(f"Unable to store value of unresolved type '{plan.clazz}' in snapshot")
+
+        self._encoders[id(plan)] = encoder
+        return encoder
+
+    def _compile_decoder(self, plan:TypePlan) -> Decoder:
+        kind = plan.kind
+
+        if kind == ETypeKind.Dataclass:
+            field_decoders : List[Tuple[str, Decoder]] = []
+            clazz = plan.clazz
+            with_sources = self.with_sources
+
+            def decode_dataclass(r:SnapshotReader):
+                result = clazz(**{ name : decode(r) for name, decode in field_decoders })
+                if with_sources and r.read_byte() != 0:
+                    tracker = _read_tracker(r)
+                    ensure_source_tracked(clazz)
+                    result.set_source_tracker(tracker)
+                return result
+
+            self._decoders[id(plan)] = decode_dataclass
+            columnar_fields = get_class_traits(clazz).columnar_fields or {}
+            field_decoders.extend((f.name, self._compile_columnar_decoder(f.plan, f.name, columnar_fields[f.name]) if f.name in columnar_fields else self.decoder(f.plan))
+                for f in plan.fields if f.field.init)
+            return decode_dataclass
+
+        if kind == ETypeKind.Scalar:
+            codec = _SCALAR_CODECS.get(plan.clazz, None)
+            if codec is None:
+                raise UnhandledType(f"Unable to read type '{plan.clazz}' from snapshot")
+            decoder = codec[1]
+
+        elif kind == ETypeKind.Enum:
+            enum_clazz = plan.clazz
+
+            def decoder(r:SnapshotReader):
+                return enum_clazz[r.read_interned_str()]
+
+        elif kind == ETypeKind.Any:
+            decoder = _decode_any
+
+        elif kind == ETypeKind.NoneType:
+            def decoder(r:SnapshotReader):
+                return None
+
+        elif kind == ETypeKind.List:
+            decode_item = self.decoder(plan.args[0])
+
+            def decoder(r:SnapshotReader):
+                return [ decode_item(r) for _ in range(r.read_varint()) ]
+
+        elif kind == ETypeKind.Dict:
+            decode_key = self.decoder(plan.args[0])
+            decode_value = self.decoder(plan.args[1])
+
+            def decoder(r:SnapshotReader):
+                result = {}
+                for _ in range(r.read_varint()):
+                    key = decode_key(r)
+                    result[key] = decode_value(r)
+                return result
+
+        elif kind == ETypeKind.Optional:
+            decode_value = self.decoder(plan.args[0])
+
+            def decoder(r:SnapshotReader):
+                if r.read_byte() == 0:
+                    return None
+                return decode_value(r)
+
+        elif kind == ETypeKind.Union:
+            member_decoders = [ self.decoder(arg) for arg in plan.args ]
+
+            def decoder(r:SnapshotReader):
+                idx = r.read_varint()
+                if idx >= len(member_decoders):
+                    raise SnapshotError(f"Invalid union tag {idx} for '{plan.clazz}'")
+                return member_decoders[idx](r)
+
+        else:
+            def decoder(r:SnapshotReader):
+                raise UnhandledType(f"Unable to read value of unresolved type '{plan.clazz}' from snapshot")
+
+        self._decoders[id(plan)] = decoder
+        return decoder
+
+    # Columnar fields are stored as list of rows, and read back into columnar.ColumnarTable without instance per row
+    def _compile_columnar_decoder(self, plan:TypePlan, field_name:str, options) -> Decoder:
+        from bentoudev.dataclass.columnar import ColumnarBuilder
+
+        optional = plan.kind == ETypeKind.Optional
+        list_plan = plan.args[0] if optional else plan
+        row_plan = list_plan.args[0] if list_plan.kind == ETypeKind.List else None
+        if row_plan is None or row_plan.kind != ETypeKind.Dataclass or row_plan.inline is not None:
+            raise TypeError(f"Columnar field '{field_name}' must be a List of dataclasses, got '{plan.clazz}'")
+
+        row_fields = [ f for f in row_plan.fields if f.field.init ]
+        field_types = { f.name : f.field.type for f in row_fields }
+        row_decoders = [ (f.name, self.decoder(f.plan)) for f in row_fields ]
+        with_sources = self.with_sources
+
+        def decode_table(r:SnapshotReader):
+            if optional and r.read_byte() == 0:
+                return None
+            builder = ColumnarBuilder(row_plan.clazz, field_types, options.use_numpy)
+            for _ in range(r.read_varint()):
+                for name, decode in row_decoders:
+                    builder.append(name, decode(r))
+                # Rows have no source trackers of their own
+                if with_sources and r.read_byte() != 0:
+                    _read_tracker(r)
+                builder.end_row()
+            return builder.build()
+        return decode_table
+
+
+_CODECS : Dict[Tuple[type, Tuple[type, ...], bool], SnapshotCodec] = {}
+_CODECS_LOCK = threading.Lock()
+
+
+def get_snapshot_codec(clazz:type, ext_types:List[type]=[], with_sources:bool=False) -> SnapshotCodec:
+    key = (clazz, tuple(ext_types), with_sources)
+    codec = _CODECS.get(key, None)
+    if codec is None:
+        with _CODECS_LOCK:
+            codec = _CODECS.get(key, None)
+            if codec is None:
+                if not dataclasses.is_dataclass(clazz):
+                    raise ValueError(f'Class \'{clazz}\' passed to snapshot must be a dataclass!')
+                codec = SnapshotCodec(get_type_plan(clazz, ext_types), with_sources)
+                _CODECS[key] = codec
+    return codec
+
+
+def dumps_snapshot(obj, *, clazz:type=None, ext_types:list=[], include_sources:bool=False) -> bytes:
+    codec = get_snapshot_codec(clazz if clazz is not None else type(obj), ext_types, include_sources)
+    w = SnapshotWriter()
+    w.buffer += _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, _FLAG_SOURCES if include_sources else 0, codec.fingerprint)
+    codec.encode(w, obj)
+    return bytes(w.buffer)
+
+
+def loads_snapshot(clazz:type, data:bytes, *, ext_types:list=[]):
+    if len(data) < _HEADER.size:
+        raise SnapshotError('Data is too short to be a snapshot')
+
+    magic, version, flags, fingerprint = _HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError('Data is not a dataclass snapshot')
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f'Unsupported snapshot version {version}, expected {SNAPSHOT_VERSION}')
+
+    codec = get_snapshot_codec(clazz, ext_types, (flags & _FLAG_SOURCES) != 0)
+    if fingerprint != codec.fingerprint:
+        raise SnapshotError(f"Snapshot is stale, it was made for different definition of '{get_type_name(clazz)}'")
+
+    r = SnapshotReader(memoryview(data), _HEADER.size)
+    result = codec.decode(r)
+    if r.pos != len(data):
+        raise SnapshotError(f'Unexpected {len(data) - r.pos} trailing byte(s) in snapshot')
+    return result
+
+
+# 'path' can be either file path or binary file-like object
+def dump_snapshot(obj, path:Union[str, BinaryIO], *, clazz:type=None, ext_types:list=[], include_sources:bool=False):
+    data = dumps_snapshot(obj, clazz=clazz, ext_types=ext_types, include_sources=include_sources)
+    if hasattr(path, 'write'):
+        path.write(data)
+    else:
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+def load_snapshot(clazz:type, path:Union[str, BinaryIO], *, ext_types:list=[]):
+    if hasattr(path, 'read'):
+        data = path.read()
+    else:
+        with open(path, 'rb') as f:
+            data = f.read()
+    return loads_snapshot(clazz, data, ext_types=ext_types)
@@ -0,0 +1,48 @@
+from typing import Optional
+import re
+import sys
+
+from bentoudev.dataclass.profiling import LoadProfiler
+from bentoudev.dataclass.base import DataclassLoadError, EErrorFormat, Source, SourceTracker
+from bentoudev.dataclass.yaml_loader import DictToDataclass, create_visitor_context
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+
+_ERROR_LOCATION = re.compile(r'\s*\(at line (\d+), column (\d+)\)$')
+
+
+def _split_error_location(message:str):
+    match = _ERROR_LOCATION.search(message)
+    if match is None:
+        return message, 0, 0
+    return message[:match.start()], int(match.group(1)), int(match.group(2))
+
+
+# TOML parser doesn't report locations, so validation errors point at the document
+def load_toml_dataclass(clazz:type, label:str, toml_content:str, *, type_cache:Optional[dict]=None, ext_types:list=[],
+        error_format:EErrorFormat=EErrorFormat.Pretty, always_track_source:bool=False, error_code_snippet_lines:int=4,
+        profiler:Optional[LoadProfiler]=None, lazy:bool=False, parallel=None):
+    context = create_visitor_context(label, toml_content, type_cache=type_cache, ext_types=ext_types, error_format=error_format,
+        always_track_source=always_track_source, error_code_snippet_lines=error_code_snippet_lines, profiler=profiler, lazy=lazy,
+        parallel=parallel)
+    context.string_keys = True
+
+    parse_start = profiler.clock() if profiler is not None else 0.0
+    try:
+        loaded_toml = tomllib.loads(toml_content)
+
+    except tomllib.TOMLDecodeError as err:
+        message, line, column = _split_error_location(str(err))
+        snippet = SourceTracker.build_code_snippet(context.get_yaml_line, line, error_code_snippet_lines)
+        raise DataclassLoadError.from_source(message, Source(
+            line, column, '\n'.join(snippet), label
+        ), error_format)
+
+    if profiler is not None:
+        profiler.record_parse(profiler.clock() - parse_start)
+
+    return DictToDataclass(clazz, loaded_toml, context)
@@ -0,0 +1,272 @@
+from typing import Any, Dict, List, Optional, Tuple, Union, get_args, get_origin
+from enum import Enum
+import dataclasses
+import hashlib
+import threading
+
+from bentoudev.dataclass.base import get_inline_load_type, get_loader_metadata, get_type_name, is_enum, is_clazz_dict, is_clazz_list, is_forward_ref, is_inline_loaded, is_optional_type
+
+
+class ETypeKind(Enum):
+    Any = 1
+    Scalar = 2
+    Enum = 3
+    Dataclass = 4
+    List = 5
+    Dict = 6
+    Optional = 7
+    Union = 8
+    NoneType = 9
+    Unresolved = 10
+
+
+@dataclasses.dataclass(eq=False)
+class FieldPlan:
+    name: str
+    plan: 'TypePlan'
+    field: dataclasses.Field
+    is_optional: bool
+
+
+@dataclasses.dataclass(eq=False)
+class InlinePlan:
+    field_name: str
+    plan: 'TypePlan'
+
+
+# Type information resolved once per type, in the same order of checks as YamlToObject does.
+# Plans are compared by identity, recursive types point back to the same plan object.
+@dataclasses.dataclass(eq=False)
+class TypePlan:
+    clazz: Any
+    kind: ETypeKind
+    # List: (item,), Dict: (key, value), Optional: (value,), Union: members
+    args: Tuple['TypePlan', ...] = ()
+    fields: List[FieldPlan] = dataclasses.field(default_factory=list)
+    # Set for dataclasses with @inline_loader
+    inline: Optional[InlinePlan] = None
+    # Memoized by plan_fingerprint
+    fingerprint: Optional[str] = dataclasses.field(default=None, repr=False)
+
+    def field_plan(self, name:str) -> Optional[FieldPlan]:
+        for f in self.fields:
+            if f.name == name:
+                return f
+        return None
+
+
+# Plan cache key. Unions are equal regardless of member order (also nested in other generics), members
+# are tried in declaration order though, so types are keyed by their structure.
+def _plan_key(clazz):
+    args = get_args(clazz)
+    if len(args) == 0:
+        return clazz
+    return (get_origin(clazz), tuple(_plan_key(arg) if not isinstance(arg, list) else tuple(map(_plan_key, arg)) for arg in args))
+
+
+class TypePlanner:
+    ext_types: List[type]
+
+    def __init__(self, ext_types:List[type]):
+        self.ext_types = list(ext_types)
+        self._plans : Dict[Any, TypePlan] = {}
+        # Plans being built, published only once complete so lock-free lookups never see half-built plans
+        self._pending : Dict[Any, TypePlan] = {}
+        self._depth = 0
+        self._lock = threading.RLock()
+
+    def resolve_forward_ref(self, clazz) -> Optional[type]:
+        for t in self.ext_types:
+            if get_type_name(t) == clazz.__forward_arg__:
+                return t
+        return None
+
+    def plan(self, clazz) -> TypePlan:
+        key = _plan_key(clazz)
+        plan = self._plans.get(key, None)
+        if plan is not None:
+            return plan
+
+        with self._lock:
+            plan = self._plans.get(key, None) or self._pending.get(key, None)
+            if plan is not None:
+                return plan
+
+            self._depth += 1
+            try:
+                plan = self._build(clazz, key)
+            except BaseException:
+                self._pending.clear()
+                raise
+            finally:
+                self._depth -= 1
+
+            if self._depth == 0:
+                self._plans.update(self._pending)
+                self._pending.clear()
+            return plan
+
+    def _build(self, clazz, key) -> TypePlan:
+        if is_forward_ref(clazz):
+            resolved = self.resolve_forward_ref(clazz)
+            if resolved is None:
+                plan = TypePlan(clazz, ETypeKind.Unresolved)
+            else:
+                plan = self.plan(resolved)
+            self._pending[key] = plan
+            return plan
+
+        if dataclasses.is_dataclass(clazz):
+            # Register before visiting fields, so self referencing types end up with the same plan
+            plan = TypePlan(clazz, ETypeKind.Dataclass)
+            self._pending[key] = plan
+            for f in dataclasses.fields(clazz):
+                plan.fields.append(FieldPlan(f.name, self.plan(f.type), f, is_optional_type(f.type)))
+            if is_inline_loaded(clazz):
+                inline_load = get_inline_load_type(clazz)
+                plan.inline = InlinePlan(inline_load.field_name, self.plan(inline_load.inline_type))
+            return plan
+
+        if is_clazz_list(clazz):
+            args = get_args(clazz)
+            plan = TypePlan(clazz, ETypeKind.List, (self.plan(args[0] if len(args) > 0 else Any),))
+
+        elif get_origin(clazz) is Union:
+            union_types = get_args(clazz)
+            if len(union_types) == 2 and type(None) in union_types:
+                subtype = union_types[0] if union_types[1] is type(None) else union_types[1]
+                plan = TypePlan(clazz, ETypeKind.Optional, (self.plan(subtype),))
+            else:
+                plan = TypePlan(clazz, ETypeKind.Union, tuple(self.plan(t) for t in union_types))
+
+        elif is_clazz_dict(clazz):
+            args = get_args(clazz)
+            key_type, value_type = args if len(args) == 2 else (Any, Any)
+            plan = TypePlan(clazz, ETypeKind.Dict, (self.plan(key_type), self.plan(value_type)))
+
+        elif is_enum(clazz):
+            plan = TypePlan(clazz, ETypeKind.Enum)
+
+        elif clazz is Any:
+            plan = TypePlan(clazz, ETypeKind.Any)
+
+        elif clazz is type(None):
+            plan = TypePlan(clazz, ETypeKind.NoneType)
+
+        else:
+            plan = TypePlan(clazz, ETypeKind.Scalar)
+
+        self._pending[key] = plan
+        return plan
+
+
+def plan_accepts_value(plan:TypePlan, value) -> bool:
+    kind = plan.kind
+    if kind == ETypeKind.Any:
+        return True
+    if kind == ETypeKind.NoneType:
+        return value is None
+    if kind == ETypeKind.Optional:
+        return value is None or plan_accepts_value(plan.args[0], value)
+    if kind == ETypeKind.Union:
+        return any(plan_accepts_value(arg, value) for arg in plan.args)
+    if kind == ETypeKind.List:
+        return type(value) is list
+    if kind == ETypeKind.Dict:
+        return type(value) is dict
+    if kind in (ETypeKind.Dataclass, ETypeKind.Enum):
+        return isinstance(value, plan.clazz)
+    if kind == ETypeKind.Scalar:
+        return type(value) is plan.clazz
+    return False
+
+
+# Union members able to hold the value, exact matches first and 'Any' members, which accept everything, last
+def select_union_member(plan:TypePlan, value) -> Optional[Tuple[int, TypePlan]]:
+    fallback = None
+    for idx, arg in enumerate(plan.args):
+        if arg.kind == ETypeKind.Any:
+            if fallback is None:
+                fallback = (idx, arg)
+        elif plan_accepts_value(arg, value):
+            return (idx, arg)
+    return fallback
+
+
+_PLANNERS : Dict[Tuple[type, ...], TypePlanner] = {}
+
+
+def get_type_planner(ext_types:List[type]=[]) -> TypePlanner:
+    key = tuple(ext_types)
+    planner = _PLANNERS.get(key, None)
+    if planner is None:
+        planner = _PLANNERS.setdefault(key, TypePlanner(ext_types))
+    return planner
+
+
+def get_type_plan(clazz, ext_types:List[type]=[]) -> TypePlan:
+    return get_type_planner(ext_types).plan(clazz)
+
+
+def _describe_default(field:dataclasses.Field):
+    if field.default is not dataclasses.MISSING:
+        return f'={field.default!r}'
+    if field.default_factory is not dataclasses.MISSING:
+        factory = field.default_factory
+        return f'=>{getattr(factory, "__module__", "")}.{getattr(factory, "__qualname__", repr(factory))}'
+    return ''
+
+
+def _describe_metadata(field:dataclasses.Field):
+    # Options are frozen dataclasses and enums, with stable repr
+    return ''.join(f'[{key}={options!r}]' for key, options in get_loader_metadata(field))
+
+
+def _describe_plan(root:TypePlan) -> str:
+    # Describes every plan reachable from root, recursive references are stored as index of first visit
+    visited : Dict[int, int] = {}
+    parts : List[str] = []
+
+    def visit(plan:TypePlan):
+        idx = visited.get(id(plan), None)
+        if idx is not None:
+            parts.append(f'@{idx}')
+            return
+        visited[id(plan)] = len(visited)
+
+        parts.append(f'{plan.kind.name}(')
+        if plan.kind == ETypeKind.Dataclass:
+            parts.append(get_type_name(plan.clazz))
+            for f in plan.fields:
+                parts.append(f';{f.name}{"?" if f.is_optional else ""}{"" if f.field.init else "!init"}{_describe_default(f.field)}{_describe_metadata(f.field)}:')
+                visit(f.plan)
+            if plan.inline is not None:
+                parts.append(f';inline {plan.inline.field_name}:')
+                visit(plan.inline.plan)
+        elif plan.kind == ETypeKind.Enum:
+            parts.append(get_type_name(plan.clazz) + ':' + ','.join(plan.clazz.__members__.keys()))
+        elif plan.kind == ETypeKind.Scalar:
+            parts.append(get_type_name(plan.clazz))
+        elif plan.kind == ETypeKind.Unresolved:
+            parts.append(str(plan.clazz))
+        for arg in plan.args:
+            visit(arg)
+            parts.append(',')
+        parts.append(')')
+
+    visit(root)
+    return ''.join(parts)
+
+
+# Hex sha256 of everything in the type graph that affects loading: field names, types, defaults, optionality,
+# loader metadata (indexes, columnar, list merge), enum members, inline loaders and resolved forward references. Computed once per plan.
+# Defaults are described by repr, so defaults without stable repr make it differ between processes.
+def plan_fingerprint(plan:TypePlan) -> str:
+    result = plan.fingerprint
+    if result is None:
+        result = plan.fingerprint = hashlib.sha256(_describe_plan(plan).encode('utf-8')).hexdigest()
+    return result
+
+
+def schema_fingerprint(clazz, ext_types:List[type]=[]) -> str:
+    return plan_fingerprint(get_type_plan(clazz, ext_types))
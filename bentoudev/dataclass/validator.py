@@ -0,0 +1,254 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+
+from bentoudev.dataclass.base import DataclassErrorMessage, DataclassLoadError, EErrorFormat, UnhandledType, coerce_string_key
+from bentoudev.dataclass.type_plan import ETypeKind, TypePlan, get_type_plan
+
+
+# Checks already parsed data (dicts, lists and scalars) against a dataclass without constructing it.
+# Rules mirror the loader: required non-Optional fields, no unknown fields, single values accepted as lists,
+# enums by member name and scalars as load_bool/int/float/str accept them.
+# Checks return False on first error when 'errors' is None, otherwise collect every error with its path.
+
+
+Check = Callable[[Any, Optional[str], Optional[List[DataclassErrorMessage]]], bool]
+
+
+_BOOL_STRINGS = frozenset(['true', 'on', 'yes', 'ok', 'enable', 'false', 'off', 'no', 'nook', 'disable'])
+
+
+def _accepts_bool(value):
+    value_t = type(value)
+    if value_t is bool:
+        return True
+    if value_t is int:
+        return value in (0, 1)
+    if value_t is str:
+        return value.lower() in _BOOL_STRINGS
+    return False
+
+
+def _accepts_int(value):
+    return type(value) is int
+
+
+def _accepts_float(value):
+    return type(value) in (int, float)
+
+
+def _accepts_str(value):
+    return type(value) in (str, bool, int, float)
+
+
+_SCALARS = {
+    bool : (_accepts_bool, 'a bool'),
+    int : (_accepts_int, 'an int'),
+    float : (_accepts_float, 'a float'),
+    str : (_accepts_str, 'a string'),
+}
+
+
+def _child_path(path:Optional[str], step):
+    if path is None:
+        return None
+    if type(step) is int:
+        return f'{path}[{step}]'
+    return f'{path}.{step}'
+
+
+def _is_hidden_key(key):
+    return type(key) is str and key.startswith('__')
+
+
+class CompiledValidator:
+    def __init__(self, root:TypePlan, *, string_keys:bool=False, error_format:EErrorFormat=EErrorFormat.Pretty):
+        self.root = root
+        self.string_keys = string_keys
+        self.error_format = error_format
+        self._checks : Dict[int, Check] = {}
+        self._check = self._compile_or_get(root)
+
+    def is_valid(self, value) -> bool:
+        return self._check(value, None, None)
+
+    def validate(self, value, path:str='$') -> List[DataclassErrorMessage]:
+        errors = []
+        self._check(value, path, errors)
+        return errors
+
+    # Raises DataclassLoadError with all errors, same as loaders do
+    def check(self, value, label:str='$'):
+        errors = self.validate(value, label)
+        if len(errors) > 0:
+            raise DataclassLoadError.from_error_list(None, errors, self.error_format)
+        return value
+
+    def _error(self, errors:Optional[List[DataclassErrorMessage]], path:str, message:str):
+        if errors is not None:
+            errors.append(DataclassErrorMessage(None, DataclassLoadError.LABEL, f'{path}: {message}', self.error_format))
+        return False
+
+    def _compile_or_get(self, plan:TypePlan) -> Check:
+        result = self._checks.get(id(plan), None)
+        if result is None:
+            result = self._compile(plan)
+            self._checks[id(plan)] = result
+        return result
+
+    def _compile(self, plan:TypePlan) -> Check:
+        kind = plan.kind
+
+        if kind == ETypeKind.Dataclass:
+            if plan.inline is not None:
+                return self._compile_or_get(plan.inline.plan)
+            return self._compile_dataclass(plan)
+
+        if kind == ETypeKind.Optional:
+            # Loader accepts explicit null, other values are converted as the inner type
+            check_value = self._compile_or_get(plan.args[0])
+            return lambda value, path, errors: value is None or check_value(value, path, errors)
+
+        if kind == ETypeKind.List:
+            return self._compile_list(plan)
+
+        if kind == ETypeKind.Dict:
+            return self._compile_dict(plan)
+
+        if kind == ETypeKind.Union:
+            return self._compile_union(plan)
+
+        if kind == ETypeKind.Enum:
+            return self._compile_enum(plan)
+
+        if kind == ETypeKind.Any:
+            return lambda value, path, errors: True
+
+        if kind == ETypeKind.Scalar and plan.clazz in _SCALARS:
+            accepts, expected = _SCALARS[plan.clazz]
+
+            def check_scalar(value, path, errors):
+                if accepts(value):
+                    return True
+                return self._error(errors, path, f"Got '{type(value)}' when expecting {expected}")
+            return check_scalar
+
+        if kind == ETypeKind.NoneType:
+            return lambda value, path, errors: self._error(errors, path, f"Unable to load value '{value}' as None")
+
+        raise UnhandledType(f"Unhandled type '{plan.clazz}', unable to compile validator")
+
+    def _compile_dataclass(self, plan:TypePlan) -> Check:
+        field_checks : Dict[str, Check] = {}
+        required = [ f.name for f in plan.fields if not f.is_optional ]
+        clazz_name = plan.clazz.__name__
+
+        def check_dataclass(value, path, errors):
+            if type(value) is not dict:
+                return self._error(errors, path, f"Got '{type(value)}' when expecting dataclass '{clazz_name}'.")
+
+            valid = True
+            for key, item in value.items():
+                field_check = field_checks.get(key, None)
+                if field_check is None:
+                    if _is_hidden_key(key):
+                        continue
+                    valid = self._error(errors, path, f"Unknown field '{key}' for class '{clazz_name}'")
+                elif not field_check(item, _child_path(path, key), errors):
+                    valid = False
+                if not valid and errors is None:
+                    return False
+
+            missing = [ name for name in required if name not in value ]
+            if len(missing) > 0:
+                valid = self._error(errors, path, f"Missing required field(s) of class '{clazz_name}': { ', '.join(missing) }")
+            return valid
+
+        # Registered before compiling fields, to support self referencing types
+        self._checks[id(plan)] = check_dataclass
+        for f in plan.fields:
+            field_checks[f.name] = self._compile_or_get(f.plan)
+        return check_dataclass
+
+    def _compile_list(self, plan:TypePlan) -> Check:
+        check_item = self._compile_or_get(plan.args[0])
+
+        def check_list(value, path, errors):
+            # Single value is loaded as one element list
+            if type(value) is not list:
+                return check_item(value, path, errors)
+
+            valid = True
+            for idx, item in enumerate(value):
+                if not check_item(item, _child_path(path, idx), errors):
+                    if errors is None:
+                        return False
+                    valid = False
+            return valid
+        return check_list
+
+    def _compile_dict(self, plan:TypePlan) -> Check:
+        check_key = self._compile_or_get(plan.args[0])
+        check_value = self._compile_or_get(plan.args[1])
+        coerce_keys = self.string_keys and plan.args[0].clazz is not str
+
+        def check_dict(value, path, errors):
+            if type(value) is not dict:
+                return self._error(errors, path, f"Got '{type(value)}', when expecting '{plan.clazz}'")
+
+            valid = True
+            for key, item in value.items():
+                if _is_hidden_key(key):
+                    continue
+                item_path = _child_path(path, key)
+                if not check_key(coerce_string_key(key) if coerce_keys else key, item_path, errors):
+                    valid = False
+                if not check_value(item, item_path, errors):
+                    valid = False
+                if not valid and errors is None:
+                    return False
+            return valid
+        return check_dict
+
+    def _compile_union(self, plan:TypePlan) -> Check:
+        member_checks = [ self._compile_or_get(arg) for arg in plan.args ]
+        allowed_types = ', '.join([ str(arg.clazz) for arg in plan.args ])
+
+        def check_union(value, path, errors):
+            for check_member in member_checks:
+                if check_member(value, None, None):
+                    return True
+            return self._error(errors, path, f"Got '{type(value)}' when expecting 'Union [{allowed_types}]'")
+        return check_union
+
+    def _compile_enum(self, plan:TypePlan) -> Check:
+        member_names = list(plan.clazz.__members__.keys())
+        members = frozenset(member_names)
+        enum_name = plan.clazz.__name__
+
+        def check_enum(value, path, errors):
+            if type(value) is not str:
+                return self._error(errors, path, f"Got '{type(value).__name__}' when expecting enum '{enum_name}'")
+            if value not in members:
+                return self._error(errors, path, f"Got '{value}' when expecting enum '{enum_name}' with one of values: {', '.join(member_names)}")
+            return True
+        return check_enum
+
+
+_VALIDATORS : Dict[Tuple, CompiledValidator] = {}
+_VALIDATORS_LOCK = threading.Lock()
+
+
+# Compiled once per type and options, validators are safe to share between threads
+def compile_validator(clazz:type, *, ext_types:list=[], string_keys:bool=False, error_format:EErrorFormat=EErrorFormat.Pretty) -> CompiledValidator:
+    key = (clazz, tuple(ext_types), string_keys, error_format)
+    validator = _VALIDATORS.get(key, None)
+    if validator is None:
+        with _VALIDATORS_LOCK:
+            validator = _VALIDATORS.get(key, None)
+            if validator is None:
+                validator = _VALIDATORS[key] = CompiledValidator(get_type_plan(clazz, ext_types), string_keys=string_keys, error_format=error_format)
+    return validator
+
+
+def validate_data(clazz:type, value, *, ext_types:list=[], string_keys:bool=False) -> List[DataclassErrorMessage]:
+    return compile_validator(clazz, ext_types=ext_types, string_keys=string_keys).validate(value)
@@ -1,42 +1,79 @@
-from typing import List, TypeVar, Any, Optional, Union, Dict
+from typing import Callable, Generator, List, TypeVar, Any, Optional, Union, Dict, get_args, get_origin
+import copy
 import dataclasses
-import inspect
-
-from yaml import MarkedYAMLError
-
-import typing_inspect
 import enum
+import re
 
-from yaml.composer import Composer
-from yaml.constructor import Constructor
-from yaml.nodes import ScalarNode
-from yaml.resolver import BaseResolver
-from yaml.loader import SafeLoader
-
-from bentoudev.dataclass.base import DataclassLoadError, DataclassErrorMessage, UnhandledType, EErrorFormat, Source, SourceTracker, get_inline_load_type, get_type_name, is_enum, is_inline_loaded, is_source_tracked, is_clazz_dict, is_clazz_list, track_source
+from bentoudev.dataclass.lazy import create_lazy_instance, supports_lazy
+from bentoudev.dataclass.profiling import LoadProfiler
+from bentoudev.dataclass.base import DataclassLoadError, DataclassErrorMessage, LoadCancelled, UnhandledType, EErrorFormat, Source, SourceTracker, get_inline_load_type, get_type_name, is_enum, is_forward_ref, is_optional_type, is_clazz_dict, is_clazz_list, ensure_source_tracked, get_class_traits, set_indexes, ClassTraits, coerce_string_key
 
 
 class DataclassVisitorContext:
     ext_types : List[TypeVar]
     type_cache = {}
-    clazz_stack = []
+    location_stack = []
     yaml_content : str
     yaml_lines : List[str]
+    # False when yaml_lines is a window dropping lines as document is read, snippets are built right away then
+    stable_lines : bool = True
     filename : str
     error_format : EErrorFormat
     always_track_source : bool
     code_snippet_lines : int
+    # Set by formats where mapping keys are always strings (JSON, TOML)
+    string_keys : bool = False
+    # Optional LoadProfiler, hooks are skipped entirely when None
+    profiler : Optional[LoadProfiler] = None
+    # Nested collections of dataclass fields are converted on first access
+    lazy : bool = False
+    # Plain scalars arrive as RawScalar and are parsed by target type, see load_yaml_dataclass
+    raw_scalars : bool = False
+    # Optional ParallelConversion, large lists and dicts are converted in chunks on its executor
+    parallel : Optional[Any] = None
+    # Converted included fragments by (fragment, type), shared by loads of one include session
+    conversion_cache : Optional[dict] = None
+    converting_includes : Optional[set] = None
+    # Optional threading.Event, conversion stops with LoadCancelled at the next step once it's set
+    cancel : Optional[Any] = None
+
+    def __init__(self):
+        # Location stack must be per-load, contexts may be used concurrently from executor threads
+        self.type_cache = {}
+        self.location_stack = []
 
     def get_yaml_line(self, line: int):
+        if len(self.yaml_lines) == 0:
+            return ''
         return self.yaml_lines[ min(line, len(self.yaml_lines) - 1) ]
 
+    # Entries are Source, YamlSourceTracker or YamlLocationFrame, popped by identity in LIFO order
+    def push_location(self, loc):
+        self.location_stack.append(loc)
+
+    def pop_location(self, loc):
+        popped = self.location_stack.pop()
+        if popped is not loc:
+            raise RuntimeError(f"Location stack out of balance, expected to pop '{loc}' but got '{popped}'")
+
+    # Copy sharing everything but the location stack, which starts from current top
+    def fork(self) -> 'DataclassVisitorContext':
+        forked = copy.copy(self)
+        forked.location_stack = self.location_stack[-1:]
+        return forked
+
     def get_location_source(self, field_name:str = "") -> Optional[Source]:
-        stack_len = len(self.clazz_stack)
+        stack_len = len(self.location_stack)
 
         if stack_len > 0:
-            top_object = self.clazz_stack[stack_len - 1]
+            top_object = self.location_stack[stack_len - 1]
+
+            if isinstance(top_object, YamlLocationFrame):
+                if field_name == "":
+                    return top_object.get_source(self)
+                return top_object.get_field_source(field_name, self)
 
-            if isinstance(top_object, YamlSourceTracker):
+            elif isinstance(top_object, YamlSourceTracker):
                 if field_name == "":
                     return top_object.get_source()
                 return top_object.get_field_source(field_name)
@@ -47,10 +84,10 @@ class DataclassVisitorContext:
         return Source(0, 0, ''.join(SourceTracker.build_code_snippet(self.get_yaml_line, 0, self.code_snippet_lines)), self.filename)
 
     # def get_location_msg(self, field_name:str = ""):
-    #     stack_len = len(self.clazz_stack)
+    #     stack_len = len(self.location_stack)
 
     #     if stack_len > 0:
-    #         top_object = self.clazz_stack[stack_len - 1]
+    #         top_object = self.location_stack[stack_len - 1]
 
     #         if isinstance(top_object, YamlSourceTracker):
     #             if field_name == "":
@@ -66,16 +103,58 @@ class DataclassVisitorContext:
 class YamlSourceLocation:
     line: int
     column: int
+    # Set when location comes from other document than the one being loaded, see layered_loader
+    document: Optional['YamlDocument'] = None
 
-    def __init__(self, line:int, column:int):
+    def __init__(self, line:int, column:int, document:Optional['YamlDocument']=None):
         self.line = line
         self.column = column
+        if document is not None:
+            self.document = document
+
+    # Locations aren't changed once parsed, copies of trees and converted values share them
+    def __deepcopy__(self, memo):
+        return self
+
+
+# Label and lines of a document, same lookup as DataclassVisitorContext has for the loaded one
+class YamlDocument:
+    __slots__ = ('filename', 'yaml_lines')
+
+    def __init__(self, filename:str, content:str):
+        self.filename = filename
+        self.yaml_lines = content.splitlines()
+
+    def get_yaml_line(self, line: int):
+        if len(self.yaml_lines) == 0:
+            return ''
+        return self.yaml_lines[ min(line, len(self.yaml_lines) - 1) ]
+
+    def __deepcopy__(self, memo):
+        return self
 
 
 class YamlFieldLocation:
     name: str
 
 
+# Lightweight location stack entry, Source with code snippet is only built when an error asks for it
+class YamlLocationFrame:
+    __slots__ = ('location', 'field_locations')
+
+    def __init__(self, location:YamlSourceLocation, field_locations:Optional[dict]=None):
+        self.location = location
+        self.field_locations = field_locations
+
+    def get_source(self, context: DataclassVisitorContext) -> Source:
+        return YamlSourceTracker.yaml_to_src(self.location, context)
+
+    def get_field_source(self, field_name:str, context: DataclassVisitorContext) -> Optional[Source]:
+        if self.field_locations is None or field_name not in self.field_locations:
+            return None
+        return YamlSourceTracker.yaml_to_src(self.field_locations[field_name], context)
+
+
 class FieldLocationScope:
     def __init__(self, field_name:str, loc:Source, context: DataclassVisitorContext):
         self.field_name = field_name
@@ -84,11 +163,11 @@ class FieldLocationScope:
 
     def __enter__(self):
         if self.source_loc is not None:
-            self.context.clazz_stack.append(self.source_loc)
+            self.context.push_location(self.source_loc)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.source_loc is not None:
-            self.context.clazz_stack.remove(self.source_loc)
+            self.context.pop_location(self.source_loc)
 
 
 def load_bool(value, context: DataclassVisitorContext):
@@ -157,6 +236,90 @@ def default_type_loaders():
     }
 
 
+# Plain (unquoted) YAML scalar, kept as written when loading with raw_scalars
+class RawScalar(str):
+    __slots__ = ()
+
+
+# Resolves raw scalar the same way SafeLoader would, for Any fields and values raw loaders don't accept
+def resolve_raw_scalar(value):
+    from bentoudev.dataclass.line_loader import resolve_plain_scalar
+    return resolve_plain_scalar(value)
+
+
+def resolve_raw_tree(obj):
+    if type(obj) is RawScalar:
+        return resolve_raw_scalar(obj)
+
+    stack = [obj]
+    while len(stack) > 0:
+        container = stack.pop()
+        if isinstance(container, dict):
+            items = container.items()
+        elif isinstance(container, list):
+            items = enumerate(container)
+        else:
+            continue
+        for key, value in list(items):
+            if type(value) is RawScalar:
+                container[key] = resolve_raw_scalar(value)
+            elif isinstance(value, (dict, list)):
+                stack.append(value)
+    return obj
+
+
+def _value_type(yaml_obj):
+    if type(yaml_obj) is RawScalar:
+        return type(resolve_raw_scalar(yaml_obj))
+    return type(yaml_obj)
+
+
+_RAW_TRUE = frozenset(['true', 'on', 'yes', 'ok', 'enable'])
+_RAW_FALSE = frozenset(['false', 'off', 'no', 'nook', 'disable'])
+
+
+# Plain decimal numbers, which YAML 1.1 resolver resolves to the same int or float python parses them as.
+# Other forms ('010' is octal, '1e5' and '0o17' are strings, underscores, sexagesimal, '.inf') are resolved.
+_RAW_INT = re.compile(r'[-+]?(?:0|[1-9][0-9]*)')
+_RAW_FLOAT = re.compile(r'[-+]?[0-9]+\.[0-9]*(?:[eE][-+][0-9]+)?|\.[0-9]+(?:[eE][-+][0-9]+)?')
+
+
+# Raw loaders parse written text directly, anything else goes through YAML resolution and default loader,
+# so accepted values and error messages stay the same
+def load_raw_bool(value:RawScalar, context: DataclassVisitorContext):
+    lowercase_value = value.lower()
+    if lowercase_value in _RAW_TRUE:
+        return True
+    if lowercase_value in _RAW_FALSE:
+        return False
+    return load_bool(resolve_raw_scalar(value), context)
+
+
+def load_raw_int(value:RawScalar, context: DataclassVisitorContext):
+    if _RAW_INT.fullmatch(value) is not None:
+        return int(value)
+    return load_int(resolve_raw_scalar(value), context)
+
+
+def load_raw_float(value:RawScalar, context: DataclassVisitorContext):
+    if _RAW_FLOAT.fullmatch(value) is not None or _RAW_INT.fullmatch(value) is not None:
+        return float(value)
+    return load_float(resolve_raw_scalar(value), context)
+
+
+def load_raw_str(value:RawScalar, context: DataclassVisitorContext):
+    return str(value)
+
+
+# Raw loader is used only while default loader of the type wasn't replaced in type_cache
+_RAW_SCALAR_LOADERS = {
+    bool : (load_bool, load_raw_bool),
+    int : (load_int, load_raw_int),
+    float : (load_float, load_raw_float),
+    str : (load_str, load_raw_str),
+}
+
+
 def is_field_hidden(field_name:str):
     return field_name.startswith('__')
 
@@ -190,28 +353,46 @@ def clear_tracked_obj(obj):
         if is_obj_dict(type(obj)):
             obj.pop('__yaml_field_location__', None)
             obj.pop('__yaml_location__', None)
+            obj.pop('__yaml_include__', None)
         else:
             delattr(obj, '__yaml_field_location__')
             delattr(obj, '__yaml_location__')
     return obj
 
 
+# Builds code snippet of Source when it's read. Keeps document lines only, not the context they came from.
+class YamlSnippetBuilder:
+    __slots__ = ('yaml_lines', 'start_line', 'snippet_lines')
+
+    def __init__(self, yaml_lines: List[str], start_line: int, snippet_lines: int):
+        self.yaml_lines = yaml_lines
+        self.start_line = start_line
+        self.snippet_lines = snippet_lines
+
+    def get_yaml_line(self, line: int):
+        if len(self.yaml_lines) == 0:
+            return ''
+        return self.yaml_lines[ min(line, len(self.yaml_lines) - 1) ]
+
+    def __call__(self) -> str:
+        return '\n'.join(SourceTracker.build_code_snippet(self.get_yaml_line, self.start_line, self.snippet_lines))
+
+
 class YamlSourceTracker(SourceTracker):
 
     @staticmethod
     def yaml_to_src(yaml_loc: YamlSourceLocation, context: DataclassVisitorContext) -> Source:
+        document = yaml_loc.document if yaml_loc.document is not None else context
         start_line: int = yaml_loc.line
-        buff = context.get_yaml_line(start_line - 1)
+        buff = document.get_yaml_line(start_line - 1)
         column: int = len(buff) - len(buff.lstrip(' \t'))
 
-        snippet: List[str] = SourceTracker.build_code_snippet(context.get_yaml_line, start_line, context.code_snippet_lines)
-        lines = '\n'.join(snippet)
-
+        snippet = YamlSnippetBuilder(document.yaml_lines, start_line, context.code_snippet_lines)
         return Source(
             line_number=start_line,
             column_number=column,
-            buffer=lines,
-            file_name=context.filename
+            buffer=snippet if document is not context or context.stable_lines else snippet(),
+            file_name=document.filename
         )
 
     @staticmethod
@@ -240,7 +421,16 @@ class YamlSourceTracker(SourceTracker):
 
 
 def YamlToScalar(clazz: type, yaml_obj: Any, context: DataclassVisitorContext):
+    if type(yaml_obj) is RawScalar:
+        raw_loader = _RAW_SCALAR_LOADERS.get(clazz, None)
+        if raw_loader is not None and context.type_cache.get(clazz, None) is raw_loader[0]:
+            return raw_loader[1](yaml_obj, context)
+        # Enum members are looked up by name, so text is used as is
+        yaml_obj = str(yaml_obj) if is_enum(clazz) else resolve_raw_scalar(yaml_obj)
+
     if clazz == Any:
+        if context.raw_scalars:
+            return resolve_raw_tree(clear_tracked_obj(yaml_obj))
         return clear_tracked_obj(yaml_obj)
 
     if is_enum(clazz):
@@ -263,16 +453,119 @@ def YamlToScalar(clazz: type, yaml_obj: Any, context: DataclassVisitorContext):
     raise UnhandledType(f"Unhandled type '{clazz}', unable to load value '{yaml_obj}'")
 
 
+def run_conversion(steps: Generator, cancel=None):
+    # Drives conversion generators with explicit stack instead of python recursion, so nesting depth
+    # is limited by memory only. Each yielded generator is a nested conversion, its result is sent back
+    # to the yielding one, errors are thrown into it as if it called the nested conversion directly.
+    # Once 'cancel' event is set, LoadCancelled is thrown into the running step, so scopes are unwound.
+    stack = [steps]
+    value = None
+    error = None
+
+    while True:
+        top = stack[-1]
+        if cancel is not None and error is None and cancel.is_set():
+            error = LoadCancelled()
+        try:
+            if error is not None:
+                nested = top.throw(error)
+                error = None
+            else:
+                nested = top.send(value)
+        except StopIteration as stop:
+            stack.pop()
+            if len(stack) == 0:
+                return stop.value
+            value = stop.value
+        except BaseException as err:
+            stack.pop()
+            if len(stack) == 0:
+                raise
+            error = err
+        else:
+            stack.append(nested)
+            value = None
+
+
 def YamlToObject(clazz: type, yaml_obj: Any, context: DataclassVisitorContext, field_name:str='', field_loc:Source=None):
+    return run_conversion(_yaml_to_object(clazz, yaml_obj, context, field_name, field_loc), context.cancel)
+
+
+# Value already converted by streaming loader, or error its conversion raised, which is re-raised
+# only if conversion of the parent gets that far, same as it would without streaming
+class ConvertedValue:
+    __slots__ = ('value', 'error')
+
+    def __init__(self, value, error:Optional[BaseException]=None):
+        self.value = value
+        self.error = error
+
+    def unwrap(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+_NOT_CONVERTED = object()
+
+
+# Scalar leaves (bool, int, float, str, enums, Any and other loaders of type_cache) are converted
+# right away, without a generator frame and trip through run_conversion. Mappings always take the full
+# path, they push their own location frame and may be included fragments.
+def _is_scalar_leaf(clazz: type, yaml_obj: Any, context: DataclassVisitorContext) -> bool:
+    if is_obj_dict(type(yaml_obj)):
+        return False
+    if clazz in context.type_cache:
+        return not dataclasses.is_dataclass(clazz)
+    return clazz is Any or is_enum(clazz)
+
+
+# Same as _yaml_to_object for values accepted by _is_scalar_leaf
+def _scalar_to_object(clazz: type, yaml_obj: Any, context: DataclassVisitorContext, field_loc:Source=None):
+    if type(yaml_obj) is ConvertedValue:
+        return yaml_obj.unwrap()
+    if field_loc is None:
+        return YamlToScalar(clazz, yaml_obj, context)
+
+    context.push_location(field_loc)
+    try:
+        return YamlToScalar(clazz, yaml_obj, context)
+    finally:
+        context.pop_location(field_loc)
+
+
+def _yaml_to_object(clazz: type, yaml_obj: Any, context: DataclassVisitorContext, field_name:str='', field_loc:Source=None):
+    if type(yaml_obj) is ConvertedValue:
+        return yaml_obj.unwrap()
+
+    # Mapping included with !include is converted once per type, nested call converts it as usual.
+    # Every include site gets its own copy, so changes of one don't show up in others.
+    if context.conversion_cache is not None and is_obj_dict(type(yaml_obj)) and '__yaml_include__' in yaml_obj:
+        key = (yaml_obj['__yaml_include__'], clazz)
+        if key not in context.converting_includes:
+            result = context.conversion_cache.get(key, _NOT_CONVERTED)
+            if result is _NOT_CONVERTED:
+                context.converting_includes.add(key)
+                try:
+                    result = yield _yaml_to_object(clazz, yaml_obj, context, field_name, field_loc)
+                finally:
+                    context.converting_includes.discard(key)
+                context.conversion_cache[key] = result
+            return copy.deepcopy(result)
+
+    obj_frame = None
+    if is_obj_tracked(yaml_obj):
+        obj_frame = YamlLocationFrame(yaml_obj['__yaml_location__'])
+
     with FieldLocationScope(field_name, field_loc, context):
-        with FieldLocationScope(field_name, YamlSourceTracker.from_yaml_obj(yaml_obj, context, []) if is_obj_tracked(yaml_obj) else None, context):
-            if typing_inspect.is_forward_ref(clazz):
+        with FieldLocationScope(field_name, obj_frame, context):
+            if is_forward_ref(clazz):
                 for t in context.ext_types:
                     if get_type_name(t) == clazz.__forward_arg__:
-                        return YamlToObject(t, yaml_obj, context)
+                        return (yield _yaml_to_object(t, yaml_obj, context))
 
             if dataclasses.is_dataclass(clazz):
-                return DictToDataclass(clazz, yaml_obj, context)
+                return (yield _dict_to_dataclass(clazz, yaml_obj, context))
 
             elif is_obj_list(clazz):
                 subtype = clazz.__args__[0]
@@ -283,89 +576,89 @@ def YamlToObject(clazz: type, yaml_obj: Any, context: DataclassVisitorContext, f
                     if num_items == 0:
                         return []
 
+                    if context.parallel is not None and num_items >= context.parallel.min_items:
+                        return context.parallel.convert_list(subtype, yaml_obj, context)
+
                     result = []
-                    for x in range(num_items):
-                        result.append(YamlToObject(subtype, yaml_obj[x], context))
+                    for item in yaml_obj:
+                        if _is_scalar_leaf(subtype, item, context):
+                            result.append(_scalar_to_object(subtype, item, context))
+                        else:
+                            result.append((yield _yaml_to_object(subtype, item, context)))
                     return result
                 # Loading inline, single element
+                elif _is_scalar_leaf(subtype, yaml_obj, context):
+                    return [ _scalar_to_object(subtype, yaml_obj, context) ]
                 else:
-                    return [ YamlToObject(subtype, yaml_obj, context) ]
+                    return [ (yield _yaml_to_object(subtype, yaml_obj, context)) ]
 
-            elif typing_inspect.get_origin(clazz) is Union:
-                preffered_type = type(yaml_obj)
-                union_types = typing_inspect.get_args(clazz)
+            elif get_origin(clazz) is Union:
+                union_types = get_args(clazz)
 
                 if len(union_types) == 2 and type(None) in union_types:
+                    # Explicit null, written by dumper for optional fields with other default
+                    if yaml_obj is None or (type(yaml_obj) is RawScalar and resolve_raw_scalar(yaml_obj) is None):
+                        return None
                     subtype = clazz.__args__[0]
-                    return YamlToObject(subtype, yaml_obj, context)
+                    if _is_scalar_leaf(subtype, yaml_obj, context):
+                        return _scalar_to_object(subtype, yaml_obj, context)
+                    return (yield _yaml_to_object(subtype, yaml_obj, context))
 
                 failed_attempts = []
                 for possible_dict_t in union_types:
                     try:
-                        result = YamlToObject(possible_dict_t, yaml_obj, context)
+                        if _is_scalar_leaf(possible_dict_t, yaml_obj, context):
+                            result = _scalar_to_object(possible_dict_t, yaml_obj, context)
+                        else:
+                            result = yield _yaml_to_object(possible_dict_t, yaml_obj, context)
                     except DataclassLoadError as err:
                         failed_attempts.append(err)
                     except Exception as err:
                         failed_attempts.append(err)
                     else:
+                        if context.profiler is not None:
+                            context.profiler.record_union_attempt(clazz, True)
                         return result
 
+                    if context.profiler is not None:
+                        context.profiler.record_union_attempt(clazz, False)
+
                 allowed_types = ', '.join([str(t) for t in union_types] )
                 loc_src = context.get_location_source()
 
                 raise DataclassLoadError.from_exception_list(
-                    msg=f"Got '{type(yaml_obj)}' when expecting 'Union [{allowed_types}]'. Failed to substitute all Union types.",
+                    msg=f"Got '{_value_type(yaml_obj)}' when expecting 'Union [{allowed_types}]'. Failed to substitute all Union types.",
                     src=loc_src,
                     excs=failed_attempts,
                     format=context.error_format
                 )
 
             elif is_obj_dict(clazz):
-                key_type, value_type = typing_inspect.get_args(clazz)
+                key_type, value_type = get_args(clazz)
 
                 if not is_obj_dict(type(yaml_obj)):
                     loc_src = context.get_location_source()
-                    raise DataclassLoadError.from_source(f"Got '{type(yaml_obj)}', when expecting 'Dict [{key_type.__name__},{value_type.__name__}]'", loc_src, context.error_format)
+                    raise DataclassLoadError.from_source(f"Got '{_value_type(yaml_obj)}', when expecting 'Dict [{key_type.__name__},{value_type.__name__}]'", loc_src, context.error_format)
 
                 entries = get_dict_items(yaml_obj)
+                if context.string_keys and key_type is not str:
+                    entries = [ (coerce_string_key(entry[0]), entry[1]) for entry in entries ]
 
-                result = { YamlToScalar(key_type, entry[0], context) : YamlToObject(value_type, entry[1], context) for entry in entries }
+                if context.parallel is not None and len(entries) >= context.parallel.min_items:
+                    return context.parallel.convert_dict(key_type, value_type, entries, context)
+
+                result = {}
+                for key, value in entries:
+                    key = YamlToScalar(key_type, key, context)
+                    if _is_scalar_leaf(value_type, value, context):
+                        result[key] = _scalar_to_object(value_type, value, context)
+                    else:
+                        result[key] = yield _yaml_to_object(value_type, value, context)
                 return result
 
             return YamlToScalar(clazz, yaml_obj, context)
 
 
-class LineLoader(SafeLoader):
-    def __init__(self, stream):
-        super(LineLoader, self).__init__(stream)
-
-    def compose_node(self, parent, index):
-        line = self.line
-        column =  self.column
-        node = Composer.compose_node(self, parent, index)
-        node.__line__ = line + 1
-        node.__column__ = column + 1
-        return node
-
-    def construct_mapping(self, node, deep=False):
-        node_pair_lst = node.value
-        locations = {}
-
-        for key_node, _ in node_pair_lst:
-            locations[key_node.value] = YamlSourceLocation(key_node.__line__, key_node.__column__)
-
-        location_node_name = ScalarNode(tag=BaseResolver.DEFAULT_SCALAR_TAG, value='__yaml_field_location__')
-        location_node_value = ScalarNode(tag=BaseResolver.DEFAULT_SCALAR_TAG, value=locations)
-
-        node_pair_lst.append((location_node_name, location_node_value))
-        node.value = node_pair_lst
-
-        mapping = Constructor.construct_mapping(self, node, deep=deep)
-        mapping['__yaml_location__'] = YamlSourceLocation(node.__line__, node.__column__)
-
-        return mapping
-
-
 def validate_dataclass_fields(clazz:type, yaml_obj:dict, fields:List[dataclasses.Field], context: DataclassVisitorContext):
     missing_fields = []
     unknown_fields = []
@@ -373,7 +666,7 @@ def validate_dataclass_fields(clazz:type, yaml_obj:dict, fields:List[dataclasses
     field_names = [ f.name for f in fields ]
 
     for field in fields:
-        if not typing_inspect.is_optional_type(field.type):
+        if not is_optional_type(field.type):
             if field.name not in entry_names:
                 missing_fields.append(field.name)
 
@@ -404,75 +697,357 @@ def validate_dataclass_fields(clazz:type, yaml_obj:dict, fields:List[dataclasses
         raise DataclassLoadError.from_error_list(root_src, errors, context.error_format)
 
 
+def _raw_items(raw, count:int) -> Optional[list]:
+    # Parsed items matching converted ones, None when they can't be matched (values already converted by streaming loader)
+    if type(raw) is ConvertedValue:
+        return None
+    if is_obj_list(type(raw)):
+        items = raw
+    elif is_obj_dict(type(raw)):
+        items = [ entry[1] for entry in get_dict_items(raw) ]
+    else:
+        items = [ raw ]
+    return items if len(items) == count else None
+
+
+def _item_key_source(raw_item, key:str, yaml_obj: Any, field_name:str, context: DataclassVisitorContext) -> Optional[Source]:
+    if raw_item is not None and is_obj_tracked(raw_item):
+        loc = raw_item['__yaml_field_location__'].get(key, raw_item['__yaml_location__'])
+        return YamlSourceTracker.yaml_to_src(loc, context)
+    # Items without locations point at the indexed field
+    if is_obj_tracked(yaml_obj) and field_name in yaml_obj['__yaml_field_location__']:
+        return YamlSourceTracker.yaml_to_src(yaml_obj['__yaml_field_location__'][field_name], context)
+    return context.get_location_source(field_name) or context.get_location_source()
+
+
+_INVALID_KEY = object()
+
+
+# Key of item in index, _INVALID_KEY when it's missing or unhashable, reported at item's location
+def _index_key(clazz: type, item: Any, raw_item: Any, name: str, spec, yaml_obj: Any, errors: list, context: DataclassVisitorContext):
+    key = getattr(item, spec.key, _INVALID_KEY)
+    if key is _INVALID_KEY:
+        msg = f"Item of type '{type(item).__name__}' has no key '{spec.key}' of index '{spec.get_name()}' of field '{name}' of class '{clazz.__name__}'"
+    else:
+        try:
+            hash(key)
+            return key
+        except TypeError:
+            msg = f"Key '{spec.key}' of index '{spec.get_name()}' of field '{name}' of class '{clazz.__name__}' has unhashable value of type '{type(key).__name__}'"
+    src = _item_key_source(raw_item, spec.key, yaml_obj, name, context)
+    errors.append(DataclassErrorMessage(src, DataclassLoadError.LABEL, msg, context.error_format))
+    return _INVALID_KEY
+
+
+# Builds indexes of fields declared with base.indexed, right after the fields were converted
+def build_field_indexes(clazz: type, result: Any, yaml_obj: Any, field_indexes: dict, context: DataclassVisitorContext):
+    indexes = {}
+    errors = []
+    for name, specs in field_indexes.items():
+        value = getattr(result, name)
+        items = list(value.values()) if isinstance(value, dict) else (value if value is not None else [])
+        raw_items = _raw_items(yaml_obj[name], len(items)) if name in yaml_obj else None
+
+        field_result = indexes[name] = {}
+        for spec in specs:
+            index = field_result[spec.get_name()] = {}
+            positions = {}
+            for idx, item in enumerate(items):
+                raw_item = raw_items[idx] if raw_items is not None else None
+                key = _index_key(clazz, item, raw_item, name, spec, yaml_obj, errors, context)
+                if key is None or key is _INVALID_KEY:
+                    continue
+                if not spec.unique:
+                    index.setdefault(key, []).append(item)
+                    continue
+
+                first_idx = positions.setdefault(key, idx)
+                if first_idx != idx:
+                    first_line = ''
+                    src = _item_key_source(raw_item, spec.key, yaml_obj, name, context)
+                    if raw_items is not None:
+                        first_src = _item_key_source(raw_items[first_idx], spec.key, yaml_obj, name, context)
+                        if first_src is not None and first_src.line_number != src.line_number:
+                            first_line = f', first defined at line {first_src.line_number}'
+                    errors.append(DataclassErrorMessage(
+                        src, DataclassLoadError.LABEL, f"Duplicate key '{key}' in index '{spec.get_name()}' of field '{name}' of class '{clazz.__name__}'{first_line}", context.error_format
+                    ))
+                    continue
+                index[key] = item
+
+    if len(errors) == 1:
+        raise DataclassLoadError.from_source(errors[0].message, errors[0].source, context.error_format)
+    if len(errors) > 1:
+        raise DataclassLoadError.from_error_list(context.get_location_source(), errors, context.error_format)
+
+    set_indexes(result, indexes)
+
+
 def DictToDataclass(clazz: type, yaml_obj: Any, context: DataclassVisitorContext):
+    return run_conversion(_dict_to_dataclass(clazz, yaml_obj, context), context.cancel)
+
+
+# Conversion step of dataclass, wrapped in profiler scope only when profiling
+def _dict_to_dataclass(clazz: type, yaml_obj: Any, context: DataclassVisitorContext):
+    if context.profiler is None:
+        return _convert_dataclass(clazz, yaml_obj, context)
+    return _profiled_dataclass(clazz, yaml_obj, context)
+
+
+def _profiled_dataclass(clazz: type, yaml_obj: Any, context: DataclassVisitorContext):
+    profiler = context.profiler
+    profiler.begin_class(clazz)
+    try:
+        return (yield _convert_dataclass(clazz, yaml_obj, context))
+    finally:
+        profiler.end_class()
+
+
+def _convert_dataclass(clazz: type, yaml_obj: Any, context: DataclassVisitorContext):
     if not dataclasses.is_dataclass(clazz):
         raise ValueError(f'Class \'{clazz}\' passed to YAMLToDataclass must be a dataclass!')
 
+    traits = get_class_traits(clazz)
+
     def handle_source_tracked(result):
-        if is_source_tracked(clazz) and hasattr(result, 'set_source_tracker'):
-            stack_len = len(context.clazz_stack)
-            if stack_len > 0:
-                st = context.clazz_stack[stack_len - 1]
-                result.set_source_tracker(YamlSourceTracker.from_inline(st, context))
+        if traits.source_tracked and hasattr(result, 'set_source_tracker'):
+            if len(context.location_stack) > 0:
+                result.set_source_tracker(YamlSourceTracker.from_inline(context.get_location_source(), context))
             else:
                 raise ValueError(f"Unable to set source tracker for {clazz}")
 
-    if is_inline_loaded(clazz):
+    if traits.inline_loaded:
         loader = get_inline_load_type(clazz)
-        loaded_val = YamlToObject(loader.inline_type, yaml_obj, context)
+        source_type = loader.select_source_type(resolve_raw_scalar(yaml_obj) if type(yaml_obj) is RawScalar else yaml_obj)
+        if source_type is None:
+            allowed_types = ', '.join([ getattr(t, '__name__', str(t)) for t in loader.source_types ])
+            raise DataclassLoadError.from_source(f"Got '{_value_type(yaml_obj)}' when expecting '{clazz.__name__}' as one of: {allowed_types}", context.get_location_source(), context.error_format)
+        if _is_scalar_leaf(source_type, yaml_obj, context):
+            loaded_val = _scalar_to_object(source_type, yaml_obj, context)
+        else:
+            loaded_val = yield _yaml_to_object(source_type, yaml_obj, context)
         result = loader.loader(loaded_val)
         handle_source_tracked(result)
         return result
 
     if is_obj_dict(type(yaml_obj)):
 
-        if context.always_track_source:
-            clazz = track_source(clazz)
+        if context.always_track_source and not traits.source_tracked:
+            traits = ensure_source_tracked(clazz)
 
         st = None
-        if is_source_tracked(clazz):
-            st = YamlSourceTracker.from_yaml_obj(yaml_obj, context, get_dict_items(yaml_obj))
-            context.clazz_stack.append(st)
+        if traits.source_tracked:
+            if is_obj_tracked(yaml_obj):
+                if context.profiler is None:
+                    st = YamlSourceTracker.from_yaml_obj(yaml_obj, context, get_dict_items(yaml_obj))
+                else:
+                    st = context.profiler.measure_source_tracking(YamlSourceTracker.from_yaml_obj, yaml_obj, context, get_dict_items(yaml_obj))
+            else:
+                # Formats without locations, track the closest known one
+                st = YamlSourceTracker.from_inline(context.get_location_source(), context)
+            context.push_location(st)
 
         def get_field_src(name:str):
             if st is not None:
                 return st.get_field_source(name)
             return None
 
-        clazz_fields = list(dataclasses.fields(clazz))
-        validate_dataclass_fields(clazz, yaml_obj, clazz_fields, context)
+        try:
+            clazz_fields = list(dataclasses.fields(clazz))
+            validate_dataclass_fields(clazz, yaml_obj, clazz_fields, context)
+
+            fieldtypes = { f.name : f.type for f in clazz_fields }
+            result = None
+            if context.lazy and supports_lazy(clazz):
+                result = yield _lazy_dataclass(clazz, yaml_obj, fieldtypes, get_field_src, context, traits)
+
+            if result is None:
+                kwargs = {}
+                for name, val in get_dict_items(yaml_obj):
+                    field_type = fieldtypes[name]
+                    if _is_scalar_leaf(field_type, val, context):
+                        kwargs[name] = _scalar_to_object(field_type, val, context, get_field_src(name))
+                    else:
+                        kwargs[name] = yield _field_to_object(traits, field_type, name, val, context, get_field_src(name))
+                result = clazz(**kwargs)
 
-        fieldtypes = { f.name : f.type for f in clazz_fields }
-        result = clazz(
-            **{ name : YamlToObject(fieldtypes[name], val, context, name, get_field_src(name)) for name, val in get_dict_items(yaml_obj) }
-        )
+            if traits.field_indexes is not None:
+                build_field_indexes(clazz, result, yaml_obj, traits.field_indexes, context)
+
+            if st is not None:
+                result.set_source_tracker(st)
 
-        if st is not None:
-            result.set_source_tracker(st)
-            context.clazz_stack.remove(st)
+        finally:
+            if st is not None:
+                context.pop_location(st)
 
         return result
 
     else:
         loc_src = context.get_location_source()
-        raise DataclassLoadError.from_source(f"Got '{type(yaml_obj)}' when expecting dataclass '{clazz.__name__}'.", loc_src, context.error_format)
+        raise DataclassLoadError.from_source(f"Got '{_value_type(yaml_obj)}' when expecting dataclass '{clazz.__name__}'.", loc_src, context.error_format)
+
+
+def _field_to_object(traits: ClassTraits, field_type: type, name: str, val: Any, context: DataclassVisitorContext, field_loc: Source):
+    if traits.columnar_fields is not None and name in traits.columnar_fields:
+        return _yaml_to_columnar(field_type, val, context, name, field_loc, traits.columnar_fields[name])
+    return _yaml_to_object(field_type, val, context, name, field_loc)
+
+
+def _field_default(f: dataclasses.Field):
+    if f.default is not dataclasses.MISSING:
+        return f.default
+    if f.default_factory is not dataclasses.MISSING:
+        return f.default_factory()
+    # Optional fields without default
+    return None
+
+
+# Rows are validated and their fields converted same as items of List[dataclass], but values go to columns
+# and no instance is created. Rows don't get source trackers and __post_init__ isn't called.
+def _yaml_to_columnar(clazz: type, yaml_obj: Any, context: DataclassVisitorContext, field_name: str, field_loc: Source, options):
+    from bentoudev.dataclass.columnar import ColumnarBuilder
+
+    if type(yaml_obj) is ConvertedValue:
+        return yaml_obj.unwrap()
 
+    list_t = clazz
+    if is_optional_type(list_t):
+        if yaml_obj is None:
+            return None
+        list_t = get_args(list_t)[0]
+
+    row_type = get_args(list_t)[0] if is_obj_list(list_t) else None
+    if row_type is not None and is_forward_ref(row_type):
+        row_type = next((t for t in context.ext_types if get_type_name(t) == row_type.__forward_arg__), None)
+    if row_type is None or not dataclasses.is_dataclass(row_type) or get_class_traits(row_type).inline_loaded:
+        raise TypeError(f"Columnar field '{field_name}' must be a List of dataclasses, got '{clazz}'")
+
+    fields = list(dataclasses.fields(row_type))
+    fieldtypes = { f.name : f.type for f in fields }
+    builder = ColumnarBuilder(row_type, fieldtypes, options.use_numpy)
+    profiler = context.profiler
+
+    with FieldLocationScope(field_name, field_loc, context):
+        for item in (yaml_obj if is_obj_list(type(yaml_obj)) else [ yaml_obj ]):
+            obj_frame = YamlLocationFrame(item['__yaml_location__']) if is_obj_tracked(item) else None
+
+            if profiler is not None:
+                profiler.begin_class(row_type)
+            try:
+                with FieldLocationScope(field_name, obj_frame, context):
+                    if not is_obj_dict(type(item)):
+                        raise DataclassLoadError.from_source(f"Got '{_value_type(item)}' when expecting dataclass '{row_type.__name__}'.", context.get_location_source(), context.error_format)
+                    validate_dataclass_fields(row_type, item, fields, context)
+
+                    entries = get_dict_items(item)
+                    for name, val in entries:
+                        if _is_scalar_leaf(fieldtypes[name], val, context):
+                            builder.append(name, _scalar_to_object(fieldtypes[name], val, context))
+                        else:
+                            builder.append(name, (yield _yaml_to_object(fieldtypes[name], val, context, name, None)))
+
+                    if len(entries) < len(fields):
+                        present = { entry[0] for entry in entries }
+                        for f in fields:
+                            if f.name not in present:
+                                builder.append(f.name, _field_default(f))
+            finally:
+                if profiler is not None:
+                    profiler.end_class()
+            builder.end_row()
+
+    return builder.build()
+
+
+def defer_conversion(clazz: type, yaml_obj: Any, context: DataclassVisitorContext, field_name:str, field_loc:Source) -> Callable[[], Any]:
+    # Forked when deferred, location stack will be long gone when field is accessed
+    forked = context.fork()
+
+    def convert():
+        return YamlToObject(clazz, yaml_obj, forked.fork(), field_name, field_loc)
+    return convert
+
+
+def _lazy_dataclass(clazz: type, yaml_obj: Any, fieldtypes: Dict[str, type], get_field_src, context: DataclassVisitorContext,
+        traits: ClassTraits):
+    # Scalars are cheap and converted right away, collections wait for first access unless they're indexed or columnar
+    field_indexes = traits.field_indexes or {}
+    columnar_fields = traits.columnar_fields or {}
+    values = {}
+    deferred = {}
+    for name, val in get_dict_items(yaml_obj):
+        if (is_obj_dict(type(val)) or is_obj_list(type(val))) and name not in field_indexes and name not in columnar_fields:
+            deferred[name] = defer_conversion(fieldtypes[name], val, context, name, get_field_src(name))
+        elif _is_scalar_leaf(fieldtypes[name], val, context):
+            values[name] = _scalar_to_object(fieldtypes[name], val, context, get_field_src(name))
+        else:
+            values[name] = yield _field_to_object(traits, fieldtypes[name], name, val, context, get_field_src(name))
+    return create_lazy_instance(clazz, values, deferred)
+
+
+def create_visitor_context(label:str, content:str, *, type_cache:Optional[dict], ext_types:list, error_format:EErrorFormat,
+        always_track_source:bool, error_code_snippet_lines:int, profiler:Optional[LoadProfiler]=None, lazy:bool=False,
+        raw_scalars:bool=False, parallel=None, cancel=None) -> DataclassVisitorContext:
+    context = DataclassVisitorContext()
+    context.ext_types = ext_types
+    context.type_cache = type_cache if type_cache is not None else default_type_loaders()
+    context.yaml_content = content
+    context.yaml_lines = content.splitlines()
+    context.filename = label
+    context.error_format = error_format
+    context.always_track_source = always_track_source
+    context.code_snippet_lines = error_code_snippet_lines
+    context.profiler = profiler
+    context.lazy = lazy
+    context.raw_scalars = raw_scalars
+    # Raw mode loads mapping keys as plain strings, converted to key type same as in JSON
+    context.string_keys = raw_scalars
+    context.cancel = cancel
+    if parallel is not None:
+        from bentoudev.dataclass.parallel import as_parallel_conversion
+        context.parallel = as_parallel_conversion(parallel)
+    return context
+
+
+def load_yaml_dataclass(clazz:type, label:str, yaml_content:str, *, type_cache:Optional[dict]=None, ext_types:list=[],
+        error_format:EErrorFormat=EErrorFormat.Pretty, always_track_source:bool=False, error_code_snippet_lines:int=4,
+        profiler:Optional[LoadProfiler]=None, lazy:bool=False, raw_scalars:bool=False, streaming:bool=False, parallel=None,
+        includes=None, cancel=None):
+    from yaml import MarkedYAMLError
+    from bentoudev.dataclass.line_loader import LineLoader, RawLineLoader
+
+    if streaming and lazy:
+        raise ValueError("Streaming and lazy loading can't be used together")
+    if streaming and parallel is not None:
+        raise ValueError("Streaming loads convert collections while parsing, parallel conversion can't be used with it")
+    if streaming and includes is not None:
+        raise ValueError("Streaming loads don't support !include")
 
-def load_yaml_dataclass(clazz:type, label:str, yaml_content:str, *, type_cache:dict=default_type_loaders(), ext_types:list=[],
-        error_format:EErrorFormat=EErrorFormat.Pretty, always_track_source:bool=False, error_code_snippet_lines:int=4):
     try:
-        context = DataclassVisitorContext()
-        context.ext_types = ext_types
-        context.type_cache = type_cache
-        context.yaml_content = yaml_content
-        context.yaml_lines = yaml_content.splitlines()
-        context.filename = label
-        context.error_format = error_format
-        context.always_track_source = always_track_source
-        context.code_snippet_lines = error_code_snippet_lines
-
-        loader = LineLoader(yaml_content)
+        context = create_visitor_context(label, yaml_content, type_cache=type_cache, ext_types=ext_types, error_format=error_format,
+            always_track_source=always_track_source, error_code_snippet_lines=error_code_snippet_lines, profiler=profiler, lazy=lazy,
+            raw_scalars=raw_scalars, parallel=parallel, cancel=cancel)
+
+        parse_start = profiler.clock() if profiler is not None else 0.0
+        loader = RawLineLoader(yaml_content) if raw_scalars else LineLoader(yaml_content)
+        if includes is not None:
+            # 'includes' resolves !include tags, like fs_loader.IncludeSession
+            includes.setup_loader(loader, label, yaml_content)
+            # Lazy values convert pending fields of the tree they were created from, they aren't copied
+            if not lazy:
+                context.conversion_cache = includes.get_conversion_cache((raw_scalars, always_track_source, tuple(ext_types), error_format), type_cache)
+                context.converting_includes = set()
+
+        if streaming:
+            from bentoudev.dataclass.event_loader import load_from_events
+            try:
+                return load_from_events(loader, clazz, context)
+            finally:
+                loader.dispose()
         loaded_yaml = loader.get_single_data()
+        if profiler is not None:
+            profiler.record_parse(profiler.clock() - parse_start)
 
         parsed_yaml = DictToDataclass(clazz, loaded_yaml, context)
         return parsed_yaml
@@ -483,3 +1058,11 @@ def load_yaml_dataclass(clazz:type, label:str, yaml_content:str, *, type_cache:d
         raise DataclassLoadError.from_source(err.problem, Source(
             err.problem_mark.line, err.problem_mark.column, err.problem_mark.get_snippet(), label
         ), error_format)
+
+
+# PyYAML is imported only when YAML is actually loaded, LineLoader stays available from here for compatibility
+def __getattr__(name:str):
+    if name == 'LineLoader':
+        from bentoudev.dataclass.line_loader import LineLoader
+        return LineLoader
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -0,0 +1,147 @@
+import pytest
+import asyncio
+import threading
+
+from dataclasses import dataclass
+from typing import List, Union
+from concurrent.futures import ThreadPoolExecutor
+import bentoudev.dataclass.async_loader as async_loader
+import bentoudev.dataclass.base as base
+
+
+@dataclass
+class clazz_person:
+    name: str
+    age: int
+
+
+def write_files(tmp_path, contents):
+    paths = []
+    for idx, content in enumerate(contents):
+        path = tmp_path / f'person_{idx}.yml'
+        path.write_text(content, encoding='utf-8')
+        paths.append(str(path))
+    return paths
+
+
+def test_load_async(tmp_path):
+    path, = write_files(tmp_path, [ 'name: foo\nage: 666' ])
+
+    result = asyncio.run(async_loader.load_yaml_dataclass_async(clazz_person, path))
+
+    assert result == clazz_person(name='foo', age=666)
+
+
+def test_load_async_error_uses_path_as_label(tmp_path):
+    path, = write_files(tmp_path, [ 'name: foo\nage: bar' ])
+
+    with pytest.raises(base.DataclassLoadError) as err:
+        asyncio.run(async_loader.load_yaml_dataclass_async(clazz_person, path))
+
+    assert err.value.source.file_name == path
+
+
+def test_load_batch_async_keeps_order(tmp_path):
+    paths = write_files(tmp_path, [ f'name: person_{i}\nage: {i}' for i in range(20) ])
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        result = asyncio.run(async_loader.load_yaml_dataclass_batch_async(clazz_person, paths, executor=executor, max_concurrency=3))
+
+    assert result == [ clazz_person(name=f'person_{i}', age=i) for i in range(20) ]
+
+
+def test_load_batch_async_merges_errors(tmp_path):
+    paths = write_files(tmp_path, [ 'name: foo\nage: 1', 'name: foo\nage: bar', 'name: foo' ])
+
+    with pytest.raises(base.DataclassLoadError) as err:
+        asyncio.run(async_loader.load_yaml_dataclass_batch_async(clazz_person, paths))
+
+    assert err.value.is_compound()
+    assert len(err.value.errors) == 2
+
+
+def test_load_batch_async_missing_file(tmp_path):
+    paths = write_files(tmp_path, [ 'name: foo\nage: 1' ])
+    paths.append(str(tmp_path / 'missing.yml'))
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(async_loader.load_yaml_dataclass_batch_async(clazz_person, paths))
+
+
+def test_load_batch_async_cancel(tmp_path):
+    paths = write_files(tmp_path, [ 'name: foo\nage: 1' ] * 50)
+
+    async def cancel_batch():
+        task = asyncio.ensure_future(async_loader.load_yaml_dataclass_batch_async(clazz_person, paths, max_concurrency=1))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_batch())
+
+
+STARTED = threading.Event()
+PROCEED = threading.Event()
+CONVERTED = []
+
+
+@dataclass
+class clazz_blocking_item:
+    value: int
+
+    def __post_init__(self):
+        CONVERTED.append(self.value)
+        # First item holds conversion until the test has cancelled the load
+        if self.value == 0:
+            STARTED.set()
+            PROCEED.wait(5)
+
+
+@dataclass
+class clazz_blocking:
+    items: List[Union[str, clazz_blocking_item]]
+
+
+def test_cancel_stops_running_conversion(tmp_path):
+    path = tmp_path / 'items.yml'
+    path.write_text('items:\n' + ''.join(f'  - value: {idx}\n' for idx in range(100)), encoding='utf-8')
+    CONVERTED.clear()
+
+    async def cancel_load(executor):
+        task = asyncio.ensure_future(async_loader.load_yaml_dataclass_async(clazz_blocking, str(path), executor=executor))
+        await asyncio.get_running_loop().run_in_executor(None, STARTED.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        PROCEED.set()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        asyncio.run(cancel_load(executor))
+    # Conversion stopped at the next step, Union didn't take LoadCancelled for failed attempt
+    assert CONVERTED == [ 0 ]
+
+
+def test_load_with_cancel_set():
+    import bentoudev.dataclass.yaml_loader as yaml
+    cancel = threading.Event()
+    assert yaml.load_yaml_dataclass(clazz_person, 'test.yml', 'name: foo\nage: 1', cancel=cancel) == clazz_person('foo', 1)
+
+    cancel.set()
+    with pytest.raises(base.LoadCancelled):
+        yaml.load_yaml_dataclass(clazz_person, 'test.yml', 'name: foo\nage: 1', cancel=cancel)
+
+
+def test_load_async_with_own_cancel(tmp_path):
+    paths = write_files(tmp_path, [ 'name: foo\nage: 1', 'name: bar\nage: 2' ])
+    cancel = threading.Event()
+
+    result = asyncio.run(async_loader.load_yaml_dataclass_async(clazz_person, paths[0], cancel=cancel))
+    assert result == clazz_person('foo', 1)
+    assert len(asyncio.run(async_loader.load_yaml_dataclass_batch_async(clazz_person, paths, cancel=cancel))) == 2
+
+    cancel.set()
+    with pytest.raises(base.LoadCancelled):
+        asyncio.run(async_loader.load_yaml_dataclass_async(clazz_person, paths[0], cancel=cancel))
+    with pytest.raises(base.LoadCancelled):
+        asyncio.run(async_loader.load_yaml_dataclass_batch_async(clazz_person, paths, cancel=cancel))
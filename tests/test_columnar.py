@@ -0,0 +1,176 @@
+import pytest
+
+from array import array
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import List, Optional
+import gc
+import tracemalloc
+import bentoudev.dataclass.yaml_loader as yaml
+import bentoudev.dataclass.json_loader as json_loader
+import bentoudev.dataclass.base as base
+import bentoudev.dataclass.columnar as columnar
+
+
+class EUnit(Enum):
+    Seconds = 1
+    Bytes = 2
+
+
+@dataclass
+class clazz_sample:
+    name: str
+    value: float
+    count: int
+    valid: bool
+    unit: Optional[EUnit] = EUnit.Seconds
+    note: Optional[str] = None
+
+
+@dataclass
+class clazz_metrics:
+    samples: List[clazz_sample] = field(metadata=base.columnar(use_numpy=False))
+
+
+@dataclass
+class clazz_metrics_eager:
+    samples: List[clazz_sample]
+
+
+def make_yaml(count:int, broken=()):
+    lines = [ 'samples:' ]
+    for idx in range(count):
+        count_value = 'many' if idx in broken else idx
+        lines.append(f'  - {{ name: s{idx}, value: {idx}.5, count: {count_value}, valid: {"yes" if idx % 2 else "no"} }}')
+    return '\n'.join(lines) + '\n'
+
+
+YAML_METRICS = (
+    'samples:\n'
+    '  - name: first\n'
+    '    value: 1\n'
+    '    count: 3\n'
+    '    valid: true\n'
+    '    unit: Bytes\n'
+    '  - name: second\n'
+    '    value: 2.5\n'
+    '    count: 99999999999999999999\n'
+    '    valid: off\n'
+    '    note: big count\n'
+)
+
+
+@pytest.mark.parametrize('options', [ {}, { 'streaming' : True }, { 'lazy' : True } ])
+def test_columnar_equals_eager(options):
+    metrics = yaml.load_yaml_dataclass(clazz_metrics, 'test.yml', YAML_METRICS, **options)
+    eager = yaml.load_yaml_dataclass(clazz_metrics_eager, 'test.yml', YAML_METRICS)
+
+    table = metrics.samples
+    assert isinstance(table, columnar.ColumnarTable)
+    assert table == eager.samples
+    assert len(table) == 2
+    assert table[0].unit == EUnit.Bytes and table[-1].unit == EUnit.Seconds
+    assert table[1].valid is False
+    assert table[1].to_dataclass() == eager.samples[1]
+    assert [ row.name for row in table ] == [ 'first', 'second' ]
+
+    # Typed columns, count falls back to list for value which doesn't fit 64 bits
+    assert isinstance(table.column('value'), array) and table.column('value').typecode == 'd'
+    assert isinstance(table.column('valid'), array) and table.column('valid').typecode == 'b'
+    assert isinstance(table.column('count'), list)
+
+
+def test_columnar_errors_equal_eager():
+    content = make_yaml(10, broken=(7,))
+    with pytest.raises(base.DataclassLoadError) as expected:
+        yaml.load_yaml_dataclass(clazz_metrics_eager, 'test.yml', content)
+    with pytest.raises(base.DataclassLoadError) as err:
+        yaml.load_yaml_dataclass(clazz_metrics, 'test.yml', content)
+    assert str(err.value) == str(expected.value)
+
+    content = YAML_METRICS.replace('    note: big count\n', '    other: 1\n')
+    with pytest.raises(base.DataclassLoadError) as expected:
+        yaml.load_yaml_dataclass(clazz_metrics_eager, 'test.yml', content)
+    with pytest.raises(base.DataclassLoadError) as err:
+        yaml.load_yaml_dataclass(clazz_metrics, 'test.yml', content)
+    assert str(err.value) == str(expected.value)
+
+
+def test_columnar_json_and_row_update():
+    metrics = json_loader.load_json_dataclass(clazz_metrics, 'test.json', '{ "samples": [ { "name": "a", "value": 1, "count": 2, "valid": true } ] }')
+    row = metrics.samples[0]
+    row.count = 5
+    assert metrics.samples.column('count')[0] == 5
+    with pytest.raises(AttributeError):
+        row.missing
+
+
+def test_columnar_dump():
+    from bentoudev.dataclass.dumper import dump_yaml_dataclass
+    metrics = yaml.load_yaml_dataclass(clazz_metrics, 'test.yml', YAML_METRICS)
+    dumped = dump_yaml_dataclass(metrics, clazz=clazz_metrics)
+    assert yaml.load_yaml_dataclass(clazz_metrics_eager, 'test.yml', dumped) == yaml.load_yaml_dataclass(clazz_metrics_eager, 'test.yml', YAML_METRICS)
+
+
+# Own class for tracked variant, always_track_source marks loaded classes as tracked for good
+@base.track_source
+@dataclass
+class clazz_metrics_tracked:
+    samples: List[clazz_sample] = field(metadata=base.columnar(use_numpy=False))
+
+
+@pytest.mark.parametrize('clazz,include_sources', [ (clazz_metrics, False), (clazz_metrics_tracked, True) ])
+def test_columnar_snapshot(clazz, include_sources):
+    import bentoudev.dataclass.snapshot as snapshot
+    metrics = yaml.load_yaml_dataclass(clazz, 'test.yml', YAML_METRICS)
+    data = snapshot.dumps_snapshot(metrics, include_sources=include_sources)
+    result = snapshot.loads_snapshot(clazz, data)
+
+    assert isinstance(result.samples, columnar.ColumnarTable)
+    assert result.samples == metrics.samples
+    assert result.samples.column('value').typecode == 'd'
+
+
+def test_columnar_invalid_field():
+    @dataclass
+    class clazz_invalid:
+        names: List[str] = field(metadata=base.columnar())
+
+    with pytest.raises(TypeError):
+        yaml.load_yaml_dataclass(clazz_invalid, 'test.yml', 'names: [ a ]')
+
+
+def test_columnar_uses_less_memory():
+    content = make_yaml(500)
+
+    def measure(clazz):
+        # Warm up, so type plans and imports aren't measured
+        yaml.load_yaml_dataclass(clazz, 'test.yml', content)
+        tracemalloc.start()
+        try:
+            result = yaml.load_yaml_dataclass(clazz, 'test.yml', content)
+            # Parsed nodes reference each other, only what's kept by the result is measured
+            gc.collect()
+            size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        return result, size
+
+    table, table_size = measure(clazz_metrics)
+    rows, rows_size = measure(clazz_metrics_eager)
+    assert table.samples == rows.samples
+    assert table_size < rows_size * 0.6
+
+
+def test_numpy_columns():
+    numpy = pytest.importorskip('numpy')
+
+    @dataclass
+    class clazz_numpy_metrics:
+        samples: List[clazz_sample] = field(metadata=base.columnar(use_numpy=True))
+
+    metrics = yaml.load_yaml_dataclass(clazz_numpy_metrics, 'test.yml', make_yaml(4))
+    values = metrics.samples.column('value')
+    assert isinstance(values, numpy.ndarray)
+    assert values.tolist() == [ 0.5, 1.5, 2.5, 3.5 ]
+    assert metrics.samples.column('valid').dtype == numpy.bool_
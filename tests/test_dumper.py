@@ -0,0 +1,215 @@
+import pytest
+import io
+import json
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+from enum import Enum
+import bentoudev.dataclass.yaml_loader as yaml
+import bentoudev.dataclass.dumper as dumper
+import bentoudev.dataclass.base as base
+
+
+class some_enum(Enum):
+    FIRST = 1
+    SECOND = 2
+
+
+@base.inline_loader(source_type=str, field_name='name')
+@dataclass
+class clazz_inline_ref:
+    name: str
+    version: Optional[int] = None
+
+
+@dataclass
+class clazz_person:
+    name: str
+    age: int
+
+
+@dataclass
+class clazz_everything:
+    f_str: str
+    f_int: int
+    f_float: float
+    f_bool: bool
+    f_enum: some_enum
+    f_list: List[clazz_person]
+    f_dict: Dict[int, str]
+    f_union: Union[int, str, clazz_person]
+    f_any: Any
+    f_ref: clazz_inline_ref
+    f_optional: Optional[str] = None
+    f_defaulted: Optional[List[str]] = field(default_factory=list)
+    self_nested: Optional['tests.test_dumper.clazz_everything'] = None # noqa: F821
+
+
+def make_everything():
+    return clazz_everything(
+        f_str='yes',
+        f_int=-666,
+        f_float=1e+20,
+        f_bool=False,
+        f_enum=some_enum.SECOND,
+        f_list=[ clazz_person(name='123', age=1), clazz_person(name='multi\nline', age=2) ],
+        f_dict={ 1 : 'one', 2 : 'null' },
+        f_union='666',
+        f_any={ 'nested' : [ 1, 2.5, 'text', None, True ] },
+        f_ref=clazz_inline_ref(name='some_ref'),
+        f_defaulted=[],
+        self_nested=clazz_everything(
+            f_str='',
+            f_int=0,
+            f_float=float('inf'),
+            f_bool=True,
+            f_enum=some_enum.FIRST,
+            f_list=[],
+            f_dict={},
+            f_union=clazz_person(name='union', age=3),
+            f_any='text',
+            f_ref=clazz_inline_ref(name='other_ref'),
+            f_optional='set'
+        )
+    )
+
+
+def test_yaml_roundtrip():
+    obj = make_everything()
+
+    content = dumper.dump_yaml_dataclass(obj, ext_types=[clazz_everything])
+    result = yaml.load_yaml_dataclass(clazz_everything, 'test.yml', content, ext_types=[clazz_everything])
+
+    assert result == obj
+
+
+def test_yaml_collapses_inline_loader():
+    content = dumper.dump_yaml_dataclass(make_everything(), ext_types=[clazz_everything])
+
+    assert 'f_ref: some_ref\n' in content
+    assert 'f_optional' in content
+    assert content.count('f_optional') == 1
+
+
+def test_yaml_inline_loader_with_extra_fields_fails():
+    obj = make_everything()
+    obj.f_ref.version = 2
+
+    with pytest.raises(ValueError):
+        dumper.dump_yaml_dataclass(obj, ext_types=[clazz_everything])
+
+
+def test_yaml_writes_to_stream():
+    stream = io.StringIO()
+
+    result = dumper.dump_yaml_dataclass(clazz_person(name='foo', age=666), stream)
+
+    assert result is None
+    assert stream.getvalue() == 'name: foo\nage: 666\n'
+
+
+@pytest.mark.parametrize('indent', [ None, 2 ])
+def test_json_roundtrip(indent):
+    obj = make_everything()
+    obj.f_float = 3.14
+    obj.self_nested.f_float = 0.5
+    obj.f_dict = {}
+
+    content = dumper.dump_json_dataclass(obj, ext_types=[clazz_everything], indent=indent)
+    result = yaml.load_yaml_dataclass(clazz_everything, 'test.json', content, ext_types=[clazz_everything])
+
+    assert json.loads(content)['f_ref'] == 'some_ref'
+    assert result == obj
+
+
+def test_json_matches_json_module():
+    obj = clazz_person(name='f"oó', age=666)
+
+    stream = io.StringIO()
+    dumper.dump_json_dataclass(obj, stream, indent=4)
+
+    assert stream.getvalue() == json.dumps({ 'name' : obj.name, 'age' : obj.age }, indent=4, ensure_ascii=False)
+    assert dumper.dump_json_dataclass(obj) == json.dumps({ 'name' : obj.name, 'age' : obj.age }, separators=(',', ':'), ensure_ascii=False)
+
+
+@dataclass
+class clazz_defaults:
+    name: str
+    count: Optional[int] = 5
+    note: Optional[str] = None
+    tags: Optional[List[str]] = field(default_factory=list)
+
+
+def test_only_defaults_are_omitted():
+    obj = clazz_defaults(name='a', count=None, tags=None)
+    content = dumper.dump_yaml_dataclass(obj)
+    assert content == 'name: a\ncount: null\ntags: null\n'
+    assert yaml.load_yaml_dataclass(clazz_defaults, 'test.yml', content) == obj
+    assert yaml.load_yaml_dataclass(clazz_defaults, 'test.json', dumper.dump_json_dataclass(obj)) == obj
+    assert yaml.load_yaml_dataclass(clazz_defaults, 'test.yml', content, raw_scalars=True) == obj
+
+    obj = clazz_defaults(name='a', note='b')
+    assert dumper.dump_yaml_dataclass(obj) == 'name: a\nnote: b\n'
+    assert dumper.dump_json_dataclass(obj) == '{"name":"a","note":"b"}'
+
+
+def test_optional_without_default_is_written():
+    @dataclass
+    class clazz_no_default:
+        value: Optional[int]
+
+    content = dumper.dump_yaml_dataclass(clazz_no_default(None))
+    assert content == 'value: null\n'
+    assert yaml.load_yaml_dataclass(clazz_no_default, 'test.yml', content) == clazz_no_default(None)
+
+
+@pytest.mark.parametrize('clazz,value', [
+    (Union[int, str], 1),
+    (Union[int, str], '1'),
+    (Union[int, float], 1),
+    (Union[int, float], 1.5),
+    (Union[int, bool], True),
+    (Union[some_enum, int], some_enum.FIRST),
+])
+def test_union_roundtrip(clazz, value):
+    @dataclass
+    class clazz_union:
+        value: clazz
+
+    obj = clazz_union(value)
+    assert yaml.load_yaml_dataclass(clazz_union, 'test.yml', dumper.dump_yaml_dataclass(obj)) == obj
+    assert yaml.load_yaml_dataclass(clazz_union, 'test.json', dumper.dump_json_dataclass(obj)) == obj
+
+
+@pytest.mark.parametrize('clazz', [ Union[str, int], Union[float, int], Union[bool, int], Union[some_enum, str], Union[str, some_enum] ])
+def test_ambiguous_union_fails(clazz):
+    @dataclass
+    class clazz_union:
+        value: clazz
+
+    # Written '1' would load back as a string
+    with pytest.raises(base.UnhandledType):
+        dumper.dump_yaml_dataclass(clazz_union(1 if clazz is not Union[some_enum, str] else 'FIRST'))
+    with pytest.raises(base.UnhandledType):
+        dumper.dump_json_dataclass(clazz_union(1 if clazz is not Union[some_enum, str] else 'FIRST'))
+
+
+def test_json_flushes_by_size():
+    class recording_stream(io.StringIO):
+        def __init__(self):
+            super().__init__()
+            self.writes = []
+
+        def write(self, text):
+            self.writes.append(len(text))
+            return super().write(text)
+
+    obj = clazz_person(name='x' * (dumper._JSON_FLUSH_SIZE * 2), age=1)
+    stream = recording_stream()
+    dumper.dump_json_dataclass(clazz_defaults(name='a', tags=[ 'x' * 100 ] * 200), stream)
+    assert len(stream.writes) > 1 and all(size < dumper._JSON_FLUSH_SIZE + 110 for size in stream.writes)
+
+    stream = recording_stream()
+    dumper.dump_json_dataclass(obj, stream)
+    assert json.loads(stream.getvalue())['name'] == obj.name
+    assert stream.writes[0] > dumper._JSON_FLUSH_SIZE and len(stream.writes) == 2
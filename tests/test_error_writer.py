@@ -0,0 +1,108 @@
+import pytest
+import io
+import json
+
+from dataclasses import dataclass
+from typing import List
+import bentoudev.dataclass.yaml_loader as yaml
+import bentoudev.dataclass.base as base
+import bentoudev.dataclass.error_writer as error_writer
+
+
+@dataclass
+class clazz_item:
+    name: str
+    count: int
+
+
+@dataclass
+class clazz_items:
+    items: List[clazz_item]
+
+
+YAML_SINGLE = (
+    'items:\n'
+    '  - name: first\n'
+    '    count: one\n'
+)
+
+YAML_MANY = (
+    'items:\n'
+    '  - name: first\n'
+    '    other: 1\n'
+    '    more: 2\n'
+)
+
+
+def load_error(content:str, error_format:base.EErrorFormat=base.EErrorFormat.Pretty) -> base.DataclassLoadError:
+    with pytest.raises(base.DataclassLoadError) as err:
+        yaml.load_yaml_dataclass(clazz_items, 'test.yml', content, error_format=error_format)
+    return err.value
+
+
+@pytest.mark.parametrize('error_format', [ base.EErrorFormat.Pretty, base.EErrorFormat.MSVC ])
+@pytest.mark.parametrize('with_sources', [ False, True ])
+def test_single_error_matches_str(error_format, with_sources):
+    err = load_error(YAML_SINGLE, error_format)
+    sources = { 'test.yml' : YAML_SINGLE } if with_sources else None
+
+    out = io.StringIO()
+    assert error_writer.write_load_errors([err], out, error_format=error_format, sources=sources) == 1
+    assert out.getvalue() == str(err) + '\n'
+
+
+def test_entries_order_matches_str():
+    err = load_error(YAML_MANY)
+    entries = list(error_writer.iter_error_entries(err))
+    assert [ e.message for e in entries ] == [
+        "Unknown field 'other' for class 'clazz_item'",
+        "Unknown field 'more' for class 'clazz_item'",
+        "Missing required field(s) of class 'clazz_item': count",
+    ]
+    text = str(err)
+    assert text.index("'other'") < text.index("'more'") < text.index('Missing required')
+
+
+def test_errors_grouped_by_line():
+    src_first = base.Source(2, 5, 'items:\n  - name: first', 'test.yml')
+    src_second = base.Source(2, 11, 'items:\n  - name: first', 'test.yml')
+    src_other = base.Source(1, 1, 'items:', 'test.yml')
+    err = base.DataclassLoadError.from_error_list(None, [
+        base.DataclassErrorMessage(src_first, 'error', 'first', base.EErrorFormat.Pretty),
+        base.DataclassErrorMessage(None, 'error', 'no source', base.EErrorFormat.Pretty),
+        base.DataclassErrorMessage(src_second, 'error', 'second', base.EErrorFormat.Pretty),
+        base.DataclassErrorMessage(src_other, 'warning', 'other', base.EErrorFormat.Pretty),
+    ])
+
+    out = io.StringIO()
+    assert error_writer.write_load_errors([err], out, sources={ 'test.yml' : YAML_MANY }) == 4
+    lines = out.getvalue().splitlines()
+
+    # Snippet of shared line is written once, after all of its messages
+    assert lines.count('>    - name: first') == 1
+    main_lines = [ line for line in lines if not line.startswith('>') ]
+    assert main_lines == [
+        'warning: other',
+        'in "test.yml", line 1, column 1:',
+        'error: first',
+        'in "test.yml", line 2, column 5:',
+        'error: second',
+        'in "test.yml", line 2, column 11:',
+        'error: no source',
+    ]
+
+
+def test_json_lines():
+    err = load_error(YAML_MANY)
+    out = io.StringIO()
+    error_writer.write_load_errors([err, ValueError('not a load error')], out, error_format=base.EErrorFormat.JsonLines)
+
+    lines = [ json.loads(line) for line in out.getvalue().splitlines() ]
+    assert len(lines) == 4
+    assert lines[2] == { 'file' : 'test.yml', 'line' : 2, 'column' : 2, 'label' : 'error', 'message' : "Missing required field(s) of class 'clazz_item': count" }
+    assert lines[3] == { 'file' : None, 'line' : None, 'column' : None, 'label' : 'error', 'message' : 'not a load error' }
+
+
+def test_json_lines_error_format():
+    err = load_error(YAML_SINGLE, base.EErrorFormat.JsonLines)
+    assert json.loads(str(err)) == { 'file' : 'test.yml', 'line' : 2, 'column' : 2, 'label' : 'error', 'message' : "Got '<class 'str'>' when expecting an int" }
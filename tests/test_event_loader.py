@@ -0,0 +1,153 @@
+import pytest
+import tracemalloc
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+import bentoudev.dataclass.yaml_loader as yaml
+import bentoudev.dataclass.base as base
+
+
+@dataclass
+class clazz_port:
+    number: int
+    protocol: Optional[str] = None
+
+
+@base.track_source
+@dataclass
+class clazz_service:
+    name: str
+    ports: List[clazz_port]
+    labels: Optional[Dict[str, str]] = None
+    extra: Optional[Any] = None
+    target: Optional[Union[clazz_port, List[int]]] = None
+
+
+@dataclass
+class clazz_root:
+    services: List[clazz_service]
+    groups: Optional[Dict[str, List[clazz_port]]] = None
+    matrix: Optional[List[List[int]]] = None
+
+
+YAML_ROOT = (
+    'services:\n'
+    '  - name: first\n'
+    '    ports:\n'
+    '      - number: 80\n'
+    '      - &https { number: 443, protocol: tcp }\n'
+    '    labels: &labels\n'
+    '      team: core\n'
+    '    extra: { a: [ 1, 2 ], b: ~ }\n'
+    '  - name: second\n'
+    '    ports: *https\n'
+    '    labels:\n'
+    '      <<: *labels\n'
+    '      tier: back\n'
+    '    target: [ 1, 2 ]\n'
+    'groups:\n'
+    '  web:\n'
+    '    - number: 8080\n'
+    '    - *https\n'
+    'matrix: [ [ 1, 2 ], [ 3 ] ]\n'
+)
+
+
+def load_both(content:str, **kwargs):
+    results = []
+    for streaming in (False, True):
+        try:
+            results.append(yaml.load_yaml_dataclass(clazz_root, 'test.yml', content, streaming=streaming, **kwargs))
+        except base.DataclassLoadError as err:
+            results.append(str(err))
+    return results
+
+
+def test_streaming_equals_eager():
+    eager, streamed = load_both(YAML_ROOT)
+    assert isinstance(streamed, clazz_root)
+    assert streamed == eager
+    assert streamed.services[1].labels == { 'team' : 'core', 'tier' : 'back' }
+    assert streamed.services[0].get_root_source().line_number == 2
+    assert streamed.services[1].get_field_source('ports').line_number == 10
+
+
+@pytest.mark.parametrize('always_track_source', [ False, True ])
+@pytest.mark.parametrize('old,new', [
+    ('number: 80', 'number: eighty'),
+    ('number: 8080', 'port: 8080'),
+    ('- number: 80\n', '- protocol: udp\n'),
+    ('[ 1, 2 ], [ 3 ]', '[ 1, 2 ], [ x ]'),
+    ('tier: back', 'tier: [ back ]'),
+    ('target: [ 1, 2 ]', 'target: [ 1, b ]'),
+    ('    target: [ 1, 2 ]\n', '    unknown: [ 1 ]\n    target: { number: x }\n'),
+    ('  - name: second\n', '  - name: second\n    name2: x\n'),
+])
+def test_streaming_errors_equal_eager(old, new, always_track_source):
+    content = YAML_ROOT.replace(old, new)
+    assert content != YAML_ROOT
+    eager, streamed = load_both(content, always_track_source=always_track_source)
+    assert isinstance(eager, str)
+    assert streamed == eager
+
+
+@pytest.mark.parametrize('content', [
+    'services: []\n---\nservices: []\n',
+    'services: *missing\n',
+    'services:\n  - &a { name: x, ports: [] }\n  - &a { name: y, ports: [] }\n',
+    'services: [ { name: x, ports: [], <<: 1 } ]\n',
+    'services: { [ 1 ]: x }\n',
+])
+def test_streaming_yaml_errors(content):
+    with pytest.raises(base.DataclassLoadError):
+        yaml.load_yaml_dataclass(clazz_root, 'test.yml', content, streaming=True)
+
+
+def test_streaming_aliased_merged_mapping():
+    content = (
+        'services:\n'
+        '  - &first\n'
+        '    <<: &base { name: base, ports: [ { number: 1 } ] }\n'
+        '    labels: { team: core }\n'
+        '  - *first\n'
+    )
+    eager, streamed = load_both(content)
+    assert isinstance(streamed, clazz_root)
+    assert streamed == eager
+    assert streamed.services[1].name == 'base'
+    assert streamed.services[1].get_field_source('name').line_number == 3
+
+    content = 'groups:\n  a: &merged\n    - <<: { number: 1 }\n      protocol: tcp\n  b: *merged\nservices: []\n'
+    eager, streamed = load_both(content)
+    assert streamed == eager
+    assert streamed.groups['b'] == [ clazz_port(1, 'tcp') ]
+
+
+def test_streaming_raw_scalars():
+    content = YAML_ROOT.replace('team: core', 'team: no')
+    eager = yaml.load_yaml_dataclass(clazz_root, 'test.yml', content, raw_scalars=True)
+    streamed = yaml.load_yaml_dataclass(clazz_root, 'test.yml', content, raw_scalars=True, streaming=True)
+    assert streamed == eager
+    assert streamed.services[0].labels['team'] == 'no'
+
+
+def test_streaming_lower_peak_memory():
+    content = 'services:\n' + ''.join(
+        f'  - name: service{i}\n    ports:\n      - number: {i}\n        protocol: tcp\n    labels: {{ a: b, c: d }}\n' for i in range(300)
+    )
+
+    peaks = []
+    for streaming in (False, True):
+        tracemalloc.start()
+        try:
+            yaml.load_yaml_dataclass(clazz_root, 'test.yml', content, streaming=streaming)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    assert peaks[1] * 3 < peaks[0]
+
+
+def test_streaming_not_lazy():
+    with pytest.raises(ValueError):
+        yaml.load_yaml_dataclass(clazz_root, 'test.yml', YAML_ROOT, streaming=True, lazy=True)
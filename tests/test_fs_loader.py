@@ -0,0 +1,59 @@
+import pytest
+import zipfile
+
+from dataclasses import dataclass
+import bentoudev.dataclass.fs_loader as fs_loader
+import bentoudev.dataclass.base as base
+
+memoryfs = pytest.importorskip('fs.memoryfs')
+zipfs = pytest.importorskip('fs.zipfs')
+
+
+@dataclass
+@base.loaded_from_file
+class clazz_person:
+    name: str
+    age: int
+
+
+@dataclass
+class clazz_plain:
+    name: str
+
+
+def test_load_from_memory_fs():
+    mem = memoryfs.MemoryFS()
+    mem.makedirs('people/nested')
+    mem.writetext('people/first.yml', 'name: first\nage: 1')
+    mem.writetext('people/nested/second.yml', 'name: second\nage: 2')
+    mem.writetext('people/ignored.txt', 'not yaml')
+
+    result = dict(fs_loader.load_yaml_dataclass_from_fs(mem, '**/*.yml', clazz_person))
+
+    assert result == {
+        '/people/first.yml' : clazz_person(name='first', age=1),
+        '/people/nested/second.yml' : clazz_person(name='second', age=2),
+    }
+    assert result['/people/first.yml'].get_loaded_from_file() == '/people/first.yml'
+
+
+def test_load_from_zip_fs(tmp_path):
+    bundle = tmp_path / 'bundle.zip'
+    with zipfile.ZipFile(bundle, 'w') as z:
+        z.writestr('configs/a.yml', 'name: a')
+        z.writestr('configs/b.yml', 'name: b')
+
+    with zipfs.ZipFS(str(bundle)) as archive:
+        result = sorted(obj.name for _, obj in fs_loader.load_yaml_dataclass_from_fs(archive, '**/*.yml', clazz_plain))
+
+    assert result == [ 'a', 'b' ]
+
+
+def test_load_from_fs_error_label():
+    mem = memoryfs.MemoryFS()
+    mem.writetext('broken.yml', 'name: foo\nage: bar')
+
+    with pytest.raises(base.DataclassLoadError) as err:
+        list(fs_loader.load_yaml_dataclass_from_fs(mem, '*.yml', clazz_person))
+
+    assert err.value.source.file_name == '/broken.yml'
@@ -0,0 +1,62 @@
+import pytest
+import dataclasses
+import subprocess
+import sys
+import os
+import typing
+import bentoudev.dataclass.base as base
+
+
+# Cumulative import time of bentoudev.dataclass.base in microseconds, measured with 'python -X importtime'.
+# Wall clock depends on machine load, so it's only checked when BENTOUDEV_BENCHMARK is set.
+BASE_IMPORT_BUDGET_US = 55000
+BASE_IMPORT_RUNS = 5
+
+
+def run_python(code:str, *args):
+    result = subprocess.run([ sys.executable, *args, '-c', code ], capture_output=True, text=True, check=True)
+    return result
+
+
+@pytest.mark.parametrize('module,heavy_modules', [
+    ('bentoudev.dataclass.base', [ 'typing_inspect', 'yaml' ]),
+    ('bentoudev.dataclass.json_schema', [ 'typing_inspect', 'yaml' ]),
+    ('bentoudev.dataclass.json_loader', [ 'typing_inspect', 'yaml' ]),
+    ('bentoudev.dataclass.validator', [ 'typing_inspect', 'yaml' ]),
+    ('bentoudev.dataclass.yaml_loader', [ 'typing_inspect', 'yaml' ]),
+])
+def test_no_heavy_imports(module, heavy_modules):
+    result = run_python(f'import sys, {module}; print(",".join(m for m in {heavy_modules!r} if m in sys.modules))')
+    assert result.stdout.strip() == ''
+
+
+def test_yaml_imported_on_load():
+    result = run_python(
+        'import sys, dataclasses, bentoudev.dataclass.yaml_loader as yaml\n'
+        '@dataclasses.dataclass\n'
+        'class clazz:\n'
+        '    value: int\n'
+        'assert yaml.load_yaml_dataclass(clazz, "test.yml", "value: 1").value == 1\n'
+        'print("yaml" in sys.modules)'
+    )
+    assert result.stdout.strip() == 'True'
+
+
+@pytest.mark.parametrize('clazz', [ v for v in vars(base).values()
+    if isinstance(v, type) and dataclasses.is_dataclass(v) and v.__module__ == base.__name__ and not v.__name__.startswith('_') ])
+def test_base_dataclass_type_hints(clazz):
+    assert typing.get_type_hints(clazz).keys() >= { f.name for f in dataclasses.fields(clazz) }
+
+
+def measure_base_import() -> int:
+    result = run_python('import bentoudev.dataclass.base', '-X', 'importtime')
+    timings = [ line.split('|') for line in result.stderr.splitlines() if line.startswith('import time:') ]
+    cumulative = [ int(t[1]) for t in timings if t[2].strip() == 'bentoudev.dataclass.base' ]
+    assert len(cumulative) == 1
+    return cumulative[0]
+
+
+@pytest.mark.skipif(not os.environ.get('BENTOUDEV_BENCHMARK'), reason="benchmark, set BENTOUDEV_BENCHMARK to run")
+def test_base_import_budget():
+    # Best run, single runs are noisy on loaded machines
+    assert min(measure_base_import() for _ in range(BASE_IMPORT_RUNS)) < BASE_IMPORT_BUDGET_US
@@ -0,0 +1,160 @@
+import pytest
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import bentoudev.dataclass.yaml_loader as yaml
+import bentoudev.dataclass.fs_loader as fs_loader
+import bentoudev.dataclass.base as base
+
+memoryfs = pytest.importorskip('fs.memoryfs')
+
+
+CONVERTED = []
+
+
+@dataclass
+class clazz_database:
+    host: str
+    port: int
+
+    def __post_init__(self):
+        CONVERTED.append(self.host)
+
+
+@dataclass
+class clazz_service:
+    name: str
+    database: clazz_database
+    replicas: Optional[List[clazz_database]] = None
+    extra: Optional[Dict[str, Any]] = None
+
+
+def make_fs():
+    mem = memoryfs.MemoryFS()
+    mem.makedirs('services/common')
+    mem.writetext('services/common/db.yml', 'host: db.local\nport: 5432\n')
+    mem.writetext('services/api.yml', 'name: api\ndatabase: !include common/db.yml\nreplicas: [ !include ./common/db.yml ]\n')
+    mem.writetext('services/web.yml', 'name: web\ndatabase: !include /services/common/db.yml\n')
+    return mem
+
+
+def test_relative_includes_are_parsed_and_converted_once():
+    session = fs_loader.IncludeSession(make_fs())
+    CONVERTED.clear()
+    api : clazz_service = session.load(clazz_service, 'services/api.yml')
+    web : clazz_service = session.load(clazz_service, 'services/web.yml')
+
+    assert CONVERTED == [ 'db.local' ]
+    assert api.database == clazz_database('db.local', 5432)
+    assert session.parse_count == 1
+
+    # Every include site gets its own object
+    assert api.database == web.database == api.replicas[0]
+    assert api.database is not web.database and api.replicas[0] is not api.database
+    api.database.port = 1
+    assert web.database.port == 5432
+    assert session.load(clazz_service, 'services/api.yml').database.port == 5432
+
+
+def test_fragment_converted_per_type():
+    session = fs_loader.IncludeSession(make_fs())
+    api : clazz_service = session.load(clazz_service, 'services/api.yml')
+
+    session.fs.writetext('services/raw.yml', 'name: raw\ndatabase: { host: h, port: 1 }\nextra: { db: !include common/db.yml }\n')
+    raw : clazz_service = session.load(clazz_service, 'services/raw.yml')
+    assert raw.extra == { 'db' : { 'host' : 'db.local', 'port' : 5432 } }
+    assert session.parse_count == 1
+    assert api.database == clazz_database('db.local', 5432)
+    assert session.load(clazz_service, 'services/web.yml').database == api.database
+
+
+def test_fragment_included_as_any_and_dataclass():
+    mem = make_fs()
+    mem.writetext('services/common/db.yml', 'host: db.local\n\nport: many\n')
+    mem.writetext('services/raw.yml', 'name: raw\ndatabase: { host: h, port: 1 }\nextra: { a: !include common/db.yml, b: !include common/db.yml }\n')
+    session = fs_loader.IncludeSession(mem)
+
+    raw : clazz_service = session.load(clazz_service, 'services/raw.yml')
+    assert raw.extra['a'] == raw.extra['b'] == { 'host' : 'db.local', 'port' : 'many' }
+    assert raw.extra['a'] is not raw.extra['b']
+    raw.extra['a']['host'] = 'changed'
+    assert session.load(clazz_service, 'services/raw.yml').extra['b']['host'] == 'db.local'
+
+    # Tree converted to Any before still has its locations
+    with pytest.raises(base.DataclassLoadError) as err:
+        session.load(clazz_service, 'services/web.yml')
+    assert err.value.source.file_name == '/services/common/db.yml'
+    assert err.value.source.buffer == 'host: db.local'
+    assert session.parse_count == 1
+
+
+def test_changed_fragment_is_parsed_again():
+    session = fs_loader.IncludeSession(make_fs())
+    session.load(clazz_service, 'services/api.yml')
+    session.fs.writetext('services/common/db.yml', 'host: other\nport: 1\n')
+
+    web : clazz_service = session.load(clazz_service, 'services/web.yml')
+    assert web.database == clazz_database('other', 1)
+    assert session.parse_count == 2
+
+
+def test_include_cycle():
+    mem = memoryfs.MemoryFS()
+    mem.writetext('a.yml', 'name: a\ndatabase: !include b.yml\n')
+    mem.writetext('b.yml', 'host: !include a.yml\nport: 1\n')
+
+    with pytest.raises(base.DataclassLoadError) as err:
+        fs_loader.IncludeSession(mem).load(clazz_service, 'a.yml')
+    assert 'Include cycle: /a.yml -> /b.yml -> /a.yml' in err.value.msg
+    assert err.value.source.file_name == '/b.yml'
+    assert err.value.source.line_number == 1
+
+
+def test_errors_point_at_included_file():
+    mem = make_fs()
+    mem.writetext('services/common/db.yml', 'host: db.local\nport: many\n')
+    with pytest.raises(base.DataclassLoadError) as err:
+        fs_loader.IncludeSession(mem).load(clazz_service, 'services/api.yml')
+    assert err.value.source.file_name == '/services/common/db.yml'
+    assert err.value.source.buffer == 'host: db.local'
+
+    mem.writetext('services/common/db.yml', 'host: [ db\n')
+    with pytest.raises(base.DataclassLoadError) as err:
+        fs_loader.IncludeSession(mem).load(clazz_service, 'services/api.yml')
+    assert err.value.source.file_name == '/services/common/db.yml'
+
+
+def test_missing_include():
+    mem = memoryfs.MemoryFS()
+    mem.writetext('a.yml', 'name: a\n\ndatabase: !include missing.yml\n')
+    with pytest.raises(base.DataclassLoadError) as err:
+        fs_loader.IncludeSession(mem).load(clazz_service, 'a.yml')
+    assert "Unable to include '/missing.yml'" in err.value.msg
+    assert err.value.source.line_number == 3
+
+
+def test_walk_shares_session():
+    mem = make_fs()
+    session = fs_loader.IncludeSession(mem)
+    loaded = dict(fs_loader.load_yaml_dataclass_from_fs(mem, 'services/*.yml', clazz_service, session=session))
+    assert loaded['/services/api.yml'].database == loaded['/services/web.yml'].database
+    assert session.parse_count == 1
+
+
+def test_include_without_session():
+    with pytest.raises(base.DataclassLoadError) as err:
+        yaml.load_yaml_dataclass(clazz_service, 'test.yml', 'name: a\ndatabase: !include db.yml\n')
+    assert '!include' in err.value.msg
+
+
+def test_type_loaders_are_not_mixed_up():
+    session = fs_loader.IncludeSession(make_fs())
+
+    def load_with_str(loader):
+        type_cache = yaml.default_type_loaders()
+        type_cache[str] = loader
+        return session.load(clazz_service, 'services/api.yml', type_cache=type_cache).database.host
+
+    # Each dict is dropped after its load, so a new one may get the same id
+    for idx in range(10):
+        assert load_with_str(lambda value, context, idx=idx: f'{value}-{idx}') == f'db.local-{idx}'
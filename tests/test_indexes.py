@@ -0,0 +1,133 @@
+import pytest
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import bentoudev.dataclass.yaml_loader as yaml
+import bentoudev.dataclass.json_loader as json_loader
+import bentoudev.dataclass.base as base
+
+
+@dataclass
+class clazz_service:
+    name: str
+    team: Optional[str] = None
+
+
+@dataclass
+class clazz_config:
+    services: List[clazz_service] = field(metadata=base.indexed('name', base.FieldIndex('team', unique=False, name='by_team')))
+    aliases: Optional[Dict[str, clazz_service]] = field(default=None, metadata=base.indexed('name'))
+
+
+@dataclass(frozen=True)
+class clazz_frozen:
+    services: List[clazz_service] = field(metadata=base.indexed('name'))
+
+
+YAML_CONFIG = (
+    'services:\n'
+    '  - name: api\n'
+    '    team: core\n'
+    '  - name: web\n'
+    '    team: front\n'
+    '  - name: db\n'
+    '    team: core\n'
+    '  - name: cache\n'
+)
+
+
+def test_unique_and_multi_index():
+    config : clazz_config = yaml.load_yaml_dataclass(clazz_config, 'test.yml', YAML_CONFIG)
+
+    by_name = base.get_index(config, 'services', 'name')
+    assert list(by_name.keys()) == [ 'api', 'web', 'db', 'cache' ]
+    assert by_name['db'] is config.services[2]
+
+    by_team = base.get_index(config, 'services', 'by_team')
+    assert by_team == { 'core' : [ config.services[0], config.services[2] ], 'front' : [ config.services[1] ] }
+
+    # Fields missing from document are indexed with their defaults
+    assert base.get_index(config, 'aliases') == {}
+
+
+def test_dict_values_are_indexed():
+    content = YAML_CONFIG + 'aliases:\n  main: { name: api }\n  other: { name: web }\n'
+    config : clazz_config = yaml.load_yaml_dataclass(clazz_config, 'test.yml', content)
+    assert base.get_index(config, 'aliases') == { 'api' : config.aliases['main'], 'web' : config.aliases['other'] }
+
+
+@pytest.mark.parametrize('lazy', [ False, True ])
+def test_duplicate_key(lazy):
+    content = YAML_CONFIG + '  - name: web\n    team: other\n'
+    with pytest.raises(base.DataclassLoadError) as err:
+        yaml.load_yaml_dataclass(clazz_config, 'test.yml', content, lazy=lazy)
+
+    assert "Duplicate key 'web' in index 'name'" in err.value.msg
+    assert 'first defined at line 4' in err.value.msg
+    assert err.value.source.line_number == 9
+
+
+def test_duplicate_keys_reported_together():
+    content = YAML_CONFIG + '  - name: web\n  - name: api\n'
+    with pytest.raises(base.DataclassLoadError) as err:
+        yaml.load_yaml_dataclass(clazz_config, 'test.yml', content)
+    assert [ e.source.line_number for e in err.value.errors ] == [ 9, 10 ]
+
+
+def test_index_json_and_frozen():
+    config = json_loader.load_json_dataclass(clazz_frozen, 'test.json', '{ "services": [ { "name": "a" }, { "name": "b" } ] }')
+    assert base.get_index(config, 'services') == { 'a' : config.services[0], 'b' : config.services[1] }
+
+
+def test_get_index_errors():
+    config = clazz_config([ clazz_service('a') ])
+    with pytest.raises(KeyError):
+        base.get_index(config, 'services', 'name')
+
+    loaded = yaml.load_yaml_dataclass(clazz_config, 'test.yml', YAML_CONFIG)
+    with pytest.raises(KeyError):
+        base.get_index(loaded, 'services')
+
+
+def test_indexed_invalid_specs():
+    with pytest.raises(ValueError):
+        base.indexed()
+    with pytest.raises(ValueError):
+        base.indexed('name', base.FieldIndex('name', unique=False))
+
+
+@dataclass
+class clazz_tagged:
+    name: str
+    tags: List[str]
+
+
+@dataclass
+class clazz_tagged_config:
+    services: List[clazz_tagged] = field(metadata=base.indexed('tags'))
+    # Forward reference isn't resolved when traits are built, key is checked while loading
+    owned: Optional[List['tests.test_indexes.clazz_service']] = field(default=None, metadata=base.indexed('owner')) # noqa: F821
+
+
+def test_index_key_not_a_field():
+    @dataclass
+    class clazz_missing_key:
+        services: Optional[Dict[str, clazz_service]] = field(default=None, metadata=base.indexed('name', 'owner'))
+
+    with pytest.raises(TypeError) as err:
+        yaml.load_yaml_dataclass(clazz_missing_key, 'test.yml', 'services: {}')
+    assert "Key 'owner' of index 'owner' of field 'services'" in str(err.value)
+
+
+def test_unhashable_and_missing_keys():
+    content = 'services:\n  - name: a\n    tags: [ x ]\n'
+    with pytest.raises(base.DataclassLoadError) as err:
+        yaml.load_yaml_dataclass(clazz_tagged_config, 'test.yml', content)
+    assert "has unhashable value of type 'list'" in err.value.msg
+    assert err.value.source.line_number == 3
+
+    content = 'services: []\nowned:\n  - name: a\n'
+    with pytest.raises(base.DataclassLoadError) as err:
+        yaml.load_yaml_dataclass(clazz_tagged_config, 'test.yml', content, ext_types=[clazz_service])
+    assert "Item of type 'clazz_service' has no key 'owner'" in err.value.msg
+    assert err.value.source.line_number == 3
@@ -0,0 +1,96 @@
+import pytest
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from enum import Enum
+import bentoudev.dataclass.json_loader as json_loader
+import bentoudev.dataclass.dumper as dumper
+import bentoudev.dataclass.base as base
+
+
+class some_enum(Enum):
+    FIRST = 1
+    SECOND = 2
+
+
+@dataclass
+class clazz_person:
+    name: str
+    age: int
+
+
+@dataclass
+@base.track_source
+class clazz_team:
+    kind: some_enum
+    members: List[clazz_person]
+    by_id: Dict[int, clazz_person]
+    ratio: float
+    leader: Optional[clazz_person] = None
+
+
+JSON_TEAM = (
+    '{\n'
+    '  "kind": "SECOND",\n'
+    '  "members": [\n'
+    '    { "name": "foo", "age": 1 },\n'
+    '    {\n'
+    '      "name": "bar",\n'
+    '      "age": 2\n'
+    '    }\n'
+    '  ],\n'
+    '  "by_id": { "7": { "name": "baz", "age": 3 } },\n'
+    '  "ratio": 1e+20\n'
+    '}'
+)
+
+
+@pytest.mark.parametrize('track_locations', [ True, False ])
+def test_load_json(track_locations):
+    result = json_loader.load_json_dataclass(clazz_team, 'test.json', JSON_TEAM, track_locations=track_locations)
+
+    assert result == clazz_team(
+        kind=some_enum.SECOND,
+        members=[ clazz_person(name='foo', age=1), clazz_person(name='bar', age=2) ],
+        by_id={ 7 : clazz_person(name='baz', age=3) },
+        ratio=1e+20
+    )
+
+
+def test_load_json_tracks_locations():
+    result = json_loader.load_json_dataclass(clazz_team, 'test.json', JSON_TEAM)
+
+    assert result.get_root_source().line_number == 1
+    assert result.get_field_source('members').line_number == 3
+    assert result.get_field_source('ratio').line_number == 11
+
+
+def test_load_json_error_location():
+    content = JSON_TEAM.replace('"age": 2', '"age": "two"')
+
+    with pytest.raises(base.DataclassLoadError) as err:
+        json_loader.load_json_dataclass(clazz_team, 'test.json', content)
+
+    assert err.value.source.line_number == 5
+    assert err.value.source.file_name == 'test.json'
+
+
+def test_load_json_unknown_field():
+    with pytest.raises(base.DataclassLoadError) as err:
+        json_loader.load_json_dataclass(clazz_team, 'test.json', JSON_TEAM.replace('"ratio"', '"other": 2,\n  "ratio"'))
+
+    assert err.value.errors[0].source.line_number == 11
+
+
+def test_load_json_syntax_error():
+    with pytest.raises(base.DataclassLoadError) as err:
+        json_loader.load_json_dataclass(clazz_person, 'test.json', '{\n "name": "foo",\n "age": }')
+
+    assert err.value.source.line_number == 3
+
+
+def test_load_json_roundtrip():
+    team = clazz_team(kind=some_enum.FIRST, members=[], by_id={ 1 : clazz_person(name='foo', age=1) }, ratio=0.5,
+        leader=clazz_person(name='bar', age=2))
+
+    assert json_loader.load_json_dataclass(clazz_team, 'test.json', dumper.dump_json_dataclass(team)) == team
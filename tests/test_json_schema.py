@@ -5,7 +5,7 @@ from enum import Enum
 from dataclasses import dataclass
 from bentoudev.dataclass.json_schema import (
     BuilderContext, Handler, InlineListHandler, UnionHandler, ListHandler, NoNullHandler, EnumHandler,
-    build_json_schema
+    build_json_schema, build_json_schema_bundle, write_json_schema_bundle
 )
 
 def _process_handlers(typez:type, handlers:List[Handler], ext_types:List[type]=[]):
@@ -80,3 +80,50 @@ class OwnerClass:
 def test_complex_class():
     result = build_json_schema(OwnerClass)
     assert result == {"$ref": "#/$defs/OwnerClass", "$defs": {"OwnerClass": {"type": "object", "properties": {"config": {"$ref": "#/$defs/ConfigClass"}, "entries": {"items": {"$ref": "#/$defs/EntryClass"}, "type": "array"}}, "additionalProperties": False, "title": "OwnerClass", "required": ["config", "entries"]}, "ConfigClass": {"type": "object", "properties": {"entry": {"$ref": "#/$defs/EntryClass"}, "surname": {"type": "string"}, "kinds": {"anyOf": [{"enum": ["NONE", "FIRST", "SECOND"]}, {"items": {"enum": ["NONE", "FIRST", "SECOND"]}, "type": "array"}]}}, "additionalProperties": False, "title": "ConfigClass", "required": ["entry", "surname", "kinds"]}, "EntryClass": {"type": "object", "properties": {"name": {"type": "string"}, "number": {"type": "integer"}}, "additionalProperties": False, "title": "EntryClass", "required": ["name", "number"]}}, "$schema": "https://json-schema.org/draft/2020-12/schema", "title": "OwnerClass"}
+
+
+def make_same_named_class():
+    @dataclass
+    class EntryClass:
+        label: str
+    return EntryClass
+
+
+@dataclass
+class OtherOwnerClass:
+    entry: EntryClass
+    other: make_same_named_class()
+
+
+def test_schema_bundle():
+    bundle = build_json_schema_bundle([OwnerClass, OtherOwnerClass])
+    defs = bundle.definitions['$defs']
+
+    # Shared classes are defined once, same named classes don't collide
+    assert set(defs.keys()) == {
+        'tests.test_json_schema.OwnerClass',
+        'tests.test_json_schema.OtherOwnerClass',
+        'tests.test_json_schema.ConfigClass',
+        'tests.test_json_schema.EntryClass',
+        'tests.test_json_schema.make_same_named_class.<locals>.EntryClass',
+    }
+    assert defs['tests.test_json_schema.OwnerClass']['properties']['config'] == {"$ref": "#/$defs/tests.test_json_schema.ConfigClass"}
+
+    assert bundle.roots[OwnerClass] == {
+        "$ref": "defs.schema.json#/$defs/tests.test_json_schema.OwnerClass",
+        "$schema": "https://json-schema.org/draft/2020-12/schema",
+        "title": "OwnerClass"
+    }
+
+
+def test_write_schema_bundle(tmp_path):
+    bundle = build_json_schema_bundle([OwnerClass, OtherOwnerClass], defs_file='shared.json')
+    written = write_json_schema_bundle(bundle, str(tmp_path / 'schemas'))
+
+    assert [ p.split('/')[-1] for p in written ] == [
+        'shared.json', 'tests.test_json_schema.OwnerClass.schema.json', 'tests.test_json_schema.OtherOwnerClass.schema.json'
+    ]
+    with open(written[1]) as f:
+        assert json.load(f) == bundle.roots[OwnerClass]
+    with open(written[0]) as f:
+        assert json.load(f) == bundle.definitions
@@ -0,0 +1,147 @@
+import pytest
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import bentoudev.dataclass.yaml_loader as yaml
+import bentoudev.dataclass.layered_loader as layered
+import bentoudev.dataclass.base as base
+
+
+@base.track_source
+@dataclass
+class clazz_endpoint:
+    name: str
+    port: int
+    tls: Optional[bool] = None
+
+
+@base.track_source
+@dataclass
+class clazz_service:
+    replicas: int
+    endpoints: List[clazz_endpoint] = field(metadata=base.list_merge(base.EListMerge.MergeByKey, 'name'))
+    tags: List[str] = field(default_factory=list)
+    env: Optional[Dict[str, str]] = None
+
+
+YAML_BASE = (
+    'replicas: 1\n'
+    'endpoints:\n'
+    '  - name: http\n'
+    '    port: 80\n'
+    '  - name: admin\n'
+    '    port: 9000\n'
+    'tags: [ base ]\n'
+    'env:\n'
+    '  LOG: info\n'
+    '  REGION: none\n'
+)
+
+YAML_PROD = (
+    'replicas: 3\n'
+    'endpoints:\n'
+    '  - name: http\n'
+    '    tls: true\n'
+    '  - name: metrics\n'
+    '    port: 9100\n'
+    'tags: [ prod ]\n'
+    'env:\n'
+    '  LOG: warning\n'
+)
+
+YAML_REGION = (
+    'env:\n'
+    '  REGION: eu\n'
+)
+
+
+LAYERS = [ ('base.yml', YAML_BASE), ('prod.yml', YAML_PROD), ('region.yml', YAML_REGION) ]
+
+
+def test_layers_merged():
+    result : clazz_service = layered.load_layered_yaml_dataclass(clazz_service, LAYERS)
+
+    assert result.replicas == 3
+    assert result.endpoints == [
+        clazz_endpoint('http', 80, True),
+        clazz_endpoint('admin', 9000),
+        clazz_endpoint('metrics', 9100),
+    ]
+    # Default strategy replaces lists
+    assert result.tags == [ 'prod' ]
+    assert result.env == { 'LOG' : 'warning', 'REGION' : 'eu' }
+
+
+@pytest.mark.parametrize('strategy,expected', [
+    (base.EListMerge.Replace, [ 'prod' ]),
+    (base.EListMerge.Append, [ 'base', 'prod' ]),
+])
+def test_list_strategy(strategy, expected):
+    result : clazz_service = layered.load_layered_yaml_dataclass(clazz_service, LAYERS, list_merge=strategy)
+    assert result.tags == expected
+
+
+def test_sources_point_at_layers():
+    result : clazz_service = layered.load_layered_yaml_dataclass(clazz_service, LAYERS)
+
+    assert result.get_field_source('replicas').file_name == 'prod.yml'
+    assert result.get_field_source('replicas').line_number == 1
+    assert result.get_field_source('tags').file_name == 'prod.yml'
+    assert result.get_root_source().file_name == 'base.yml'
+
+    http = result.endpoints[0]
+    assert http.get_field_source('port').file_name == 'base.yml'
+    assert http.get_field_source('port').line_number == 4
+    assert http.get_field_source('tls').file_name == 'prod.yml'
+    assert 'tls: true' in http.get_field_source('tls').buffer
+    assert result.endpoints[2].get_root_source().file_name == 'prod.yml'
+
+
+def test_validated_once_after_merge():
+    # Incomplete layers are fine as long as merged result is valid
+    result = layered.load_layered_yaml_dataclass(clazz_endpoint, [ 'name: a', 'port: 1' ])
+    assert result == clazz_endpoint('a', 1)
+
+    with pytest.raises(base.DataclassLoadError) as err:
+        layered.load_layered_yaml_dataclass(clazz_service, LAYERS + [ ('broken.yml', 'replicas: many\n') ])
+    assert err.value.source.file_name == 'broken.yml'
+    assert err.value.source.line_number == 1
+
+
+def test_yaml_error_in_layer():
+    with pytest.raises(base.DataclassLoadError) as err:
+        layered.load_layered_yaml_dataclass(clazz_service, [ ('base.yml', YAML_BASE), ('prod.yml', 'replicas: [ 1\n') ])
+    assert err.value.source.file_name == 'prod.yml'
+
+
+def test_shared_base_value_is_not_modified():
+    # Anchored values are the same object in every place they're used
+    shared = { 'port' : 80 }
+    base_tree = { 'a' : shared, 'b' : shared, 'items' : [ shared ] }
+    merger = layered.LayerMerger(base.ListMergeOptions(base.EListMerge.MergeByKey, 'port'))
+
+    merged = merger.merge(base_tree, { 'a' : { 'port' : 8080 }, 'items' : [ { 'port' : 80, 'tls' : True } ] }, None)
+    assert merged == { 'a' : { 'port' : 8080 }, 'b' : { 'port' : 80 }, 'items' : [ { 'port' : 80, 'tls' : True } ] }
+    assert shared == { 'port' : 80 }
+    assert base_tree['a'] is shared
+
+
+def test_merge_by_key_requires_key():
+    with pytest.raises(ValueError):
+        base.list_merge(base.EListMerge.MergeByKey)
+    with pytest.raises(ValueError):
+        layered.load_layered_yaml_dataclass(clazz_service, LAYERS, list_merge=base.EListMerge.MergeByKey)
+
+
+@pytest.mark.parametrize('endpoint,line_number,msg', [
+    ('  - port: 81\n', 3, "List item merged by key has no key 'name'"),
+    ('  - just_text\n', 2, "List item merged by key has no key 'name'"),
+    ('  - name: [ http ]\n    port: 81\n', 3, "Got unhashable 'list' as merge key 'name' of list item"),
+])
+def test_merge_key_errors(endpoint, line_number, msg):
+    layers = [ ('base.yml', YAML_BASE), ('prod.yml', 'replicas: 2\nendpoints:\n' + endpoint) ]
+    with pytest.raises(base.DataclassLoadError) as err:
+        layered.load_layered_yaml_dataclass(clazz_service, layers)
+    assert err.value.msg == msg
+    assert err.value.source.file_name == 'prod.yml'
+    assert err.value.source.line_number == line_number
@@ -0,0 +1,96 @@
+import pytest
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import bentoudev.dataclass.yaml_loader as yaml
+import bentoudev.dataclass.base as base
+import bentoudev.dataclass.lazy as lazy
+
+
+@dataclass
+class clazz_server:
+    host: str
+    port: int
+
+
+@dataclass
+class clazz_config:
+    name: str
+    servers: List[clazz_server]
+    primary: clazz_server
+    limits: Dict[str, int] = field(default_factory=dict)
+    backup: Optional[clazz_server] = None
+
+
+YAML_CONFIG = (
+    'name: service\n'
+    'servers:\n'
+    '  - host: a\n'
+    '    port: 1\n'
+    '  - host: b\n'
+    '    port: 2\n'
+    'primary:\n'
+    '  host: main\n'
+    '  port: 80\n'
+    'limits:\n'
+    '  cpu: 4\n'
+)
+
+
+def test_lazy_load_equals_eager():
+    eager : clazz_config = yaml.load_yaml_dataclass(clazz_config, 'test.yml', YAML_CONFIG)
+    result : clazz_config = yaml.load_yaml_dataclass(clazz_config, 'test.yml', YAML_CONFIG, lazy=True)
+
+    assert isinstance(result, clazz_config)
+    assert lazy.is_lazy(result)
+    assert lazy.get_lazy_base(result) is clazz_config
+    assert result.name == 'service'
+    assert result.backup is None
+    assert lazy.is_pending(result, 'servers')
+    assert lazy.is_pending(result, 'primary')
+
+    assert result == eager
+    assert eager == result
+    assert not lazy.is_pending(result, 'servers')
+
+
+def test_lazy_converts_once():
+    result : clazz_config = yaml.load_yaml_dataclass(clazz_config, 'test.yml', YAML_CONFIG, lazy=True)
+
+    primary = result.primary
+    assert lazy.is_lazy(primary)
+    assert primary.port == 80
+    assert result.primary is primary
+    assert lazy.is_pending(result, 'servers')
+
+
+def test_lazy_error_on_access():
+    content = YAML_CONFIG.replace('port: 2', 'port: two')
+    result : clazz_config = yaml.load_yaml_dataclass(clazz_config, 'test.yml', content, lazy=True)
+
+    assert result.primary.host == 'main'
+    with pytest.raises(base.DataclassLoadError) as err:
+        result.servers[1].port
+    assert err.value.source.line_number == 5
+
+
+def test_lazy_validates_current_level():
+    content = YAML_CONFIG + 'unknown: 1\n'
+    with pytest.raises(base.DataclassLoadError):
+        yaml.load_yaml_dataclass(clazz_config, 'test.yml', content, lazy=True)
+
+
+def test_force():
+    result : clazz_config = yaml.load_yaml_dataclass(clazz_config, 'test.yml', YAML_CONFIG, lazy=True)
+    assert lazy.force(result) is result
+    assert not lazy.is_pending(result, 'servers')
+    assert not lazy.is_pending(result.servers[0], 'host')
+
+    content = YAML_CONFIG.replace('cpu: 4', 'cpu: many')
+    with pytest.raises(base.DataclassLoadError) as eager_err:
+        yaml.load_yaml_dataclass(clazz_config, 'test.yml', content)
+
+    result = yaml.load_yaml_dataclass(clazz_config, 'test.yml', content, lazy=True)
+    with pytest.raises(base.DataclassLoadError) as err:
+        lazy.force(result)
+    assert err.value.source == eager_err.value.source
@@ -487,3 +487,223 @@ def test_dependencies_as_list():
 
     with pytest.raises(base.DataclassLoadError):
         result : TargetData = load_dataclass(TargetData, yaml)
+
+
+@dataclass
+class chain_link:
+    value: int
+    next: Optional['tests.test_load_dataclass.chain_link'] = None # noqa: F821
+
+
+def make_chain_yaml(depth:int, broken_at:int = -1):
+    lines = []
+    for i in range(depth):
+        indent = '  ' * i
+        lines.append(f'{indent}value: {i if i != broken_at else "broken"}')
+        if i < depth - 1:
+            lines.append(f'{indent}next:')
+    return '\n'.join(lines)
+
+
+def test_load_deeply_nested():
+    depth = 1000
+    result : chain_link = yaml.load_yaml_dataclass(chain_link, 'test.yml', make_chain_yaml(depth), ext_types=[chain_link])
+
+    for i in range(depth):
+        assert result.value == i
+        result = result.next
+    assert result is None
+
+
+def test_load_deeply_nested_error_location():
+    with pytest.raises(base.DataclassLoadError) as err:
+        yaml.load_yaml_dataclass(chain_link, 'test.yml', make_chain_yaml(500, broken_at=450), ext_types=[chain_link], always_track_source=True)
+
+    assert err.value.source.line_number == 901
+
+
+def test_location_stack_pops_by_identity():
+    context = yaml.create_visitor_context('test.yml', 'value: 1', type_cache=yaml.default_type_loaders(), ext_types=[],
+        error_format=base.EErrorFormat.Pretty, always_track_source=False, error_code_snippet_lines=4)
+    outer = base.Source(1, 0, 'value: 1', 'test.yml')
+    inner = base.Source(1, 0, 'value: 1', 'test.yml')
+
+    with yaml.FieldLocationScope('value', outer, context):
+        with yaml.FieldLocationScope('value', inner, context):
+            assert context.location_stack[-1] is inner
+        assert context.location_stack == [outer]
+        assert context.location_stack[0] is outer
+
+    with pytest.raises(RuntimeError):
+        context.push_location(outer)
+        context.pop_location(inner)
+
+
+def test_location_stack_empty_after_failed_union():
+    context = yaml.create_visitor_context('test.yml', 'data: x', type_cache=yaml.default_type_loaders(), ext_types=[],
+        error_format=base.EErrorFormat.Pretty, always_track_source=True, error_code_snippet_lines=4)
+    loaded = yaml.LineLoader('data: x').get_single_data()
+
+    with pytest.raises(base.DataclassLoadError):
+        yaml.YamlToObject(Union[List[int], Dict[str, int]], loaded, context)
+    assert context.location_stack == []
+
+
+@dataclass
+class clazz_instrumented:
+    value: int
+
+
+def test_always_track_source_instruments_class_once():
+    assert not base.is_source_tracked(clazz_instrumented)
+
+    first = yaml.load_yaml_dataclass(clazz_instrumented, 'test.yml', 'value: 1', always_track_source=True)
+    assert base.is_source_tracked(first)
+    assert base.get_class_traits(clazz_instrumented).source_tracked
+    methods = dict(vars(clazz_instrumented))
+
+    second = yaml.load_yaml_dataclass(clazz_instrumented, 'test.yml', 'value: 2', always_track_source=True)
+    assert second.get_root_source().line_number == 1
+    assert dict(vars(clazz_instrumented)) == methods
+
+
+def test_source_tracked_marker_set_last():
+    installed = []
+
+    class recording_meta(type):
+        def __setattr__(cls, name, value):
+            # Concurrent load seeing the marker must find all methods in place
+            if name == '__source_tracker__':
+                assert all(hasattr(cls, method) for method in ('set_source_tracker', 'get_root_source', 'get_field_source'))
+            installed.append(name)
+            super().__setattr__(name, value)
+
+    @dataclass
+    class clazz_recorded(metaclass=recording_meta):
+        value: int
+
+    installed.clear()
+    base.ensure_source_tracked(clazz_recorded)
+    assert installed[-1] == '__source_tracker__'
+    assert yaml.load_yaml_dataclass(clazz_recorded, 'test.yml', 'value: 1').get_root_source().line_number == 1
+
+
+def test_class_traits_follow_decorators():
+    @dataclass
+    class clazz_plain:
+        value: str
+
+    class clazz_derived(clazz_plain):
+        pass
+
+    assert base.get_class_traits(clazz_derived) == base.ClassTraits(source_tracked=False, inline_loaded=False, loaded_from_file=False)
+
+    base.loaded_from_file(clazz_plain)
+    base.inline_loader(clazz_plain, source_type=str, field_name='value')
+    assert base.get_class_traits(clazz_derived) == base.ClassTraits(source_tracked=False, inline_loaded=True, loaded_from_file=True)
+
+
+def test_decorators_keep_traits_of_other_classes():
+    @dataclass
+    class clazz_kept:
+        value: str
+
+    @dataclass
+    class clazz_decorated:
+        value: str
+
+    traits = base.get_class_traits(clazz_kept)
+    base.track_source(clazz_decorated)
+    base.loaded_from_file(clazz_decorated)
+    assert base.get_class_traits(clazz_kept) is traits
+    assert base.get_class_traits(clazz_decorated).source_tracked
+
+
+@base.inline_loader(source_type=(str, int, Dict[str, str]), field_name='ref')
+@dataclass
+class clazz_inline_multi:
+    ref: Union[str, int, Dict[str, str]]
+
+
+@dataclass
+class inline_multi_only:
+    data: clazz_inline_multi
+
+
+@pytest.mark.parametrize('content,expected', [
+    ('data: name', 'name'),
+    ('data: 12', 12),
+    ('data: 1.5', '1.5'),
+    ('data: true', 'True'),
+    ('data: { a: b }', { 'a' : 'b' }),
+])
+def test_inline_loader_multiple_sources(content, expected):
+    result = yaml.load_yaml_dataclass(inline_multi_only, 'test.yml', content)
+    assert result.data.ref == expected
+    assert type(result.data.ref) is type(expected)
+
+
+def test_inline_loader_multiple_sources_error():
+    with pytest.raises(base.DataclassLoadError) as err:
+        yaml.load_yaml_dataclass(inline_multi_only, 'test.yml', 'data: [ 1, 2 ]')
+    assert "as one of: str, int" in err.value.msg
+
+
+def test_inline_load_type_cached():
+    assert base.get_inline_load_type(clazz_inline_loader_str) is base.get_inline_load_type(clazz_inline_loader_str)
+    assert base.get_inline_load_type(clazz_inline_loader_str(f_string='x')).inline_type is str
+
+    with pytest.raises(TypeError):
+        base.inline_loader(source_type=(str, Enum), field_name='f_string')(clazz_instrumented)
+
+
+@dataclass
+class clazz_scalar_leaves:
+    name: str
+    count: int
+    enum_field: some_enum
+    tags: List[str]
+    limits: Dict[str, float]
+    maybe: Optional[int] = None
+
+
+def test_scalar_leaves_skip_conversion_steps(monkeypatch):
+    steps = []
+    convert = yaml._yaml_to_object
+    def counted(clazz, *args):
+        steps.append(clazz)
+        return convert(clazz, *args)
+    monkeypatch.setattr(yaml, '_yaml_to_object', counted)
+
+    content = 'name: a\ncount: 1\nenum_field: FIRST\ntags: [ a, b ]\nlimits: { x: 1.5 }\nmaybe: 2\n'
+    result : clazz_scalar_leaves = yaml.load_yaml_dataclass(clazz_scalar_leaves, 'test.yml', content)
+    assert result == clazz_scalar_leaves('a', 1, some_enum.FIRST, [ 'a', 'b' ], { 'x' : 1.5 }, 2)
+    # Only containers take a step, their items and scalar fields are converted in place
+    assert steps == [ List[str], Dict[str, float], Optional[int] ]
+
+    with pytest.raises(base.DataclassLoadError) as err:
+        yaml.load_yaml_dataclass(clazz_scalar_leaves, 'test.yml', content.replace('x: 1.5', 'x: big'), always_track_source=True)
+    assert err.value.source.line_number == 5
+
+
+def test_source_snippet_built_when_read():
+    import copy
+    import pickle
+    @base.track_source
+    @dataclass
+    class clazz_tracked_person:
+        name: str
+        age: int
+
+    content = 'name: foo\nage: 1\n'
+    obj = yaml.load_yaml_dataclass(clazz_tracked_person, 'test.yml', content)
+    field_src : base.Source = obj.get_field_source('age')
+    assert isinstance(field_src.__dict__['_buffer'], yaml.YamlSnippetBuilder)
+
+    src_copy = copy.deepcopy(field_src)
+    assert src_copy is not field_src and src_copy.__dict__['_buffer'] is field_src.__dict__['_buffer']
+    src_copy.line_number = 5
+    assert field_src.line_number == 2
+    assert pickle.loads(pickle.dumps(field_src)) == base.Source(2, 0, 'name: foo\nage: 1', 'test.yml')
+    assert field_src.buffer == 'name: foo\nage: 1'
+    assert field_src.__dict__['_buffer'] == 'name: foo\nage: 1'
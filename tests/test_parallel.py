@@ -0,0 +1,174 @@
+import pytest
+
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List
+import bentoudev.dataclass.yaml_loader as yaml
+import bentoudev.dataclass.json_loader as json_loader
+import bentoudev.dataclass.base as base
+import bentoudev.dataclass.parallel as parallel
+
+
+@dataclass
+class clazz_record:
+    name: str
+    value: int
+    tags: List[str]
+
+
+@dataclass
+class clazz_dataset:
+    records: List[clazz_record]
+    by_name: Dict[str, clazz_record]
+
+
+def make_yaml(count:int, broken=()):
+    lines = [ 'records:' ]
+    for idx in range(count):
+        value = 'broken' if idx in broken else idx
+        lines.append(f'  - name: r{idx}\n    value: {value}\n    tags: [ a, b ]')
+    lines.append('by_name:')
+    for idx in range(count):
+        lines.append(f'  r{idx}: {{ name: r{idx}, value: {idx}, tags: c }}')
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture(scope='module')
+def thread_pool():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        yield executor
+
+
+@pytest.fixture(scope='module')
+def process_pool():
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+@pytest.mark.parametrize('pool', [ 'thread_pool', 'process_pool' ])
+def test_parallel_equals_sequential(pool, request):
+    content = make_yaml(300)
+    conversion = parallel.ParallelConversion(request.getfixturevalue(pool), min_items=100, chunk_size=64)
+
+    expected = yaml.load_yaml_dataclass(clazz_dataset, 'test.yml', content)
+    result = yaml.load_yaml_dataclass(clazz_dataset, 'test.yml', content, parallel=conversion)
+    assert result == expected
+    assert list(result.by_name.keys()) == list(expected.by_name.keys())
+
+
+@pytest.mark.parametrize('pool', [ 'thread_pool', 'process_pool' ])
+def test_parallel_single_error_equals_sequential(pool, request):
+    content = make_yaml(300, broken=(150,))
+    conversion = parallel.ParallelConversion(request.getfixturevalue(pool), min_items=100, chunk_size=64)
+
+    with pytest.raises(base.DataclassLoadError) as expected:
+        yaml.load_yaml_dataclass(clazz_dataset, 'test.yml', content)
+    with pytest.raises(base.DataclassLoadError) as err:
+        yaml.load_yaml_dataclass(clazz_dataset, 'test.yml', content, parallel=conversion)
+    assert str(err.value) == str(expected.value)
+
+
+@pytest.mark.parametrize('pool', [ 'thread_pool', 'process_pool' ])
+def test_parallel_errors_in_chunk_order(pool, request):
+    content = make_yaml(300, broken=(250, 10, 11, 130))
+    conversion = parallel.ParallelConversion(request.getfixturevalue(pool), min_items=100, chunk_size=64)
+
+    with pytest.raises(base.DataclassLoadError) as err:
+        yaml.load_yaml_dataclass(clazz_dataset, 'test.yml', content, parallel=conversion)
+
+    # First error of each failed chunk
+    assert 'Failed to convert 3 of 5 chunk(s)' in err.value.msg
+    lines = [ e.source.line_number for e in err.value.errors ]
+    assert lines == [ 10 * 3 + 2, 130 * 3 + 2, 250 * 3 + 2 ]
+    assert all('r' in e.source.buffer for e in err.value.errors)
+
+
+def test_parallel_json(thread_pool):
+    content = '{ "records": [' + ', '.join(f'{{ "name": "r{idx}", "value": {idx}, "tags": [] }}' for idx in range(50)) + '], "by_name": {} }'
+    result = json_loader.load_json_dataclass(clazz_dataset, 'test.json', content, parallel=parallel.ParallelConversion(thread_pool, min_items=10))
+    assert result == json_loader.load_json_dataclass(clazz_dataset, 'test.json', content)
+
+
+def test_small_collections_are_sequential():
+    class failing_executor(ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            raise AssertionError('nothing should be submitted')
+
+    with failing_executor() as executor:
+        result = yaml.load_yaml_dataclass(clazz_dataset, 'test.yml', make_yaml(10), parallel=executor)
+    assert len(result.records) == 10
+
+
+@pytest.mark.parametrize('count,workers,expected', [
+    (100, 4, parallel.MIN_CHUNK_SIZE),
+    (500000, 8, 15625),
+    (500001, 8, 15626),
+])
+def test_chunk_size(count, workers, expected):
+    conversion = parallel.ParallelConversion(None, max_workers=workers)
+    assert conversion.get_chunk_size(count) == expected
+
+
+def test_parallel_with_streaming_raises(thread_pool):
+    with pytest.raises(ValueError):
+        yaml.load_yaml_dataclass(clazz_dataset, 'test.yml', make_yaml(1), parallel=thread_pool, streaming=True)
+
+
+def test_unknown_executor_needs_workers():
+    class inline_executor(Executor):
+        def submit(self, fn, *args):
+            future = Future()
+            future.set_result(fn(*args))
+            return future
+
+    with pytest.raises(ValueError):
+        parallel.ParallelConversion(inline_executor())
+    conversion = parallel.ParallelConversion(inline_executor(), min_items=100, chunk_size=64)
+    assert yaml.load_yaml_dataclass(clazz_dataset, 'test.yml', make_yaml(300), parallel=conversion) == yaml.load_yaml_dataclass(clazz_dataset, 'test.yml', make_yaml(300))
+
+
+def test_load_on_same_thread_pool():
+    content = make_yaml(300)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        conversion = parallel.ParallelConversion(executor, min_items=100, chunk_size=64)
+        future = executor.submit(yaml.load_yaml_dataclass, clazz_dataset, 'test.yml', content, parallel=conversion)
+        assert future.result(timeout=30) == yaml.load_yaml_dataclass(clazz_dataset, 'test.yml', content)
+
+
+class recording_process_pool(ProcessPoolExecutor):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.tasks = []
+
+    def submit(self, fn, task):
+        self.tasks.append(task)
+        return super().submit(fn, task)
+
+
+def test_process_chunks_carry_only_their_lines():
+    memoryfs = pytest.importorskip('fs.memoryfs')
+    import bentoudev.dataclass.fs_loader as fs_loader
+
+    mem = memoryfs.MemoryFS()
+    records = make_yaml(300, broken=(150,)).split('by_name:')[0].split('\n', 1)[1]
+    mem.writetext('records.yml', records)
+    mem.writetext('dataset.yml', 'records: !include records.yml\nby_name: {}\n')
+
+    with pytest.raises(base.DataclassLoadError) as expected:
+        fs_loader.IncludeSession(mem).load(clazz_dataset, 'dataset.yml')
+    with recording_process_pool(max_workers=2) as executor:
+        conversion = parallel.ParallelConversion(executor, min_items=100, chunk_size=64)
+        with pytest.raises(base.DataclassLoadError) as err:
+            fs_loader.IncludeSession(mem).load(clazz_dataset, 'dataset.yml', parallel=conversion)
+
+    assert str(err.value) == str(expected.value)
+    assert err.value.source.file_name == '/records.yml'
+    assert 'name: r150' in err.value.source.buffer
+
+    assert len(executor.tasks) == 5
+    for task in executor.tasks:
+        assert task.context.conversion_cache is None and task.context.converting_includes is None
+        documents = { id(item['__yaml_location__'].document) : item['__yaml_location__'].document for item in task.items }
+        assert len(documents) == 1
+        lines = list(documents.values())[0].yaml_lines
+        assert len(lines) == 900 and len(lines.lines) <= 64 * 3 + task.context.code_snippet_lines
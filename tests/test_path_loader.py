@@ -0,0 +1,225 @@
+import pytest
+import io
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import bentoudev.dataclass.yaml_loader as yaml
+import bentoudev.dataclass.path_loader as path_loader
+import bentoudev.dataclass.base as base
+
+
+@dataclass
+class clazz_endpoint:
+    path: str
+    port: int
+
+
+@dataclass
+class clazz_service:
+    name: str
+    endpoints: List[clazz_endpoint]
+    labels: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class clazz_root:
+    services: List[clazz_service]
+    owner: Optional[str] = None
+
+
+YAML_ROOT = (
+    'services:\n'
+    '  - name: first\n'
+    '    endpoints:\n'
+    '      - path: /a\n'
+    '        port: 1\n'
+    '  - name: second\n'
+    '    labels:\n'
+    '      team.name: core\n'
+    '    endpoints: &shared\n'
+    '      - path: /b\n'
+    '        port: 2\n'
+    '      - path: /c\n'
+    '        port: not_a_port\n'
+    '  - name: third\n'
+    '    endpoints: *shared\n'
+    'owner: [this is: {not valid\n'
+)
+
+
+@pytest.mark.parametrize('path,expected', [
+    ('', []),
+    ('services[0].endpoints', ['services', 0, 'endpoints']),
+    ('services[1].labels["team.name"]', ['services', 1, 'labels', 'team.name']),
+    ("labels['a'][2]", ['labels', 'a', 2]),
+])
+def test_parse_path(path, expected):
+    assert path_loader.parse_path(path) == expected
+
+
+@pytest.mark.parametrize('path', [ 'services[', 'services[0]endpoints', 'a..b' ])
+def test_parse_path_invalid(path):
+    with pytest.raises(ValueError):
+        path_loader.parse_path(path)
+
+
+def test_load_at_path():
+    result = path_loader.load_yaml_dataclass_at(clazz_root, 'test.yml', YAML_ROOT, 'services[0].endpoints')
+    assert result == [ clazz_endpoint('/a', 1) ]
+
+    result = path_loader.load_yaml_dataclass_at(clazz_root, 'test.yml', YAML_ROOT, 'services[1].labels["team.name"]')
+    assert result == 'core'
+
+    result = path_loader.load_yaml_dataclass_at(clazz_root, 'test.yml', YAML_ROOT, ['services', 1, 'endpoints', 0])
+    assert result == clazz_endpoint('/b', 2)
+
+
+def test_load_at_path_through_alias():
+    result = path_loader.load_yaml_dataclass_at(clazz_root, 'test.yml', YAML_ROOT, 'services[2].endpoints[0].port')
+    assert result == 2
+
+
+def test_load_at_path_validates_subtree_only():
+    with pytest.raises(base.DataclassLoadError) as err:
+        path_loader.load_yaml_dataclass_at(clazz_root, 'test.yml', YAML_ROOT, 'services[1].endpoints[1].port')
+    assert err.value.source.line_number == 13
+
+    # Broken parts of the document, which wouldn't load as whole, are never parsed
+    with pytest.raises(base.DataclassLoadError):
+        yaml.load_yaml_dataclass(clazz_root, 'test.yml', YAML_ROOT)
+
+
+def test_load_at_missing_path():
+    with pytest.raises(base.DataclassLoadError) as err:
+        path_loader.load_yaml_dataclass_at(clazz_root, 'test.yml', YAML_ROOT, 'services[5]')
+    assert 'services[5]' in err.value.msg
+    assert err.value.source.line_number == 2
+
+
+YAML_MERGED = (
+    'defaults: &defaults\n'
+    '  path: /default\n'
+    '  port: 80\n'
+    'secure: &secure { port: 443 }\n'
+    'services:\n'
+    '  - name: own\n'
+    '    labels: {}\n'
+    '    endpoints:\n'
+    '      - <<: *defaults\n'
+    '        port: 8080\n'
+    '  - name: merged\n'
+    '    labels: {}\n'
+    '    endpoints:\n'
+    '      - <<: [ *secure, *defaults ]\n'
+    '  - &third\n'
+    '    <<: { endpoints: [ { path: /third, port: 3 } ], labels: { a: b } }\n'
+    '    name: third\n'
+    '  - <<: *third\n'
+    '    name: fourth\n'
+)
+
+
+@dataclass
+class clazz_merged_root:
+    services: List[clazz_service]
+    defaults: Optional[clazz_endpoint] = None
+    secure: Optional[Dict[str, int]] = None
+
+
+@pytest.mark.parametrize('path', [
+    'services[0].endpoints[0].port',
+    'services[0].endpoints[0].path',
+    'services[1].endpoints[0].port',
+    'services[1].endpoints[0].path',
+    'services[2].endpoints[0].port',
+    'services[3].endpoints[0].path',
+    'services[3].name',
+    'services[3].labels.a',
+    'services[3]',
+])
+def test_load_at_path_through_merge_keys(path):
+    expected = yaml.load_yaml_dataclass(clazz_merged_root, 'test.yml', YAML_MERGED)
+    for step in path_loader.parse_path(path):
+        expected = expected[step] if isinstance(expected, (list, dict)) else getattr(expected, step)
+
+    assert path_loader.load_yaml_dataclass_at(clazz_merged_root, 'test.yml', YAML_MERGED, path) == expected
+
+
+def test_iter_items_through_merge_keys():
+    items = list(path_loader.iter_yaml_dataclass_items(clazz_merged_root, 'test.yml', YAML_MERGED, 'services[3].endpoints'))
+    assert items == [ clazz_endpoint('/third', 3) ]
+
+
+def test_load_at_path_merged_errors():
+    # Merged value points at its key where it's defined
+    content = YAML_MERGED.replace('port: 443', 'port: x')
+    with pytest.raises(base.DataclassLoadError) as err:
+        path_loader.load_yaml_dataclass_at(clazz_merged_root, 'test.yml', content, 'services[1].endpoints[0].port')
+    assert err.value.source.line_number == 4
+
+    with pytest.raises(base.DataclassLoadError) as err:
+        path_loader.load_yaml_dataclass_at(clazz_merged_root, 'test.yml', YAML_MERGED, 'services[3].endpoints[1]')
+    assert "No value at path 'services[3].endpoints[1]'" in err.value.msg
+
+
+@pytest.mark.parametrize('path', [ 'services.name', 'services[0].unknown', 'owner.name', 'services[0][1]' ])
+def test_load_at_invalid_type_path(path):
+    with pytest.raises(ValueError):
+        path_loader.load_yaml_dataclass_at(clazz_root, 'test.yml', YAML_ROOT, path)
+
+
+def test_iter_items_list():
+    items = path_loader.iter_yaml_dataclass_items(clazz_root, 'test.yml', YAML_ROOT, 'services[1].endpoints')
+    assert next(items) == clazz_endpoint('/b', 2)
+    with pytest.raises(base.DataclassLoadError) as err:
+        next(items)
+
+    with pytest.raises(base.DataclassLoadError) as eager_err:
+        path_loader.load_yaml_dataclass_at(clazz_root, 'test.yml', YAML_ROOT, 'services[1].endpoints')
+    assert err.value.source == eager_err.value.source
+
+
+def test_iter_items_dict():
+    content = 'limits:\n  cpu: 4\n  memory: 16\n  disk: a lot\n'
+    items = path_loader.iter_yaml_dataclass_items(Dict[str, Dict[str, int]], 'test.yml', content, 'limits')
+    assert next(items) == ('cpu', 4)
+    assert next(items) == ('memory', 16)
+    with pytest.raises(base.DataclassLoadError) as err:
+        next(items)
+    assert err.value.source.line_number == 4
+
+
+def test_iter_items_through_alias():
+    items = path_loader.iter_yaml_dataclass_items(clazz_root, 'test.yml', YAML_ROOT, 'services[2].endpoints')
+    assert next(items) == clazz_endpoint('/b', 2)
+    with pytest.raises(base.DataclassLoadError) as err:
+        next(items)
+    assert err.value.source.line_number == 12
+
+
+def test_iter_items_from_file_stream():
+    count = 3000
+    content = 'services:\n' + ''.join(f'  - name: s{idx}\n    labels: {{}}\n    endpoints: {{ path: /{idx}, port: {idx} }}\n' for idx in range(count))
+    content += '  - name: broken\n    labels: {}\n    endpoints: { path: /x, port: x }\n'
+
+    items = path_loader.iter_yaml_dataclass_items(clazz_root, 'test.yml', io.StringIO(content), 'services', error_code_snippet_lines=2)
+    for idx in range(count):
+        assert next(items) == clazz_service(f's{idx}', [ clazz_endpoint(f'/{idx}', idx) ])
+
+    with pytest.raises(base.DataclassLoadError) as err:
+        next(items)
+    assert err.value.source.line_number == count * 3 + 4
+    assert 'endpoints: { path: /x, port: x }' in err.value.source.buffer
+
+
+def test_iter_items_sources_outlive_window():
+    content = 'services:\n' + ''.join(f'  - name: s{idx}\n    labels: {{}}\n    endpoints: []\n' for idx in range(100))
+    items = list(path_loader.iter_yaml_dataclass_items(clazz_root, 'test.yml', io.StringIO(content), 'services', always_track_source=True))
+    # Lines of first item were dropped long ago
+    assert items[0].get_field_source('labels').buffer.endswith('    labels: {}')
+    assert 'name: s0' in items[0].get_field_source('labels').buffer
+
+
+def test_iter_items_not_collection():
+    with pytest.raises(ValueError):
+        path_loader.iter_yaml_dataclass_items(clazz_root, 'test.yml', YAML_ROOT, 'services[0].name')
@@ -0,0 +1,88 @@
+import pytest
+import json
+import pstats
+
+from dataclasses import dataclass
+from typing import List, Union
+import bentoudev.dataclass.yaml_loader as yaml
+import bentoudev.dataclass.json_loader as json_loader
+import bentoudev.dataclass.profiling as profiling
+
+
+@dataclass
+class clazz_person:
+    name: str
+    age: int
+
+
+@dataclass
+class clazz_team:
+    members: List[clazz_person]
+    leader: Union[str, clazz_person]
+
+
+YAML_TEAM = (
+    'members:\n'
+    '  - name: foo\n'
+    '    age: 1\n'
+    '  - name: bar\n'
+    '    age: 2\n'
+    'leader:\n'
+    '  name: baz\n'
+    '  age: 3\n'
+)
+
+
+def test_profile_load():
+    profiler = profiling.LoadProfiler()
+
+    yaml.load_yaml_dataclass(clazz_team, 'test.yml', YAML_TEAM, always_track_source=True, profiler=profiler)
+
+    report = json.loads(profiler.to_json())
+    assert report['parse_count'] == 1
+    assert report['parse_seconds'] > 0
+    assert report['convert_seconds'] > 0
+    assert report['source_tracking_seconds'] > 0
+    assert report['classes']['tests.test_profiling.clazz_person']['count'] == 3
+    assert report['classes']['tests.test_profiling.clazz_team']['count'] == 1
+    assert report['unions'][str(Union[str, clazz_person])] == { 'attempts' : 2, 'failures' : 1 }
+
+
+def test_profile_accumulates_over_loads():
+    profiler = profiling.LoadProfiler()
+
+    yaml.load_yaml_dataclass(clazz_team, 'test.yml', YAML_TEAM, profiler=profiler)
+    json_loader.load_json_dataclass(clazz_person, 'test.json', '{ "name": "foo", "age": 1 }', profiler=profiler)
+
+    assert profiler.parse_count == 2
+    assert profiler.classes[clazz_person].count == 4
+
+
+def test_profile_pstats(tmp_path):
+    profiler = profiling.LoadProfiler()
+    yaml.load_yaml_dataclass(clazz_team, 'test.yml', YAML_TEAM, profiler=profiler)
+
+    stats = pstats.Stats(profiler)
+    person_key = ('tests.test_profiling', 0, 'load clazz_person')
+    team_key = ('tests.test_profiling', 0, 'load clazz_team')
+    assert stats.stats[person_key][1] == 3
+    assert team_key in stats.stats[person_key][4]
+
+    path = str(tmp_path / 'load.prof')
+    profiler.dump_stats(path)
+    assert pstats.Stats(path).total_calls == stats.total_calls
+
+
+def test_profiler_scope_only_when_profiling(monkeypatch):
+    scopes = []
+    profiled = yaml._profiled_dataclass
+    def counted(clazz, *args):
+        scopes.append(clazz)
+        return profiled(clazz, *args)
+    monkeypatch.setattr(yaml, '_profiled_dataclass', counted)
+
+    expected = yaml.load_yaml_dataclass(clazz_team, 'test.yml', YAML_TEAM)
+    assert scopes == []
+
+    assert yaml.load_yaml_dataclass(clazz_team, 'test.yml', YAML_TEAM, profiler=profiling.LoadProfiler()) == expected
+    assert scopes == [ clazz_team, clazz_person, clazz_person, clazz_person ]
@@ -0,0 +1,132 @@
+import pytest
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, List, Optional, Union
+import bentoudev.dataclass.yaml_loader as yaml
+import bentoudev.dataclass.path_loader as path_loader
+import bentoudev.dataclass.base as base
+
+
+class clazz_mode(Enum):
+    fast = 1
+    no = 2
+
+
+@dataclass
+class clazz_scalars:
+    f_str: Optional[str] = None
+    f_int: Optional[int] = None
+    f_float: Optional[float] = None
+    f_bool: Optional[bool] = None
+    f_enum: Optional[clazz_mode] = None
+    f_any: Optional[Any] = None
+    f_union: Optional[Union[int, str]] = None
+    f_list: Optional[List[str]] = None
+    f_dict: Optional[Dict[int, str]] = None
+
+
+def load_raw(content:str):
+    return yaml.load_yaml_dataclass(clazz_scalars, 'test.yml', content, raw_scalars=True)
+
+
+@pytest.mark.parametrize('content,field_name,expected', [
+    ('f_str: no', 'f_str', 'no'),
+    ('f_str: 0x10', 'f_str', '0x10'),
+    ('f_str: 2020-01-01', 'f_str', '2020-01-01'),
+    ('f_str: 1.50', 'f_str', '1.50'),
+    ('f_str: "quoted"', 'f_str', 'quoted'),
+    ('f_int: 12', 'f_int', 12),
+    ('f_int: -0x10', 'f_int', -16),
+    ('f_int: 1_000', 'f_int', 1000),
+    ('f_int: 010', 'f_int', 8),
+    ('f_float: 1.5', 'f_float', 1.5),
+    ('f_float: 2', 'f_float', 2.0),
+    ('f_float: .inf', 'f_float', float('inf')),
+    ('f_bool: yes', 'f_bool', True),
+    ('f_bool: Off', 'f_bool', False),
+    ('f_bool: 1', 'f_bool', True),
+    ('f_enum: no', 'f_enum', clazz_mode.no),
+    ('f_union: 5', 'f_union', 5),
+    ('f_union: five', 'f_union', 'five'),
+    ('f_list: [ 1.0, on, ~ ]', 'f_list', [ '1.0', 'on', '~' ]),
+    ('f_dict: { 1: a, 2: 010 }', 'f_dict', { 1 : 'a', 2 : '010' }),
+])
+def test_raw_scalars(content, field_name, expected):
+    value = getattr(load_raw(content), field_name)
+    assert value == expected
+    assert type(value) is type(expected)
+
+
+@dataclass
+class clazz_numbers:
+    f_int: Optional[int] = None
+    f_float: Optional[float] = None
+    f_bool: Optional[bool] = None
+    f_str: Optional[str] = None
+
+
+def load_number(field_name:str, literal:str, **kwargs):
+    try:
+        return getattr(yaml.load_yaml_dataclass(clazz_numbers, 'test.yml', f'{field_name}: {literal}', **kwargs), field_name)
+    except base.DataclassLoadError as err:
+        return str(err)
+
+
+# Raw loaders must accept exactly what YAML 1.1 resolution accepts
+@pytest.mark.parametrize('literal', [
+    '0', '-0', '+5', '12', '010', '-010', '08', '0o17', '0O17', '0x1F', '0X1F', '0b101', '0B101', '1_000', '1__0', '1_',
+    '0x_1f', '190:20:30', '\u0661\u0662', '1e5', '1E5', '1e+5', '1.5e+3', '1.5e3', '1.', '.5', '-.5', '+.5', '1_0.5',
+    '1.5', '-1.5', '.inf', '-.inf', '.NaN', 'inf', 'nan', 'infinity', '1:30.5', '00', '+', '.', 'yes', 'On', 'ok',
+])
+@pytest.mark.parametrize('field_name', [ 'f_int', 'f_float', 'f_bool', 'f_str' ])
+def test_raw_scalars_parity(field_name, literal):
+    expected = load_number(field_name, literal)
+    value = load_number(field_name, literal, raw_scalars=True)
+    if field_name == 'f_str':
+        # Strings are kept as written in raw mode
+        assert value == literal
+    elif type(expected) is float and expected != expected:
+        assert value != value
+    else:
+        assert value == expected
+        assert type(value) is type(expected)
+
+
+def test_raw_scalars_any_resolved_as_yaml():
+    content = 'f_any: { a: [ 1, no, ~, "q", 1.5 ] }'
+    assert load_raw(content).f_any == yaml.load_yaml_dataclass(clazz_scalars, 'test.yml', content).f_any
+    assert load_raw('f_any: 10').f_any == 10
+
+
+@pytest.mark.parametrize('content', [
+    'f_int: abc',
+    'f_int: 1.5',
+    'f_float: nan',
+    'f_bool: maybe',
+    'f_enum: slow',
+])
+def test_raw_scalars_errors_match_default(content):
+    with pytest.raises(base.DataclassLoadError) as default_err:
+        yaml.load_yaml_dataclass(clazz_scalars, 'test.yml', content)
+    with pytest.raises(base.DataclassLoadError) as raw_err:
+        load_raw(content)
+    assert str(raw_err.value) == str(default_err.value)
+
+
+def test_raw_scalars_merge_keys():
+    content = (
+        'base: &base\n'
+        '  f_int: 1\n'
+        'f_dict:\n'
+        '  <<: { 3: c }\n'
+        '  4: d\n'
+    )
+    loaded = path_loader.load_yaml_dataclass_at(clazz_holder, 'test.yml', content, 'f_dict', raw_scalars=True)
+    assert loaded == { 3 : 'c', 4 : 'd' }
+
+
+@dataclass
+class clazz_holder:
+    base: clazz_scalars
+    f_dict: Dict[int, str]
@@ -0,0 +1,162 @@
+import pytest
+import io
+
+from dataclasses import dataclass, field, make_dataclass
+from typing import Any, Dict, List, Optional, Union
+from enum import Enum
+import bentoudev.dataclass.yaml_loader as yaml
+import bentoudev.dataclass.snapshot as snapshot
+import bentoudev.dataclass.base as base
+
+
+class some_enum(Enum):
+    FIRST = 1
+    SECOND = 2
+
+
+@dataclass
+class clazz_person:
+    name: str
+    age: int
+
+
+@dataclass
+class clazz_everything:
+    f_str: str
+    f_int: int
+    f_float: float
+    f_bool: bool
+    f_enum: some_enum
+    f_list: List[clazz_person]
+    f_dict: Dict[str, int]
+    f_union: Union[int, str, clazz_person]
+    f_any: Any
+    f_optional: Optional[str] = None
+    self_nested: Optional['tests.test_snapshot.clazz_everything'] = None # noqa: F821
+
+
+YAML_EVERYTHING = (
+    'f_str: foo\n'
+    'f_int: -666\n'
+    'f_float: 3.14\n'
+    'f_bool: yes\n'
+    'f_enum: SECOND\n'
+    'f_list:\n'
+    '  - name: first\n'
+    '    age: 1\n'
+    'f_dict:\n'
+    '  key: 777\n'
+    'f_union:\n'
+    '  name: union\n'
+    '  age: 2\n'
+    'f_any:\n'
+    '  nested: [ 1, 2.5, text, null, true ]\n'
+    'self_nested:\n'
+    '  f_str: bar\n'
+    '  f_int: 123456789012345678901234567890\n'
+    '  f_float: 0\n'
+    '  f_bool: no\n'
+    '  f_enum: FIRST\n'
+    '  f_list: []\n'
+    '  f_dict: {}\n'
+    '  f_union: text\n'
+    '  f_any: 1\n'
+    '  f_optional: set\n'
+)
+
+
+def load_everything(**kwargs):
+    return yaml.load_yaml_dataclass(clazz_everything, 'test.yml', YAML_EVERYTHING, ext_types=[clazz_everything], **kwargs)
+
+
+def test_snapshot_roundtrip():
+    obj = load_everything()
+
+    data = snapshot.dumps_snapshot(obj, ext_types=[clazz_everything])
+    result = snapshot.loads_snapshot(clazz_everything, data, ext_types=[clazz_everything])
+
+    assert result == obj
+    assert result.f_union == clazz_person(name='union', age=2)
+    assert result.self_nested.f_union == 'text'
+
+
+def test_snapshot_file_roundtrip(tmp_path):
+    obj = clazz_person(name='foo', age=666)
+    path = str(tmp_path / 'person.snap')
+
+    snapshot.dump_snapshot(obj, path)
+
+    assert snapshot.load_snapshot(clazz_person, path) == obj
+
+
+def test_snapshot_source_table():
+    obj = load_everything(always_track_source=True)
+
+    buffer = io.BytesIO()
+    snapshot.dump_snapshot(obj, buffer, ext_types=[clazz_everything], include_sources=True)
+    buffer.seek(0)
+    result = snapshot.load_snapshot(clazz_everything, buffer, ext_types=[clazz_everything])
+
+    assert result == obj
+    assert result.get_field_source('f_enum') == obj.get_field_source('f_enum')
+    assert result.self_nested.get_field_source('f_optional').line_number == 26
+
+
+def test_snapshot_rejects_stale_schema():
+    data = snapshot.dumps_snapshot(clazz_person(name='foo', age=666))
+
+    # Same name, but different fields
+    changed_person = make_dataclass('clazz_person', [ ('name', str), ('age', float) ])
+    changed_person.__module__ = clazz_person.__module__
+
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.loads_snapshot(changed_person, data)
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        b'',
+        b'NOT A SNAPSHOT' * 4,
+    ]
+)
+def test_snapshot_rejects_invalid_data(data):
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.loads_snapshot(clazz_person, data)
+
+
+def test_snapshot_rejects_truncated_data():
+    data = snapshot.dumps_snapshot(clazz_person(name='foo', age=666))
+
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.loads_snapshot(clazz_person, data[:-1])
+
+
+@dataclass
+class clazz_employee(clazz_person):
+    team: str = ''
+
+
+@pytest.mark.parametrize('clazz,content', [
+    (Union[List[int], List[str]], 'value: [ a ]'),
+    (Union[Dict[str, int], Dict[str, str]], 'value: { a: b }'),
+    (Union[clazz_person, clazz_employee], 'value: { name: a, age: 1, team: b }'),
+])
+def test_snapshot_rejects_ambiguous_union(clazz, content):
+    @dataclass
+    class clazz_union:
+        value: clazz
+
+    obj = yaml.load_yaml_dataclass(clazz_union, 'test.yml', content)
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.dumps_snapshot(obj)
+
+
+def test_snapshot_union_of_distinct_members():
+    @dataclass
+    class clazz_union:
+        value: Union[clazz_employee, clazz_person, List[int], Dict[str, int]]
+
+    for content in [ 'value: { name: a, age: 1, team: b }', 'value: { name: a, age: 1 }', 'value: [ 1 ]', 'value: { a: 1 }' ]:
+        obj = yaml.load_yaml_dataclass(clazz_union, 'test.yml', content)
+        assert snapshot.loads_snapshot(clazz_union, snapshot.dumps_snapshot(obj)) == obj
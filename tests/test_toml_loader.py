@@ -0,0 +1,47 @@
+import pytest
+
+from dataclasses import dataclass
+from typing import Dict, List
+import bentoudev.dataclass.toml_loader as toml_loader
+import bentoudev.dataclass.base as base
+
+
+@dataclass
+class clazz_person:
+    name: str
+    age: int
+
+
+@dataclass
+@base.track_source
+class clazz_team:
+    members: List[clazz_person]
+    by_id: Dict[int, str]
+
+
+TOML_TEAM = (
+    '[by_id]\n'
+    '1 = "foo"\n'
+    '\n'
+    '[[members]]\n'
+    'name = "foo"\n'
+    'age = 1\n'
+)
+
+
+def test_load_toml():
+    result = toml_loader.load_toml_dataclass(clazz_team, 'test.toml', TOML_TEAM)
+
+    assert result == clazz_team(members=[ clazz_person(name='foo', age=1) ], by_id={ 1 : 'foo' })
+
+
+def test_load_toml_validation_error():
+    with pytest.raises(base.DataclassLoadError):
+        toml_loader.load_toml_dataclass(clazz_team, 'test.toml', TOML_TEAM.replace('age = 1', 'age = "one"'))
+
+
+def test_load_toml_syntax_error():
+    with pytest.raises(base.DataclassLoadError) as err:
+        toml_loader.load_toml_dataclass(clazz_team, 'test.toml', TOML_TEAM + 'broken =\n')
+
+    assert err.value.source.line_number == 7
@@ -0,0 +1,93 @@
+import pytest
+
+from dataclasses import dataclass, field, make_dataclass
+from enum import Enum
+from typing import Dict, List, Optional, Union
+import bentoudev.dataclass.base as base
+import bentoudev.dataclass.type_plan as type_plan
+
+
+class EColor(Enum):
+    Red = 1
+    Green = 2
+
+
+@dataclass
+class clazz_node:
+    name: str
+    children: List['tests.test_type_plan.clazz_node'] = field(default_factory=list) # noqa: F821
+
+
+def make_clazz(field_type:type=int, default=0, optional:bool=False, member_name:str='value'):
+    annotations = { member_name : Optional[field_type] if optional else field_type }
+    clazz = type('clazz_generated', (), { '__annotations__' : annotations, member_name : default, '__module__' : __name__ })
+    return dataclass(clazz)
+
+
+def test_fingerprint_is_stable():
+    first = type_plan.schema_fingerprint(make_clazz())
+    second = type_plan.schema_fingerprint(make_clazz())
+    assert first == second
+    assert len(first) == 64
+
+
+@pytest.mark.parametrize('clazz', [
+    make_clazz(field_type=float),
+    make_clazz(default=1),
+    make_clazz(optional=True),
+    make_clazz(member_name='other'),
+    make_clazz(field_type=EColor, default=EColor.Red),
+    make_clazz(field_type=Dict[str, int], default=None),
+])
+def test_fingerprint_changes_with_schema(clazz):
+    assert type_plan.schema_fingerprint(clazz) != type_plan.schema_fingerprint(make_clazz())
+
+
+@dataclass
+class clazz_row:
+    key: str
+    value: int
+
+
+def make_rows_clazz(metadata:dict):
+    return make_dataclass('clazz_rows', [ ('rows', List[clazz_row], field(metadata=metadata)) ], namespace={ '__module__' : __name__ })
+
+
+@pytest.mark.parametrize('metadata', [
+    base.columnar(use_numpy=False),
+    base.indexed('key'),
+    base.list_merge(base.EListMerge.MergeByKey, 'key'),
+])
+def test_fingerprint_covers_loader_metadata(metadata):
+    plain = type_plan.schema_fingerprint(make_rows_clazz({}))
+    assert type_plan.schema_fingerprint(make_rows_clazz(metadata)) != plain
+    assert type_plan.schema_fingerprint(make_rows_clazz(metadata)) == type_plan.schema_fingerprint(make_rows_clazz(metadata))
+
+
+def test_fingerprint_is_memoized():
+    plan = type_plan.get_type_plan(clazz_node, [clazz_node])
+    assert plan.fingerprint is None or plan.fingerprint == type_plan.plan_fingerprint(plan)
+    assert type_plan.schema_fingerprint(clazz_node, [clazz_node]) is type_plan.schema_fingerprint(clazz_node, [clazz_node])
+
+
+def test_fingerprint_resolves_forward_refs():
+    # Unresolved reference loads differently than resolved one
+    assert type_plan.schema_fingerprint(clazz_node) != type_plan.schema_fingerprint(clazz_node, [clazz_node])
+
+
+def test_fingerprint_covers_inline_loaders():
+    def make_inline(source_type:type):
+        @base.inline_loader(source_type=source_type, field_name='value')
+        @dataclass
+        class clazz_inline:
+            value: int = 0
+        return clazz_inline
+
+    assert type_plan.schema_fingerprint(make_inline(int)) != type_plan.schema_fingerprint(make_inline(str))
+    assert type_plan.schema_fingerprint(make_inline(int)) != type_plan.schema_fingerprint(make_clazz())
+
+
+def test_union_plans_keep_member_order():
+    # Unions compare equal regardless of order, loader tries members in declaration order
+    assert [ a.clazz for a in type_plan.get_type_plan(Union[int, str]).args ] == [ int, str ]
+    assert [ a.clazz for a in type_plan.get_type_plan(Union[str, int]).args ] == [ str, int ]
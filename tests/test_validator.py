@@ -0,0 +1,139 @@
+import pytest
+import json
+
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, List, Optional, Union
+import bentoudev.dataclass.base as base
+import bentoudev.dataclass.json_loader as json_loader
+import bentoudev.dataclass.validator as validator
+
+
+class EKind(Enum):
+    Web = 1
+    Worker = 2
+
+
+@base.inline_loader(source_type=str, field_name='host')
+@dataclass
+class clazz_address:
+    host: str
+    port: int = 80
+
+
+@dataclass
+class clazz_service:
+    name: str
+    kind: EKind
+    replicas: int
+    ratio: float
+    enabled: bool
+    addresses: List[clazz_address]
+    tags: Union[str, List[str]]
+    limits: Dict[str, int] = field(default_factory=dict)
+    children: Optional[List['tests.test_validator.clazz_service']] = None # noqa: F821
+    extra: Optional[Any] = None
+
+
+VALID = {
+    'name' : 'api',
+    'kind' : 'Web',
+    'replicas' : 2,
+    'ratio' : 1,
+    'enabled' : 'yes',
+    'addresses' : 'localhost',
+    'tags' : ['a', 'b'],
+    'limits' : { 'cpu' : 4 },
+    'children' : [{
+        'name' : 'child',
+        'kind' : 'Worker',
+        'replicas' : 1,
+        'ratio' : 0.5,
+        'enabled' : False,
+        'addresses' : ['a', 'b'],
+        'tags' : 'single',
+        'limits' : {},
+    }],
+}
+
+
+def with_change(path:list, value):
+    data = json.loads(json.dumps(VALID))
+    target = data
+    for step in path[:-1]:
+        target = target[step]
+    if value is KeyError:
+        del target[path[-1]]
+    else:
+        target[path[-1]] = value
+    return data
+
+
+CASES = [
+    (VALID, []),
+    (with_change(['kind'], 'Unknown'), ['$.kind']),
+    (with_change(['kind'], 1), ['$.kind']),
+    (with_change(['replicas'], 2.5), ['$.replicas']),
+    (with_change(['replicas'], True), ['$.replicas']),
+    (with_change(['enabled'], 'maybe'), ['$.enabled']),
+    (with_change(['ratio'], 'fast'), ['$.ratio']),
+    (with_change(['addresses'], [{ 'host' : 'a' }]), ['$.addresses[0]']),
+    (with_change(['tags'], 5), []),
+    (with_change(['tags'], [{}]), ['$.tags']),
+    (with_change(['limits', 'cpu'], 'four'), ['$.limits.cpu']),
+    (with_change(['extra'], { 'anything' : [1, None] }), []),
+    (with_change(['unknown'], 1), ['$']),
+    (with_change(['limits'], KeyError), ['$']),
+    (with_change(['children', 0, 'replicas'], '1'), ['$.children[0].replicas']),
+    (with_change(['children', 0, 'name'], KeyError), ['$.children[0]']),
+    (with_change(['children'], None), []),
+    (with_change(['replicas'], None), ['$.replicas']),
+]
+
+
+def _loads(data):
+    try:
+        json_loader.load_json_dataclass(clazz_service, 'test.json', json.dumps(data), ext_types=[clazz_service])
+    except base.DataclassLoadError:
+        return False
+    return True
+
+
+@pytest.mark.parametrize('data,error_paths', CASES)
+def test_validator_matches_loader(data, error_paths):
+    compiled = validator.compile_validator(clazz_service, ext_types=[clazz_service])
+
+    assert compiled.is_valid(data) == (len(error_paths) == 0)
+    assert compiled.is_valid(data) == _loads(data)
+
+    errors = compiled.validate(data)
+    assert all(isinstance(e, base.DataclassErrorMessage) for e in errors)
+    assert [ e.message.split(':')[0] for e in errors ] == error_paths
+
+
+def test_validator_collects_all_errors():
+    data = with_change(['kind'], 'Unknown')
+    data['replicas'] = 'many'
+    data['children'][0]['ratio'] = None
+
+    errors = validator.validate_data(clazz_service, data, ext_types=[clazz_service])
+    assert [ e.message.split(':')[0] for e in errors ] == [ '$.kind', '$.replicas', '$.children[0].ratio' ]
+
+    with pytest.raises(base.DataclassLoadError) as err:
+        validator.compile_validator(clazz_service, ext_types=[clazz_service]).check(data)
+    assert len(err.value.errors) == 3
+    assert '$.replicas' in str(err.value)
+
+
+def test_validator_is_cached():
+    first = validator.compile_validator(clazz_service, ext_types=[clazz_service])
+    assert validator.compile_validator(clazz_service, ext_types=[clazz_service]) is first
+
+
+def test_validator_string_keys():
+    @dataclass
+    class clazz_indexed:
+        items: Dict[int, str]
+
+    assert not validator.compile_validator(clazz_indexed).is_valid({ 'items' : { '1' : 'a' } })
+    assert validator.compile_validator(clazz_indexed, string_keys=True).is_valid({ 'items' : { '1' : 'a' } })